@@ -1,10 +1,26 @@
+import argparse
 import os
 import json
+import sys
+import time
 from typing import Dict
 
+# Reuse the repository's shared modules (src/) from this standalone script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.file_manifest import append_changes, diff_manifests, load_manifest, scan_notaria_folders
 
-BASE_DIR = "Notaria"
-OUTPUT_FILE = "customers_index.json"
+
+# Paths are relative to this script's folder, where certificate_summary.py
+# reads the index from
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+BASE_DIR = os.path.join(DATA_DIR, "Notaria")
+OUTPUT_FILE = os.path.join(DATA_DIR, "customers_index.json")
+
+# Size, mtime and SHA-256 of every indexed file (src/file_manifest.py), so a
+# re-index only hashes files whose size or mtime changed; what changed is
+# appended to the changes log, one timestamped line per run
+MANIFEST_FILE = os.path.join(DATA_DIR, "customers_index.manifest.json")
+CHANGES_FILE = os.path.join(DATA_DIR, "customers_index.changes.jsonl")
 
 
 def classify_file(filename: str):
@@ -19,30 +35,11 @@ def classify_file(filename: str):
     return "non_certificates", False
 
 
-def scan_all_files(folder_path):
-    """
-    Recursively walks through ALL subfolders.
-    Returns a flat list of file paths (relative).
-    """
-    collected = []
-
-    for root, dirs, files in os.walk(folder_path):
-        for file in files:
-            rel_path = os.path.relpath(os.path.join(root, file), folder_path)
-            collected.append(rel_path)
-
-    return collected
-
-
-def index_notaria_folders(base_dir: str) -> Dict:
+def build_index(manifest: Dict) -> Dict:
+    """customers_index.json contents from a manifest"""
     data = {}
 
-    for customer_name in sorted(os.listdir(base_dir)):
-        customer_path = os.path.join(base_dir, customer_name)
-
-        if not os.path.isdir(customer_path):
-            continue
-
+    for customer_name, entries in manifest["customers"].items():
         data[customer_name] = {
             "customer_type": "unknown",
             "files": {
@@ -51,9 +48,7 @@ def index_notaria_folders(base_dir: str) -> Dict:
             }
         }
 
-        all_files = scan_all_files(customer_path)
-
-        for rel_path in all_files:
+        for rel_path in sorted(entries):
             filename = os.path.basename(rel_path)
 
             category, error_flag = classify_file(filename)
@@ -73,15 +68,47 @@ def index_notaria_folders(base_dir: str) -> Dict:
     return data
 
 
+def write_json(path: str, data) -> None:
+    """Write through a temp file, so readers never see a partial file"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def index_notaria_folders(base_dir: str, workers: int = 1) -> Dict:
+    return build_index(scan_notaria_folders(base_dir, workers=workers))
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index the Notaria customer folders")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="customer folders scanned in parallel")
+    parser.add_argument("--full", action="store_true",
+                        help="re-hash every file (changes are still reported against the manifest)")
+    args = parser.parse_args()
+
     if not os.path.exists(BASE_DIR):
         raise FileNotFoundError(f"Base directory not found: {BASE_DIR}")
 
-    index = index_notaria_folders(BASE_DIR)
-
-    with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-        json.dump(index, f, indent=2, ensure_ascii=False)
-
-    print("Indexing complete")
-    print(f"Output written to: {OUTPUT_FILE}")
-    print(f"Customers indexed: {len(index)}")
+    start_time = time.time()
+    # A full rescan re-hashes every file but still reports changes against the stored manifest
+    previous_manifest = load_manifest(MANIFEST_FILE)
+    manifest = scan_notaria_folders(BASE_DIR, None if args.full else previous_manifest, workers=args.workers)
+    changes = diff_manifests(previous_manifest, manifest)
+    changed = any(changes.values()) or not os.path.exists(OUTPUT_FILE)
+
+    # Unchanged corpus: leave the index (and its mtime) untouched
+    if changed:
+        write_json(OUTPUT_FILE, build_index(manifest))
+    # Also saves new mtimes of touched but unmodified files, so they are not re-hashed
+    if manifest != previous_manifest:
+        write_json(MANIFEST_FILE, manifest)
+    logged = append_changes(CHANGES_FILE, changes, full_rescan=args.full or previous_manifest is None)
+
+    print("Indexing complete" + (" (full rescan)" if args.full or previous_manifest is None else " (incremental)"))
+    print(f"Output written to: {OUTPUT_FILE}" if changed else f"No changes, {OUTPUT_FILE} kept")
+    print(f"Customers indexed: {len(manifest['customers'])}")
+    print(f"Added: {len(changes['added'])}, removed: {len(changes['removed'])}, "
+          f"modified: {len(changes['modified'])}" + (f" (logged in {CHANGES_FILE})" if logged else ""))
+    print(f"Elapsed: {time.time() - start_time:.2f}s")
@@ -0,0 +1,111 @@
+"""
+build_content_index.py
+------------------------------------------------------------
+Builds the content-similarity index (src/content_index.py) used by the
+chatbot's "content_similarity" match path.
+
+Reads every certificate of certificate_summary.json (error-flagged ones
+excluded), extracts its text from the Notaria folders the same way the
+dataset build does (first 2 pages, one extraction process per core), and
+writes certificate_summary.content.idx next to the summary.
+
+Run it after certificate_summary.json changes:
+    python build_content_index.py [--summary certificate_summary.json] [--workers N]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.content_index import ContentIndex, content_index_path
+from src.summary_index_file import source_digest, summary_entries
+
+from certificate_summary import (
+    CUSTOMER_DATA_PATH,
+    DATA_DIR,
+    EXTRACT_WORKERS,
+    extract_document,
+    init_extract_worker,
+)
+
+
+DEFAULT_SUMMARY_PATH = os.path.join(DATA_DIR, "certificate_summary.json")
+# Placeholder the extractor leaves for a page it did not OCR
+SCANNED_PAGE_MARKER = re.compile(r"\[SCANNED PAGE[^\]]*\]")
+
+
+def certificate_tasks(summary, base_path=CUSTOMER_DATA_PATH):
+    """(entry, extraction task) per certificate worth indexing"""
+    tasks = []
+    for entry in summary_entries(summary):
+        if entry["entry_type"] != "certificate" or entry.get("error_flag"):
+            continue
+        tasks.append((entry, {
+            'customer': entry['customer'],
+            'cert_info': {'filename': entry['filename'], 'relative_path': entry['path']},
+            'base_path': base_path,
+            'is_certificate': True
+        }))
+    return tasks
+
+
+def document_content(text):
+    """Extracted text with the scanned-page markers removed"""
+    return SCANNED_PAGE_MARKER.sub("", text or "").strip()
+
+
+def extract_texts(tasks, workers):
+    """Yield (entry, text) for every certificate whose text could be read"""
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_extract_worker) as executor:
+        extracted = executor.map(extract_document, [task for _, task in tasks], chunksize=4)
+        for (entry, _), result in zip(tasks, extracted):
+            text = document_content(result.get('document_text', ''))
+            # Missing files, failures and scans without OCR text carry no content;
+            # a partly scanned certificate is indexed by its text pages
+            if not text:
+                continue
+            yield entry, text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the certificate content-similarity index")
+    parser.add_argument("--summary", default=DEFAULT_SUMMARY_PATH,
+                        help="certificate summary JSON to index")
+    parser.add_argument("--base-path", default=CUSTOMER_DATA_PATH,
+                        help="Notaria customer folders")
+    parser.add_argument("--workers", type=int, default=EXTRACT_WORKERS,
+                        help="extraction processes")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.base_path):
+        raise FileNotFoundError(f"Base directory not found: {args.base_path}")
+
+    with open(args.summary, "r", encoding="utf-8") as f:
+        summary = json.load(f)
+
+    start_time = time.time()
+    tasks = certificate_tasks(summary, args.base_path)
+    print(f"Certificates to index: {len(tasks)}")
+
+    index = ContentIndex.build(
+        extract_texts(tasks, args.workers),
+        meta={
+            "summary": os.path.basename(args.summary),
+            "summary_sha256": source_digest(args.summary).hex(),
+            "built_at": time.strftime("%Y-%m-%d %H:%M:%S")
+        }
+    )
+    output_path = index.save(content_index_path(args.summary))
+
+    print(f"Indexed {len(index)} certificates ({len(index.terms)} terms) in {time.time() - start_time:.1f}s")
+    print(f"Skipped (missing file or no text): {len(tasks) - len(index)}")
+    print(f"Content index saved to {output_path}")
+
+
+if __name__ == "__main__":
+    main()
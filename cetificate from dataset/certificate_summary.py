@@ -26,13 +26,19 @@ FEATURES:
 
 import json
 import os
+import re
+import sys
+import threading
 import time
 import unicodedata
 from dotenv import load_dotenv
-from groq import Groq
-from text_extractor import TextExtractor
-from multiprocessing import Pool
-from tqdm import tqdm
+
+# Reuse the repository's shared modules (src/) from this standalone script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from src.build_journal import BuildJournal
+from src.build_scheduler import TwoStageScheduler
+from src.extraction_cache import file_digest
+from src.llm_gateway import get_gateway
 
 # ---------------------------------------------------------
 # Setup
@@ -42,15 +48,53 @@ load_dotenv()
 # Configuration
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MODEL_NAME = "meta-llama/llama-4-maverick-17b-128e-instruct"
-NUM_WORKERS = 1  # Sequential processing to avoid rate limits
+# Extraction runs on one process per core; LLM calls run on a few threads sharing one
+# token bucket, paced to GROQ_REQUESTS_PER_MINUTE / GROQ_TOKENS_PER_MINUTE
+EXTRACT_WORKERS = int(os.getenv("EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+LLM_WORKERS = int(os.getenv("LLM_WORKERS", "4"))
 API_TIMEOUT = 30  # Timeout for API calls in seconds
 
-# Load data
-with open("customers_index.json", "r", encoding="utf-8") as f:
-    customers = json.load(f)
+# Every input and output path is relative to this script's folder, so the build
+# reads and writes the same files whatever the working directory
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Persistent LLM response cache: rebuilds only pay for documents whose text changed.
+# Bump PROMPT_VERSION when the analysis prompt changes; set LLM_CACHE_BYPASS=1 to force fresh answers.
+LLM_CACHE_PATH = os.path.join(DATA_DIR, ".llm_cache", "responses.sqlite")
+PROMPT_VERSION = "3.1"
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+# Per-file results are checkpointed here as they finish: an interrupted build resumes
+# where it stopped, and a rebuild only processes new or modified files.
+# Entries from another PROMPT_VERSION are ignored; delete the file to force a full rebuild.
+JOURNAL_PATH = os.path.join(DATA_DIR, "certificate_summary3.journal.jsonl")
+
+CUSTOMER_DATA_PATH = os.path.join(DATA_DIR, "Notaria")
+OUTPUT_PATH = os.path.join(DATA_DIR, "certificate_summary3.json")
+
+# Written by all_file_data.py; parsed on first use, so importing this module
+# (chatbot, tests, extraction processes) does not pay for it
+CUSTOMERS_INDEX_PATH = os.path.join(DATA_DIR, "customers_index.json")
+CERTIFICATE_TYPES_PATH = os.path.join(DATA_DIR, "certificate_types.json")
 
-with open("certificate_types.json", "r", encoding="utf-8") as f:
-    cert_types = json.load(f)
+_data = {}
+_data_lock = threading.Lock()
+
+def _load_json(path):
+    """Parse a JSON data file once per process; callers must not mutate the result"""
+    with _data_lock:
+        if path not in _data:
+            with open(path, "r", encoding="utf-8") as f:
+                _data[path] = json.load(f)
+        return _data[path]
+
+def get_customers():
+    """customers_index.json (read-only)"""
+    return _load_json(CUSTOMERS_INDEX_PATH)
+
+def get_cert_types():
+    """certificate_types.json (read-only)"""
+    return _load_json(CERTIFICATE_TYPES_PATH)
 
 # ---------------------------------------------------------
 # HARD KEYWORD MAPS - Fallback detection
@@ -154,26 +198,69 @@ def find_file_case_insensitive(base_path, customer, relative_path):
 
     return None
 
+def task_journal_key(task_item):
+    """Journal key of a task: customer/relative path plus the file's content hash"""
+    cert_info = task_item['cert_info']
+    task_path = f"{task_item['customer']}/{cert_info['relative_path']}"
+
+    # Non-certificates are never read, so there is nothing to hash
+    if not task_item['is_certificate']:
+        return BuildJournal.make_key(task_path, "non_certificate")
+
+    file_path = find_file_case_insensitive(task_item['base_path'], task_item['customer'], cert_info['relative_path'])
+    digest = file_digest(file_path) if file_path else None
+    return BuildJournal.make_key(task_path, digest)
+
 # ---------------------------------------------------------
 # Worker Initialization
 # ---------------------------------------------------------
 
-_worker_groq_client = None
 _worker_text_extractor = None
+_llm_gateway = None
 
-def init_worker():
-    """Initialize worker process with its own clients"""
-    global _worker_groq_client, _worker_text_extractor
-    _worker_groq_client = Groq(api_key=GROQ_API_KEY)
+def init_extract_worker():
+    """Initialize an extraction process with its own text extractor"""
+    global _worker_text_extractor
+    # Imported here: PDF/OCR libraries are only needed where extraction runs
+    from text_extractor import TextExtractor
     _worker_text_extractor = TextExtractor(lang="spa", ocr_dpi=150)
 
+def get_llm_gateway():
+    """
+    Gateway shared by every LLM thread of this process: one token bucket paces
+    all calls, 429s are retried with backoff, answers go to the persistent cache
+    """
+    global _llm_gateway
+    if _llm_gateway is None:
+        _llm_gateway = get_gateway(GROQ_API_KEY)
+        _llm_gateway.configure_cache(LLM_CACHE_PATH)
+    return _llm_gateway
+
 # ---------------------------------------------------------
 # LLM Analysis Functions
 # ---------------------------------------------------------
 
-def analyze_document_with_llm(document_text: str, filename: str, groq_client) -> dict:
+def parse_llm_analysis(result_text: str):
+    """Analysis dict from the LLM reply, or None when it holds no valid JSON"""
+    json_match = re.search(r'\{[^}]+\}', result_text.strip())
+    if json_match:
+        result_text = json_match.group()
+    try:
+        result = json.loads(result_text)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    if not isinstance(result, dict):
+        return None
+    return {
+        "is_notarial": result.get("is_notarial", False),
+        "certificate_type": str(result.get("certificate_type", "otros")).lower(),
+        "purpose": str(result.get("purpose", "unknown")).lower()
+    }
+
+def analyze_document_with_llm(document_text: str, filename: str, gateway) -> dict:
     """
-    Use LLM to analyze document with simpler prompt and better error handling
+    Use LLM to analyze document with simpler prompt and better error handling.
+    Rate limits, 429 retries and the response cache are handled by the gateway.
     """
 
     prompt = f"""You are a Uruguayan NOTARIAL law expert.
@@ -193,93 +280,78 @@ Rules:
 • DGI, BPS, BCU, Registro, Banco = authority
 """
 
+    messages = [{"role": "user", "content": prompt}]
+
     max_retries = 3
     for attempt in range(max_retries):
         try:
-            response = groq_client.chat.completions.create(
-                messages=[{"role": "user", "content": prompt}],
-                model=MODEL_NAME,
+            result_text = gateway.chat(
+                MODEL_NAME,
+                messages,
                 temperature=0.1,
                 max_tokens=100,
+                prompt_version=PROMPT_VERSION,
+                bypass_cache=LLM_CACHE_BYPASS,
+                # Only real answers are cached, never replies that fall back below
+                cacheable=lambda reply: parse_llm_analysis(reply) is not None,
                 timeout=API_TIMEOUT
             )
-
-            result_text = response.choices[0].message.content.strip()
-
-            # Try to extract JSON from response
-            import re
-            json_match = re.search(r'\{[^}]+\}', result_text)
-            if json_match:
-                result_text = json_match.group()
-
-            result = json.loads(result_text)
-
-            return {
-                "is_notarial": result.get("is_notarial", False),
-                "certificate_type": result.get("certificate_type", "otros").lower(),
-                "purpose": result.get("purpose", "unknown").lower()
-            }
-
-        except json.JSONDecodeError:
-            if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
-                continue
-            # Fallback
-            return {
-                "is_notarial": False,
-                "certificate_type": "otros",
-                "purpose": "unknown"
-            }
-
         except Exception as e:
-            if "rate_limit" in str(e).lower() or "429" in str(e):
-                wait_time = 5 * (2 ** attempt)
-                print(f"  [WARNING] Rate limit hit, waiting {wait_time}s...")
-                time.sleep(wait_time)
-                if attempt < max_retries - 1:
-                    continue
-
+            print(f"  [WARNING] LLM call failed for {filename}: {e}")
             if attempt < max_retries - 1:
                 time.sleep(2)
                 continue
+            break
+
+        analysis = parse_llm_analysis(result_text)
+        if analysis is not None:
+            return analysis
+        if attempt < max_retries - 1:
+            time.sleep(2 ** attempt)
+
+    # Fallback: flagged, so the file is retried on the next build instead of
+    # having this guess journaled as its result
+    return {
+        "is_notarial": False,
+        "certificate_type": "otros",
+        "purpose": "unknown",
+        "llm_failed": True
+    }
 
-            # Fallback on final error
-            return {
-                "is_notarial": False,
-                "certificate_type": "otros",
-                "purpose": "unknown"
-            }
+def mark_llm_failure(result, analysis):
+    """Tag a result decided on the fallback analysis, so it is not journaled"""
+    if analysis.get("llm_failed"):
+        result['error'] = 'llm_unavailable'
+    return result
 
 # ---------------------------------------------------------
-# Main Processing Worker Function
+# Processing Stages
 # ---------------------------------------------------------
 
-def process_single_file(task_item):
-    """Process a single file with worker's clients"""
-    global _worker_groq_client, _worker_text_extractor
-
+def extract_document(task_item):
+    """
+    Stage 1 (extraction process): read the document text.
+    Tasks settled without the LLM carry their final result instead.
+    """
     customer = task_item['customer']
     cert_info = task_item['cert_info']
     base_path = task_item['base_path']
     is_certificate = task_item['is_certificate']
 
-    groq_client = _worker_groq_client
-    text_extractor = _worker_text_extractor
-
     if not is_certificate:
-        return {
+        return {'task': task_item, 'result': {
             'type': '__NON_CERT__',
             'customer': customer,
             'filename': cert_info['filename'],
             'path': cert_info['relative_path'],
             'reason': 'non_certificate'
-        }
+        }}
 
     # Use Unicode-aware file finding with normalization
     file_path = find_file_case_insensitive(base_path, customer, cert_info["relative_path"])
 
     if not file_path:
-        return {
+        return {'task': task_item, 'result': {
             'type': '__AUTHORITY_DOC__',
             'customer': customer,
             'filename': cert_info['filename'],
@@ -287,15 +359,48 @@ def process_single_file(task_item):
             'error_flag': cert_info.get('error_flag', False),
             'purpose': 'unknown',
             'reason': 'file_not_found'
-        }
+        }}
 
     try:
         start_time = time.time()
 
         # Extract text from document
-        extraction_result = text_extractor.extract(file_path, max_pages=2)
-        document_text = extraction_result.full_text
-        extraction_time = time.time() - start_time
+        extraction_result = _worker_text_extractor.extract(file_path, max_pages=2)
+        return {
+            'task': task_item,
+            'document_text': extraction_result.full_text,
+            'extraction_time': time.time() - start_time
+        }
+
+    except Exception as e:
+        return {'task': task_item, 'result': processing_error(task_item, e)}
+
+def processing_error(task_item, error):
+    """Result of a file whose processing raised"""
+    cert_info = task_item['cert_info']
+    return {
+        'type': 'otros',
+        'customer': task_item['customer'],
+        'filename': cert_info['filename'],
+        'path': cert_info['relative_path'],
+        'error_flag': cert_info.get('error_flag', False),
+        'purpose': 'unknown',
+        'error': str(error)
+    }
+
+def classify_document(extracted):
+    """Stage 2 (LLM thread): keyword rules and LLM analysis of an extracted document"""
+    if 'result' in extracted:
+        return extracted['result']
+
+    task_item = extracted['task']
+    customer = task_item['customer']
+    cert_info = task_item['cert_info']
+    document_text = extracted['document_text']
+    extraction_time = extracted['extraction_time']
+
+    try:
+        start_time = time.time()
 
         if not document_text.strip() or "[SCANNED PAGE" in document_text:
             # Use filename as fallback for text analysis
@@ -347,7 +452,7 @@ def process_single_file(task_item):
         # ---------------------------------------------------------
         # LLM CALL
         # ---------------------------------------------------------
-        analysis = analyze_document_with_llm(document_text, cert_info['filename'], groq_client)
+        analysis = analyze_document_with_llm(document_text, cert_info['filename'], get_llm_gateway())
 
         is_notarial = analysis.get("is_notarial", False)
         cert_type = analysis.get("certificate_type", "otros").lower()
@@ -463,7 +568,7 @@ def process_single_file(task_item):
                 ]
 
                 for combo in combos_to_try:
-                    if combo and combo in cert_types:
+                    if combo and combo in get_cert_types():
                         cert_type = combo
                         break
 
@@ -486,7 +591,7 @@ def process_single_file(task_item):
                 elif 'bcu' in combined_text:
                     detected_authority_purpose = 'bcu'
 
-            return {
+            return mark_llm_failure({
                 'type': '__AUTHORITY_DOC__',
                 'customer': customer,
                 'filename': cert_info['filename'],
@@ -496,12 +601,12 @@ def process_single_file(task_item):
                 'reason': authority_type,
                 'extraction_time': extraction_time,
                 'is_pure_authority': is_pure_authority  # NEW: for tracking
-            }
+            }, analysis)
 
-        if cert_type not in cert_types:
+        if cert_type not in get_cert_types():
             cert_type = "otros"
 
-        return {
+        return mark_llm_failure({
             'type': cert_type,
             'customer': customer,
             'filename': cert_info['filename'],
@@ -509,62 +614,25 @@ def process_single_file(task_item):
             'error_flag': cert_info.get('error_flag', False),
             'purpose': purpose,
             'extraction_time': extraction_time,
-            'total_time': time.time() - start_time,
+            'total_time': extraction_time + time.time() - start_time,
             'is_complete_cert': is_complete_cert  # NEW v3.1: for tracking COMPLETO certs
-        }
+        }, analysis)
 
     except Exception as e:
-        return {
-            'type': 'otros',
-            'customer': customer,
-            'filename': cert_info['filename'],
-            'path': cert_info['relative_path'],
-            'error_flag': cert_info.get('error_flag', False),
-            'purpose': 'unknown',
-            'error': str(e)
-        }
+        return processing_error(task_item, e)
+
+def process_single_file(task_item):
+    """Process a single file with both stages in the calling process"""
+    if _worker_text_extractor is None:
+        init_extract_worker()
+    return classify_document(extract_document(task_item))
 
 # ---------------------------------------------------------
-# Main Execution
+# Build Steps
 # ---------------------------------------------------------
 
-if __name__ == '__main__':
-    final_certificate_mapping = {k: [] for k in cert_types.keys()}
-    non_certificate_docs = []
-
-    # Enhanced statistics tracking (Version 3.1)
-    stats = {
-        'file_not_found': 0,
-        'authority_detected': 0,
-        'pure_authority_detected': 0,  # NEW: tracks pure authority docs
-        'notarial_confirmed': 0,
-        'processing_errors': 0,
-        'total_processed': 0,
-        'dgi_removed_from_notarial': 0,  # NEW: tracks DGI docs removed
-        'bps_removed_from_notarial': 0,  # NEW: tracks BPS docs removed
-        'bcu_removed_from_notarial': 0,  # NEW: tracks BCU docs removed
-        'completo_certs_reclassified': 0  # NEW v3.1: COMPLETO certs moved from firma to complex types
-    }
-
-    CUSTOMER_DATA_PATH = "Notaria"
-
-    print("\n" + "=" * 70)
-    print("Certificate Classification - VERSION 3.1 (CRITICAL FIX)")
-    print("=" * 70)
-    print("KEY FIX:")
-    print("• COMPLETO/CONTROL certificates moved from 'firma' to complex types")
-    print("• This fixes DGI appearing in firma section (client's main issue)")
-    print("=" * 70)
-    print("OTHER ENHANCEMENTS:")
-    print("• Stronger authority document detection (DGI/BPS/BCU)")
-    print("• Pure authority docs excluded from notarial certificates")
-    print("• Better matches client requirements")
-    print("=" * 70)
-    print(f"Using model: {MODEL_NAME}")
-    print(f"Using {NUM_WORKERS} parallel workers")
-    print("=" * 70 + "\n")
-
-    # Collect all tasks
+def collect_tasks(customers, base_path=CUSTOMER_DATA_PATH):
+    """One task per indexed file, carrying only what processing that file needs"""
     all_tasks = []
 
     for customer, info in customers.items():
@@ -572,7 +640,7 @@ if __name__ == '__main__':
             all_tasks.append({
                 'customer': customer,
                 'cert_info': cert,
-                'base_path': CUSTOMER_DATA_PATH,
+                'base_path': base_path,
                 'is_certificate': True
             })
 
@@ -580,28 +648,89 @@ if __name__ == '__main__':
             all_tasks.append({
                 'customer': customer,
                 'cert_info': doc,
-                'base_path': CUSTOMER_DATA_PATH,
+                'base_path': base_path,
                 'is_certificate': False
             })
 
-    total_files = len(all_tasks)
-    print(f"Total files to process: {total_files}\n")
+    return all_tasks
+
+def run_tasks(all_tasks):
+    """
+    Process tasks not yet in the build journal and return every result in task order.
+    Extraction and LLM stages run in parallel (see TwoStageScheduler).
+    """
+    from tqdm import tqdm
 
-    print("Initializing worker processes...")
-    with Pool(processes=NUM_WORKERS, initializer=init_worker) as pool:
+    total_files = len(all_tasks)
+    print(f"Total files: {total_files}")
+
+    # Skip files already journaled with the same content
+    journal = BuildJournal(JOURNAL_PATH, PROMPT_VERSION)
+    task_keys = [task_journal_key(task) for task in all_tasks]
+    pending = [(key, task) for key, task in zip(task_keys, all_tasks) if key not in journal]
+    print(f"Already processed (journal): {total_files - len(pending)}")
+    print(f"Files to process: {len(pending)}\n")
+
+    fresh_results = {}
+    if pending:
+        print("Initializing extraction processes...")
+        get_llm_gateway()
+        scheduler = TwoStageScheduler(
+            extract_document,
+            classify_document,
+            extract_workers=EXTRACT_WORKERS,
+            classify_workers=LLM_WORKERS,
+            initializer=init_extract_worker
+        )
+        completed = scheduler.run([task for _, task in pending])
         try:
-            results = list(tqdm(
-                pool.imap(process_single_file, all_tasks, chunksize=1),
-                total=total_files,
-                desc="Processing files",
-                unit="file"
-            ))
+            for index, result in tqdm(completed, total=len(pending), desc="Processing files", unit="file"):
+                key = pending[index][0]
+                fresh_results[key] = result
+                # Failed files (processing errors, LLM unavailable) are not journaled,
+                # so the next run retries them
+                if 'error' not in result:
+                    journal.append(key, result)
         except KeyboardInterrupt:
-            pool.terminate()
-            pool.join()
-            exit(1)
+            completed.close()
+            journal.close()
+            print(f"\nInterrupted: {len(journal)} files saved in {JOURNAL_PATH}, rerun to resume")
+            sys.exit(1)
+
+    # Assemble results in task order; drop journal entries of removed or modified files.
+    # A task with neither a fresh nor a journaled result counts as a processing error
+    results = []
+    for key, task in zip(task_keys, all_tasks):
+        result = fresh_results[key] if key in fresh_results else journal.get(key)
+        results.append(result if result is not None else processing_error(task, "no result produced"))
+    journal.compact(task_keys)
+    journal.close()
+
+    return results
+
+def aggregate_results(results, cert_types):
+    """
+    Route results into the certificate mapping and non-certificate documents.
 
-    print("\nAggregating results and collecting statistics...")
+    Returns:
+        (final_certificate_mapping, non_certificate_docs, stats)
+    """
+    final_certificate_mapping = {k: [] for k in cert_types.keys()}
+    non_certificate_docs = []
+
+    # Enhanced statistics tracking (Version 3.1)
+    stats = {
+        'file_not_found': 0,
+        'authority_detected': 0,
+        'pure_authority_detected': 0,  # NEW: tracks pure authority docs
+        'notarial_confirmed': 0,
+        'processing_errors': 0,
+        'total_processed': 0,
+        'dgi_removed_from_notarial': 0,  # NEW: tracks DGI docs removed
+        'bps_removed_from_notarial': 0,  # NEW: tracks BPS docs removed
+        'bcu_removed_from_notarial': 0,  # NEW: tracks BCU docs removed
+        'completo_certs_reclassified': 0  # NEW v3.1: COMPLETO certs moved from firma to complex types
+    }
 
     # Aggregate results and collect statistics
     for result in results:
@@ -660,9 +789,10 @@ if __name__ == '__main__':
         if 'error' in result:
             stats['processing_errors'] += 1
 
-    # Build final summary from ACTUAL processed data
-    print("\nBuilding summary from processed data...")
+    return final_certificate_mapping, non_certificate_docs, stats
 
+def build_summary(final_certificate_mapping, non_certificate_docs, cert_types):
+    """certificate_summary3.json contents from the aggregated results"""
     rebuilt_cert_types = {}
     attribute_keywords = ['poder', 'poderes', 'leyes', 'ley', 'domicilio', 'domicilios', 'giro', 'objeto']
 
@@ -733,8 +863,42 @@ if __name__ == '__main__':
         "non_certificate_documents": non_certificate_docs
     }
 
+    return summary
+
+# ---------------------------------------------------------
+# Main Execution
+# ---------------------------------------------------------
+
+def main():
+    print("\n" + "=" * 70)
+    print("Certificate Classification - VERSION 3.1 (CRITICAL FIX)")
+    print("=" * 70)
+    print("KEY FIX:")
+    print("• COMPLETO/CONTROL certificates moved from 'firma' to complex types")
+    print("• This fixes DGI appearing in firma section (client's main issue)")
+    print("=" * 70)
+    print("OTHER ENHANCEMENTS:")
+    print("• Stronger authority document detection (DGI/BPS/BCU)")
+    print("• Pure authority docs excluded from notarial certificates")
+    print("• Better matches client requirements")
+    print("=" * 70)
+    print(f"Using model: {MODEL_NAME}")
+    print(f"Using {EXTRACT_WORKERS} extraction processes, {LLM_WORKERS} LLM threads")
+    print(f"LLM cache: {LLM_CACHE_PATH}" + (" (bypassed)" if LLM_CACHE_BYPASS else ""))
+    print("=" * 70 + "\n")
+
+    all_tasks = collect_tasks(get_customers())
+    results = run_tasks(all_tasks)
+
+    print("\nAggregating results and collecting statistics...")
+    final_certificate_mapping, non_certificate_docs, stats = aggregate_results(results, get_cert_types())
+
+    # Build final summary from ACTUAL processed data
+    print("\nBuilding summary from processed data...")
+    summary = build_summary(final_certificate_mapping, non_certificate_docs, get_cert_types())
+
     # Save result
-    output_file = "certificate_summary3.json"
+    output_file = OUTPUT_PATH
     with open(output_file, "w", encoding="utf-8") as f:
         json.dump(summary, f, indent=2, ensure_ascii=False)
 
@@ -781,3 +945,7 @@ if __name__ == '__main__':
     print("\n" + "=" * 70)
     print("Done!")
     print("=" * 70)
+
+
+if __name__ == '__main__':
+    main()
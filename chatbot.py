@@ -1,16 +1,13 @@
 import json
 import os
 import re
-import unicodedata
-import difflib
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional
 from uuid import uuid4
 
 import streamlit as st
 
 from dotenv import load_dotenv
-from groq import Groq
 
 from src.phase1_certificate_intent import CertificateIntentCapture
 from src.phase2_legal_requirements import LegalRequirementsEngine
@@ -23,13 +20,28 @@ from src.phase8_final_confirmation import FinalConfirmationEngine
 from src.phase9_certificate_generation import CertificateGenerator
 from src.phase10_notary_review import NotaryReviewSystem, ReviewStatus
 from src.phase11_final_output import FinalOutputGenerator
-
-
+from src.llm_gateway import get_gateway
+from src.taxonomy_context import get_taxonomy_context
+from src.keyword_classifier import (
+    KEYWORD_DECISIVE_CONFIDENCE,
+    get_keyword_index,
+    keyword_classification,
+    normalize_text,
+    prefilter_classification,
+)
+from src.summary_matching import match_document
+from src.summary_store import get_summary_store, reload_summary_store
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_SUMMARY_PATH = "cetificate from dataset/certificate_summary.json"
 DEFAULT_CERT_TYPE = "certificacion_de_firmas"
 DEFAULT_PURPOSE = "para_bps"
 DEFAULT_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
 MAX_LLM_CHARS = 3000
+EXTRACTION_CACHE_DIR = os.path.join(APP_DIR, ".extraction_cache")
+LLM_CACHE_PATH = os.path.join(APP_DIR, ".llm_cache", "responses.sqlite")
+CLASSIFICATION_PROMPT_VERSION = "1"
 
 
 def get_default_option(options: List[Dict[str, str]], value: str) -> Dict[str, str]:
@@ -39,16 +51,6 @@ def get_default_option(options: List[Dict[str, str]], value: str) -> Dict[str, s
     return options[0] if options else {"value": value, "label": value}
 
 
-def normalize_text(value: str) -> str:
-    if not value:
-        return ""
-    value = unicodedata.normalize("NFKD", value)
-    value = value.encode("ascii", "ignore").decode("ascii")
-    value = value.lower()
-    value = re.sub(r"[^a-z0-9]+", " ", value)
-    return re.sub(r"\s+", " ", value).strip()
-
-
 def parse_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     if not text:
         return None
@@ -64,6 +66,10 @@ def parse_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     return data
 
 
+def is_json_reply(text: str) -> bool:
+    return parse_json_from_text(text) is not None
+
+
 def extract_text_for_llm(file_path: str) -> str:
     try:
         document = DocumentIntake.process_file(file_path)
@@ -73,84 +79,6 @@ def extract_text_for_llm(file_path: str) -> str:
         return ""
 
 
-def normalize_purpose(value: str) -> str:
-    if not value:
-        return ""
-    value = value.lower()
-    value = value.replace("para_", "").replace("_", " ")
-    return normalize_text(value)
-
-
-def make_filename_keys(filename: str) -> List[str]:
-    if not filename:
-        return []
-    path = Path(filename)
-    keys = {
-        normalize_text(path.name),
-        normalize_text(path.stem),
-    }
-    return [key for key in keys if key]
-
-
-@st.cache_data(show_spinner=False)
-def build_llm_reference(summary: Dict[str, Any]) -> Dict[str, Any]:
-    reference = {}
-    for cert_type, info in summary.get("identified_certificate_types", {}).items():
-        reference[cert_type] = {
-            "count": info.get("count", 0),
-            "purposes": list(info.get("purposes", {}).keys()),
-            "attributes": info.get("attributes", []),
-            "examples": info.get("examples", [])[:3],
-        }
-    return reference
-
-
-def keyword_classification(doc_text: str, summary_reference: Dict[str, Any]) -> Dict[str, Any]:
-    text_norm = normalize_text(doc_text)
-    if not text_norm:
-        return {"status": "error", "message": "No text for keyword classification."}
-
-    best_type = None
-    best_score = 0
-    matched_attrs: List[str] = []
-
-    for cert_type, info in summary_reference.items():
-        attrs = [normalize_text(attr) for attr in info.get("attributes", [])]
-        score = 0
-        hits = []
-        for attr in attrs:
-            if attr and attr in text_norm:
-                score += 1
-                hits.append(attr)
-        if score > best_score:
-            best_score = score
-            best_type = cert_type
-            matched_attrs = hits
-
-    detected_purpose = ""
-    for cert_type, info in summary_reference.items():
-        for purpose in info.get("purposes", []):
-            purpose_norm = normalize_purpose(purpose)
-            if purpose_norm and purpose_norm in text_norm:
-                detected_purpose = purpose
-                break
-        if detected_purpose:
-            break
-
-    if best_type and best_score > 0:
-        confidence = min(0.8, 0.2 + 0.1 * best_score)
-        return {
-            "status": "ok",
-            "is_certificate": True,
-            "certificate_type": best_type,
-            "purpose": detected_purpose or "",
-            "confidence": confidence,
-            "reason": f"Matched attributes: {', '.join(matched_attrs)}" if matched_attrs else "Matched attributes.",
-        }
-
-    return {"status": "error", "message": "No keyword match found."}
-
-
 def map_summary_type_to_intent(cert_type: str) -> str:
     cert_norm = normalize_text(cert_type)
     if "firma" in cert_norm:
@@ -239,19 +167,13 @@ def call_groq_classification(
     api_key: str,
     doc_text: str,
     summary_reference: Dict[str, Any],
+    bypass_cache: bool = False,
 ) -> Dict[str, Any]:
     if not api_key:
         return {"status": "error", "message": "Missing GROQ_API_KEY."}
 
-    client = Groq(api_key=api_key)
-    context_lines = []
-    for cert_type, info in summary_reference.items():
-        purposes = ", ".join(info.get("purposes", [])) or "none"
-        examples = "; ".join(info.get("examples", [])) or "none"
-        context_lines.append(
-            f"- {cert_type}: purposes={purposes}; examples={examples}"
-        )
-    context_text = "\n".join(context_lines)
+    gateway = get_gateway(api_key)
+    context_text = get_taxonomy_context(summary_reference).text
 
     prompt = (
         "You classify Uruguayan notarial documents.\n"
@@ -267,15 +189,17 @@ def call_groq_classification(
     )
 
     try:
-        response = client.chat.completions.create(
+        content = gateway.chat(
             model=model,
             messages=[
                 {"role": "system", "content": "You are a precise document classifier."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.1,
+            prompt_version=CLASSIFICATION_PROMPT_VERSION,
+            bypass_cache=bypass_cache,
+            cacheable=is_json_reply,
         )
-        content = response.choices[0].message.content or ""
         parsed = parse_json_from_text(content)
         if parsed is not None:
             return parsed
@@ -291,238 +215,6 @@ def call_groq_classification(
         }
 
 
-@st.cache_data(show_spinner=False)
-def load_summary(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as handle:
-        return json.load(handle)
-
-
-@st.cache_data(show_spinner=False)
-def build_summary_index(summary: Dict[str, Any]) -> Dict[str, Any]:
-    entries: List[Dict[str, Any]] = []
-
-    for group, group_entries in summary.get("certificate_file_mapping", {}).items():
-        for entry in group_entries:
-            item = dict(entry)
-            item["group"] = group
-            item["entry_type"] = "certificate"
-            entries.append(item)
-
-    for entry in summary.get("non_certificate_documents", []):
-        item = dict(entry)
-        item["group"] = "non_certificate"
-        item["entry_type"] = "non_certificate"
-        entries.append(item)
-
-    filename_index: Dict[str, List[Dict[str, Any]]] = {}
-    customer_index: Dict[str, List[Dict[str, Any]]] = {}
-    all_filenames_display: List[str] = []
-    all_customers_display: List[str] = []
-
-    for entry in entries:
-        filename = entry.get("filename") or entry.get("path") or ""
-        if filename:
-            all_filenames_display.append(filename)
-        for key in make_filename_keys(filename):
-            filename_index.setdefault(key, []).append(entry)
-
-        customer = entry.get("customer") or ""
-        if customer:
-            all_customers_display.append(customer)
-        customer_key = normalize_text(customer)
-        if customer_key:
-            customer_index.setdefault(customer_key, []).append(entry)
-
-    return {
-        "entries": entries,
-        "filename_index": filename_index,
-        "customer_index": customer_index,
-        "all_filenames_display": sorted(set(all_filenames_display)),
-        "all_customers_display": sorted(set(all_customers_display)),
-    }
-
-
-def is_certificate_entry(entry: Dict[str, Any]) -> bool:
-    return entry.get("entry_type") == "certificate"
-
-
-def entry_has_error(entry: Dict[str, Any]) -> bool:
-    return bool(entry.get("error_flag"))
-
-
-def purpose_matches(entry_purpose: str, user_purpose: str) -> bool:
-    if not entry_purpose or not user_purpose:
-        return False
-    entry_norm = normalize_purpose(entry_purpose)
-    user_norm = normalize_purpose(user_purpose)
-    if not entry_norm or not user_norm:
-        return False
-    return entry_norm == user_norm or entry_norm in user_norm or user_norm in entry_norm
-
-
-def top_fuzzy_matches(query: str, candidates: List[str], limit: int = 5) -> List[Tuple[str, float]]:
-    query_norm = normalize_text(query)
-    if not query_norm:
-        return []
-    scored = []
-    for candidate in candidates:
-        candidate_norm = normalize_text(candidate)
-        ratio = difflib.SequenceMatcher(None, query_norm, candidate_norm).ratio()
-        scored.append((candidate, ratio))
-    scored.sort(key=lambda item: item[1], reverse=True)
-    return [(cand, score) for cand, score in scored[:limit] if score > 0]
-
-
-def dedupe_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    seen = set()
-    unique = []
-    for entry in entries:
-        key = (entry.get("customer"), entry.get("filename"), entry.get("path"))
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(entry)
-    return unique
-
-
-def match_document(
-    filename: str,
-    subject_name: str,
-    extracted_company: Optional[str],
-    purpose_value: str,
-    summary_index: Dict[str, Any],
-    llm_result: Optional[Dict[str, Any]] = None,
-    keyword_result: Optional[Dict[str, Any]] = None,
-    content_text: str = "",
-    content_only: bool = False,
-) -> Dict[str, Any]:
-    if not content_only:
-        filename_keys = make_filename_keys(filename)
-        matched_entries: List[Dict[str, Any]] = []
-
-        for key in filename_keys:
-            matched_entries.extend(summary_index["filename_index"].get(key, []))
-
-        matched_entries = dedupe_entries(matched_entries)
-
-        if matched_entries:
-            cert_entries = [e for e in matched_entries if is_certificate_entry(e)]
-            non_cert_entries = [e for e in matched_entries if not is_certificate_entry(e)]
-            if cert_entries:
-                if any(entry_has_error(entry) for entry in cert_entries):
-                    return {
-                        "status": "not_found",
-                        "match_type": "filename_error",
-                        "confidence": 0.6,
-                        "reason": "Filename matched, but entry is flagged as error in dataset.",
-                        "matches": cert_entries,
-                    }
-                return {
-                    "status": "correct",
-                    "match_type": "filename",
-                    "confidence": 1.0,
-                    "reason": "Exact filename match found in certificate dataset.",
-                    "matches": cert_entries,
-                }
-            if non_cert_entries:
-                if llm_result and llm_result.get("is_certificate") is True:
-                    return {
-                        "status": "needs_review",
-                        "match_type": "filename_non_certificate_llm_conflict",
-                        "confidence": 0.6,
-                        "reason": "Filename is non-certificate, but LLM classified as certificate.",
-                        "matches": non_cert_entries,
-                        "llm_result": llm_result,
-                    }
-                return {
-                    "status": "not_found",
-                    "match_type": "filename_non_certificate",
-                    "confidence": 0.8,
-                    "reason": "Filename matched, but document is classified as non-certificate.",
-                    "matches": non_cert_entries,
-                }
-
-    customer_keys = []
-    if subject_name:
-        customer_keys.append(normalize_text(subject_name))
-    if extracted_company and normalize_text(extracted_company) not in customer_keys:
-        customer_keys.append(normalize_text(extracted_company))
-
-    customer_matches: List[Dict[str, Any]] = []
-    for key in customer_keys:
-        customer_matches.extend(summary_index["customer_index"].get(key, []))
-    customer_matches = dedupe_entries(customer_matches)
-
-    if customer_matches:
-        purpose_matches_entries = [
-            entry for entry in customer_matches
-            if purpose_matches(entry.get("purpose", ""), purpose_value)
-        ]
-        cert_entries = [e for e in purpose_matches_entries if is_certificate_entry(e)]
-        if cert_entries:
-            return {
-                "status": "correct",
-                "match_type": "customer_purpose",
-                "confidence": 0.7,
-                "reason": "Customer and purpose match found in certificate dataset.",
-                "matches": cert_entries,
-            }
-        return {
-            "status": "not_found",
-            "match_type": "customer_only",
-            "confidence": 0.5,
-            "reason": "Customer match found, but no purpose match for this document.",
-            "matches": customer_matches[:5],
-        }
-
-    if llm_result and llm_result.get("is_certificate") is True:
-        llm_type = llm_result.get("certificate_type", "")
-        llm_purpose = llm_result.get("purpose", "")
-        summary_types = summary_index.get("summary_reference", {})
-        if llm_type in summary_types:
-            purpose_list = summary_types[llm_type].get("purposes", [])
-            if not purpose_list or normalize_purpose(llm_purpose) in [
-                normalize_purpose(p) for p in purpose_list
-            ]:
-                return {
-                    "status": "correct",
-                    "match_type": "llm_only",
-                    "confidence": float(llm_result.get("confidence", 0.5)),
-                    "reason": "LLM classified document type matches summary taxonomy.",
-                    "matches": [],
-                    "llm_result": llm_result,
-                }
-
-    if content_text:
-        if not keyword_result:
-            keyword_result = keyword_classification(content_text, summary_index.get("summary_reference", {}))
-        if keyword_result.get("status") == "ok":
-            return {
-                "status": "correct",
-                "match_type": "content_keywords",
-                "confidence": float(keyword_result.get("confidence", 0.5)),
-                "reason": keyword_result.get("reason", "Keyword match from content."),
-                "matches": [],
-                "llm_result": llm_result,
-                "keyword_result": keyword_result,
-            }
-
-    filename_suggestions = top_fuzzy_matches(filename, summary_index["all_filenames_display"])
-    customer_suggestions = top_fuzzy_matches(subject_name, summary_index["all_customers_display"])
-
-    return {
-        "status": "not_found",
-        "match_type": "none",
-        "confidence": 0.0,
-        "reason": "No strong match found in certificate_summary.json.",
-        "matches": [],
-        "suggestions": {
-            "filename": filename_suggestions,
-            "customer": customer_suggestions,
-        },
-    }
-
-
 def perform_web_search(query: str, provider: str, api_key: str) -> Dict[str, Any]:
     if not query:
         return {"status": "skipped", "message": "Empty query."}
@@ -581,14 +273,27 @@ def run_flow(
     if content_only or llm_settings.get("enabled"):
         doc_text = extract_text_for_llm(uploaded_path)
 
+    # Cascade: cheap keyword / authority-pattern classification first,
+    # the LLM only when it is not decisive
+    prefilter = None
+    decided_by = None
+    if doc_text and llm_settings.get("keyword_prefilter", True):
+        prefilter = prefilter_classification(
+            doc_text,
+            summary_index.get("summary_reference", {}),
+            min_confidence=float(llm_settings.get("keyword_threshold", KEYWORD_DECISIVE_CONFIDENCE)),
+        )
+        decided_by = prefilter["decided_by"]
+
     llm_result = None
-    if llm_settings.get("enabled"):
+    if llm_settings.get("enabled") and not decided_by:
         if doc_text:
             llm_result = call_groq_classification(
                 model=llm_settings.get("model", DEFAULT_MODEL),
                 api_key=llm_settings.get("api_key", ""),
                 doc_text=doc_text,
                 summary_reference=summary_index.get("summary_reference", {}),
+                bypass_cache=bool(llm_settings.get("bypass_cache")),
             )
         else:
             llm_result = {"status": "error", "message": "No text extracted for LLM."}
@@ -596,10 +301,23 @@ def run_flow(
 
     keyword_result = None
     if doc_text:
-        keyword_result = keyword_classification(doc_text, summary_index.get("summary_reference", {}))
+        if prefilter:
+            keyword_result = prefilter["keyword_result"]
+        else:
+            keyword_result = keyword_classification(doc_text, summary_index.get("summary_reference", {}))
         results["keyword_result"] = keyword_result
 
-    chosen_classification = choose_classification(llm_result, keyword_result)
+    if decided_by:
+        results["prefilter_result"] = prefilter["classification"]
+        # Authority documents are never certificates: no classification to choose
+        chosen_classification = prefilter["classification"] if decided_by == "keywords" else None
+    else:
+        chosen_classification = choose_classification(llm_result, keyword_result)
+        if chosen_classification and chosen_classification == llm_result:
+            decided_by = "llm"
+        elif chosen_classification:
+            decided_by = "keywords_after_llm" if llm_result else "keywords"
+    results["decided_by"] = decided_by
     intent_override = derive_intent_override(chosen_classification) if chosen_classification else None
     if intent_override:
         intent = CertificateIntentCapture.capture_intent_from_params(
@@ -740,6 +458,9 @@ def main() -> None:
     st.write("Streamlit UI for phases 1-11, dataset matching, and optional web search stub.")
     st.info("Note: OCR requires Tesseract + Poppler installed on your system.")
 
+    if TextExtractor.cache is None:
+        TextExtractor.configure_cache(EXTRACTION_CACHE_DIR)
+
     st.sidebar.header("Settings")
     with st.sidebar.expander("Dataset settings", expanded=False):
         summary_path = st.text_input("certificate_summary.json path", DEFAULT_SUMMARY_PATH)
@@ -749,13 +470,37 @@ def main() -> None:
         load_dotenv()
         groq_api_key = os.getenv("GROQ_API_KEY", "")
         llm_model = st.sidebar.text_input("Groq model", value=DEFAULT_MODEL)
+        keyword_prefilter = st.sidebar.checkbox(
+            "Skip the LLM when keywords are decisive",
+            value=True,
+        )
+        keyword_threshold = st.sidebar.slider(
+            "Keyword confidence needed to skip the LLM",
+            min_value=0.3,
+            max_value=0.8,
+            value=KEYWORD_DECISIVE_CONFIDENCE,
+            step=0.1,
+            disabled=not keyword_prefilter,
+        )
+        bypass_llm_cache = st.sidebar.checkbox("Bypass LLM response cache", value=False)
         if groq_api_key:
             st.sidebar.caption("GROQ API key loaded from .env")
+            gateway = get_gateway(groq_api_key)
+            if gateway.cache is None:
+                gateway.configure_cache(LLM_CACHE_PATH)
+            cache_stats = gateway.cache.get_stats()
+            st.sidebar.caption(
+                f"LLM cache: {cache_stats['entries']} entries, "
+                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+            )
         else:
             st.sidebar.warning("GROQ API key not found in .env")
     else:
         groq_api_key = ""
         llm_model = DEFAULT_MODEL
+        keyword_prefilter = True
+        keyword_threshold = KEYWORD_DECISIVE_CONFIDENCE
+        bypass_llm_cache = False
     enable_search = st.sidebar.checkbox("Enable web search fallback (stub)", value=False)
     if enable_search:
         search_provider = st.sidebar.selectbox("Search provider", ["none", "serpapi", "bing"])
@@ -769,14 +514,19 @@ def main() -> None:
         st.error(f"Summary file not found: {summary_path}")
         st.stop()
 
-    summary_data = load_summary(summary_path)
-    summary_index = build_summary_index(summary_data)
-    summary_index["summary_reference"] = build_llm_reference(summary_data)
+    # Shared, read-only summary structures: reloaded when the file's mtime changes
+    summary_store = get_summary_store(summary_path)
+    if st.sidebar.button("Reload summary"):
+        summary_store = reload_summary_store(summary_path)
+    summary_index = summary_store.summary_index
+    # Keyword patterns are compiled once per summary version and reused by every classification
+    get_keyword_index(summary_store.summary_reference)
 
     st.sidebar.markdown("### Summary stats")
-    st.sidebar.write(f"Total entries: {len(summary_index['entries'])}")
-    st.sidebar.write(f"Certificates: {len([e for e in summary_index['entries'] if e['entry_type'] == 'certificate'])}")
-    st.sidebar.write(f"Non-certificates: {len([e for e in summary_index['entries'] if e['entry_type'] == 'non_certificate'])}")
+    summary_counts = summary_store.counts
+    st.sidebar.write(f"Total entries: {summary_counts['entries']}")
+    st.sidebar.write(f"Certificates: {summary_counts['certificates']}")
+    st.sidebar.write(f"Non-certificates: {summary_counts['non_certificates']}")
 
     st.subheader("Inputs")
     cert_types = CertificateIntentCapture.get_available_certificate_types()
@@ -877,6 +627,9 @@ def main() -> None:
         "enabled": enable_llm,
         "model": llm_model,
         "api_key": groq_api_key,
+        "keyword_prefilter": keyword_prefilter,
+        "keyword_threshold": keyword_threshold,
+        "bypass_cache": bypass_llm_cache,
     }
 
     try:
@@ -901,6 +654,11 @@ def main() -> None:
 
     st.subheader("Dataset match result")
     render_match_result(results.get("match", {}))
+    if results.get("decided_by"):
+        st.caption(f"Classification decided by: {results['decided_by']}")
+    if results.get("prefilter_result"):
+        st.write("Keyword prefilter classification:")
+        st.json(results["prefilter_result"])
     if results.get("intent_override"):
         override = results["intent_override"]
         st.info(
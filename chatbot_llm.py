@@ -1,16 +1,14 @@
 import json
 import os
 import re
-import unicodedata
-import difflib
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from uuid import uuid4
 
 import streamlit as st
 
 from dotenv import load_dotenv
-from groq import Groq
 
 from src.phase1_certificate_intent import CertificateIntentCapture
 from src.phase2_legal_requirements import LegalRequirementsEngine
@@ -30,14 +28,50 @@ from src.phase8_final_confirmation import FinalConfirmationEngine
 from src.phase9_certificate_generation import CertificateGenerator
 from src.phase10_notary_review import NotaryReviewSystem, ReviewStatus
 from src.phase11_final_output import FinalOutputGenerator
+from src.llm_gateway import estimate_text_tokens, get_gateway, pack_by_budget
+from src.taxonomy_context import get_taxonomy_context
+from src.keyword_classifier import (
+    KEYWORD_DECISIVE_CONFIDENCE,
+    get_keyword_index,
+    keyword_candidate_types,
+    normalize_text,
+    prefilter_classification,
+)
+from src.summary_matching import match_documents
+from src.summary_store import get_summary_store, reload_summary_store
 
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
 DEFAULT_SUMMARY_PATH = "cetificate from dataset/certificate_summary.json"
 DEFAULT_CERT_TYPE = "certificacion_de_firmas"
 DEFAULT_PURPOSE = "para_bps"
 DEFAULT_EXTRACTION_MODEL = "meta-llama/llama-4-maverick-17b-128e-instruct"
 DEFAULT_ANALYSIS_MODEL = "meta-llama/llama-4-scout-17b-16e-instruct"
 MAX_LLM_CHARS = 3000
+EXTRACTION_CACHE_DIR = os.path.join(APP_DIR, ".extraction_cache")
+EXTRACTION_MAX_WORKERS = 4
+LLM_CACHE_PATH = os.path.join(APP_DIR, ".llm_cache", "responses.sqlite")
+EXTRACTION_PROMPT_VERSION = "1"
+CLASSIFICATION_PROMPT_VERSION = "1"
+COMBINED_PROMPT_VERSION = "1"
+BATCH_CLASSIFICATION_PROMPT_VERSION = "1"
+
+
+# Batched classification: prompt tokens per request (category context included)
+# and completion tokens reserved per document in the reply
+CLASSIFICATION_BATCH_TOKEN_BUDGET = 4000
+CLASSIFICATION_REPLY_TOKENS = 120
+
+# Schema of the combined extraction + classification reply
+LLM_FIELD_KEYS = ("company_name", "rut", "ci", "registro_comercio", "acta_number", "padron_bps")
+LLM_LIST_KEYS = ("dates", "emails")
+CLASSIFICATION_SCHEMA = {
+    "is_certificate": (bool,),
+    "certificate_type": (str,),
+    "purpose": (str, type(None)),
+    "confidence": (int, float),
+    "reason": (str, type(None)),
+}
 
 
 def get_default_option(options: List[Dict[str, str]], value: str) -> Dict[str, str]:
@@ -47,16 +81,6 @@ def get_default_option(options: List[Dict[str, str]], value: str) -> Dict[str, s
     return options[0] if options else {"value": value, "label": value}
 
 
-def normalize_text(value: str) -> str:
-    if not value:
-        return ""
-    value = unicodedata.normalize("NFKD", value)
-    value = value.encode("ascii", "ignore").decode("ascii")
-    value = value.lower()
-    value = re.sub(r"[^a-z0-9]+", " ", value)
-    return re.sub(r"\s+", " ", value).strip()
-
-
 def parse_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     if not text:
         return None
@@ -72,6 +96,10 @@ def parse_json_from_text(text: str) -> Optional[Dict[str, Any]]:
     return data
 
 
+def is_json_reply(text: str) -> bool:
+    return parse_json_from_text(text) is not None
+
+
 def extract_text_for_llm(file_path: str) -> str:
     try:
         document = DocumentIntake.process_file(file_path)
@@ -124,18 +152,14 @@ def extract_text_without_ocr(document) -> Tuple[str, str, Optional[str]]:
 
     if format_value == "txt":
         try:
-            return TextExtractor.extract_from_text_file(file_path), "text", None
+            return TextExtractor.extract_document(document, ocr=False).raw_text, "text", None
         except Exception as exc:
             return "", "text", f"Text extraction failed: {exc}"
     if format_value == "pdf":
         try:
-            from PyPDF2 import PdfReader
-        except Exception as exc:
-            return "", "text", f"PyPDF2 is required for PDF extraction: {exc}"
-        try:
-            reader = PdfReader(str(file_path))
-            text_chunks = [page.extract_text() or "" for page in reader.pages]
-            return "\n".join(text_chunks).strip(), "text", None
+            return TextExtractor.extract_document(document, ocr=False).raw_text.strip(), "text", None
+        except ImportError as exc:
+            return "", "text", f"PyPDF2 or pdfplumber is required for PDF extraction: {exc}"
         except Exception as exc:
             return "", "text", f"PDF extraction failed: {exc}"
     if format_value == "docx":
@@ -165,13 +189,14 @@ def call_groq_extraction(
     api_key: str,
     doc_text: str,
     filename: str,
+    bypass_cache: bool = False,
 ) -> Dict[str, Any]:
     if not api_key:
         return {"status": "error", "message": "Missing GROQ_API_KEY."}
     if not doc_text.strip():
         return {"status": "error", "message": "No text provided for LLM extraction."}
 
-    client = Groq(api_key=api_key)
+    gateway = get_gateway(api_key)
     prompt = (
         "You extract structured data from notarial documents.\n"
         "Reply with JSON only (no Markdown).\n"
@@ -184,15 +209,17 @@ def call_groq_extraction(
     )
 
     try:
-        response = client.chat.completions.create(
+        content = gateway.chat(
             model=model,
             messages=[
                 {"role": "system", "content": "You are a precise data extraction engine."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.1,
+            prompt_version=EXTRACTION_PROMPT_VERSION,
+            bypass_cache=bypass_cache,
+            cacheable=is_json_reply,
         )
-        content = response.choices[0].message.content or ""
         parsed = parse_json_from_text(content)
         if parsed is not None:
             return parsed
@@ -205,6 +232,110 @@ def call_groq_extraction(
         return {"status": "error", "message": f"Groq request failed: {exc}"}
 
 
+def validate_classification(classification: Any, label: str = "classification") -> List[str]:
+    """Check one classification object against CLASSIFICATION_SCHEMA"""
+    if not isinstance(classification, dict):
+        return [f"'{label}' must be an object"]
+    errors = []
+    for key, types in CLASSIFICATION_SCHEMA.items():
+        if key not in classification and type(None) in types:
+            continue
+        if not isinstance(classification.get(key), types):
+            errors.append(f"{label}.{key} has the wrong type")
+    confidence = classification.get("confidence")
+    if isinstance(confidence, (int, float)) and not 0 <= confidence <= 1:
+        errors.append(f"{label}.confidence must be between 0 and 1")
+    return errors
+
+
+def validate_combined_payload(payload: Any) -> List[str]:
+    """Check a combined reply against the schema; returns the problems found"""
+    if not isinstance(payload, dict):
+        return ["reply is not a JSON object"]
+    errors = []
+    fields = payload.get("fields")
+    if not isinstance(fields, dict):
+        errors.append("'fields' must be an object")
+    else:
+        for key in LLM_FIELD_KEYS:
+            if not isinstance(fields.get(key), (str, int, float, type(None))):
+                errors.append(f"fields.{key} must be a string or null")
+        for key in LLM_LIST_KEYS:
+            if not isinstance(fields.get(key, []), (list, str, type(None))):
+                errors.append(f"fields.{key} must be a list")
+    errors.extend(validate_classification(payload.get("classification")))
+    return errors
+
+
+def parse_combined_reply(text: str) -> Optional[Dict[str, Any]]:
+    payload = parse_json_from_text(text)
+    if payload is None or validate_combined_payload(payload):
+        return None
+    return payload
+
+
+def call_groq_combined(
+    model: str,
+    api_key: str,
+    doc_text: str,
+    filename: str,
+    summary_reference: Dict[str, Any],
+    bypass_cache: bool = False,
+    candidate_types: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """Extract fields and classify a document in a single request"""
+    if not api_key:
+        return {"status": "error", "message": "Missing GROQ_API_KEY."}
+    if not doc_text.strip():
+        return {"status": "error", "message": "No text provided for LLM extraction."}
+
+    gateway = get_gateway(api_key)
+    prompt = (
+        "You extract structured data from Uruguayan notarial documents and classify them.\n"
+        "Reply with JSON only (no Markdown), shaped as:\n"
+        "{\"fields\": {company_name, rut, ci, registro_comercio, acta_number, padron_bps, dates, emails},\n"
+        " \"classification\": {is_certificate (true/false), certificate_type, purpose, confidence (0-1), reason}}\n"
+        "In fields use null when missing and [] for lists.\n"
+        "For the classification use ONLY the categories provided; "
+        "if non-certificate, set certificate_type='non_certificate'.\n\n"
+        "Categories (from certificate_summary.json):\n"
+        f"{build_category_context(summary_reference, candidate_types)}\n\n"
+        f"Filename: {filename}\n\n"
+        "Document text:\n"
+        f"{doc_text[:MAX_LLM_CHARS]}\n"
+    )
+
+    try:
+        content = gateway.chat(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a precise data extraction engine and document classifier."},
+                {"role": "user", "content": prompt},
+            ],
+            temperature=0.1,
+            response_format={"type": "json_object"},
+            prompt_version=COMBINED_PROMPT_VERSION,
+            bypass_cache=bypass_cache,
+            cacheable=lambda reply: parse_combined_reply(reply) is not None,
+        )
+    except Exception as exc:
+        return {"status": "error", "message": f"Groq request failed: {exc}"}
+
+    payload = parse_json_from_text(content)
+    if payload is None:
+        return {"status": "error", "message": "LLM did not return valid JSON.", "raw": content}
+    errors = validate_combined_payload(payload)
+    if errors:
+        return {
+            "status": "error",
+            "message": "LLM reply does not match the schema: " + "; ".join(errors),
+            "raw": content,
+        }
+    classification = dict(payload["classification"])
+    classification["status"] = "ok"
+    return {"status": "ok", "fields": payload["fields"], "classification": classification}
+
+
 def apply_llm_fields(extracted_data: ExtractedData, llm_payload: Dict[str, Any]) -> None:
     extracted_data.company_name = coerce_optional_str(llm_payload.get("company_name")) or extracted_data.company_name
     extracted_data.rut = coerce_optional_str(llm_payload.get("rut")) or extracted_data.rut
@@ -227,119 +358,175 @@ def apply_llm_fields(extracted_data: ExtractedData, llm_payload: Dict[str, Any])
 def apply_regex_fallback(extracted_data: ExtractedData, normalized_text: str) -> None:
     if not normalized_text:
         return
-    if not extracted_data.company_name:
-        extracted_data.company_name = DataExtractor.extract_company_name(normalized_text)
-    if not extracted_data.rut:
-        extracted_data.rut = DataExtractor.extract_rut(normalized_text)
-    if not extracted_data.ci:
-        extracted_data.ci = DataExtractor.extract_ci(normalized_text)
-    if not extracted_data.registro_comercio:
-        extracted_data.registro_comercio = DataExtractor.extract_registro_comercio(normalized_text)
-    if not extracted_data.acta_number:
-        extracted_data.acta_number = DataExtractor.extract_acta_number(normalized_text)
-    if not extracted_data.padron_bps:
-        extracted_data.padron_bps = DataExtractor.extract_padron_bps(normalized_text)
-    if not extracted_data.dates:
-        extracted_data.dates = DataExtractor.extract_dates(normalized_text)
-    if not extracted_data.emails:
-        extracted_data.emails = DataExtractor.extract_emails(normalized_text)
+    # One scan fills every field; only the ones the LLM left empty are used
+    matches = DataExtractor.scan(normalized_text)
+    regex_fields = DataExtractor.fields_from_matches(matches)
+    for name, value in regex_fields.items():
+        if not getattr(extracted_data, name):
+            setattr(extracted_data, name, value)
+    # Locates regex values and LLM values that appear verbatim in the text
+    extracted_data.record_field_spans(matches)
+
+
+def run_prefilter(doc_text: str, summary_reference: Dict[str, Any], llm_settings: Dict[str, Any]) -> Dict[str, Any]:
+    return prefilter_classification(
+        doc_text,
+        summary_reference,
+        min_confidence=float(llm_settings.get("keyword_threshold", KEYWORD_DECISIVE_CONFIDENCE)),
+    )
 
 
-def process_collection_with_llm(
-    collection,
+def uses_prefilter(llm_settings: Dict[str, Any]) -> bool:
+    return bool(llm_settings.get("keyword_prefilter", True))
+
+
+def process_document_with_llm(
+    document,
     llm_settings: Dict[str, str],
-) -> CollectionExtractionResult:
-    result = CollectionExtractionResult(collection=collection)
+    summary_reference: Optional[Dict[str, Any]] = None,
+) -> DocumentExtractionResult:
+    """
+    Extract one document. With a summary_reference and combined calls enabled,
+    fields and classification come from one request to the extraction model
+    (stored under additional_fields["llm_classification"]); if that reply fails the schema,
+    the extraction-only request is used and run_flow classifies separately.
+    Documents the keyword prefilter already decides (stored under
+    additional_fields["prefilter"]) only get the extraction request.
+    """
+    raw_text = ""
+    base_method = "none"
+    base_error = None
+    ocr_used = False
+    ocr_error = None
 
-    for document in collection.documents:
-        raw_text = ""
-        base_method = "none"
-        base_error = None
-        ocr_used = False
-        ocr_error = None
+    try:
+        raw_text, base_method, base_error = extract_text_without_ocr(document)
+    except Exception as exc:
+        base_error = str(exc)
 
-        try:
-            raw_text, base_method, base_error = extract_text_without_ocr(document)
-        except Exception as exc:
-            base_error = str(exc)
-
-        if not raw_text and llm_settings.get("ocr_fallback"):
-            file_format = getattr(document, "file_format", None)
-            if file_format in (FileFormat.PDF, FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG):
-                try:
-                    raw_text, extraction_method = TextExtractor.extract_text(document)
-                    base_method = extraction_method
-                    ocr_used = extraction_method == "ocr"
-                except Exception as exc:
-                    ocr_error = str(exc)
-
-        normalized_text = TextNormalizer.normalize_text(raw_text or "")
-        extraction_method = base_method if base_method in ("text", "ocr") else "none"
-        extracted_data = ExtractedData(
-            document_type=document.detected_type,
-            raw_text=raw_text or "",
-            normalized_text=normalized_text,
-            extraction_method=extraction_method,
-        )
+    if not raw_text and llm_settings.get("ocr_fallback"):
+        file_format = getattr(document, "file_format", None)
+        if file_format in (FileFormat.PDF, FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG):
+            try:
+                raw_text, extraction_method = TextExtractor.extract_text(document)
+                base_method = extraction_method
+                ocr_used = extraction_method == "ocr"
+            except Exception as exc:
+                ocr_error = str(exc)
+
+    normalized_text = TextNormalizer.normalize_text(raw_text or "")
+    extraction_method = base_method if base_method in ("text", "ocr") else "none"
+    extracted_data = ExtractedData.from_text(
+        document_type=document.detected_type,
+        raw_text=raw_text or "",
+        normalized_text=normalized_text,
+        extraction_method=extraction_method,
+    )
 
-        if not raw_text:
-            extracted_data.additional_fields["extraction_warning"] = (
-                "No text extracted. Enable OCR fallback to read scanned documents."
-            )
-            extracted_data.confidence = 0.2
-        else:
-            extracted_data.confidence = 0.7 if llm_settings.get("enabled") else 1.0
-        if base_error:
-            extracted_data.additional_fields["text_extraction_error"] = base_error
-        if ocr_error:
-            extracted_data.additional_fields["ocr_error"] = ocr_error
-        if ocr_used:
-            extracted_data.additional_fields["ocr_used"] = True
-
-        llm_payload = None
-        if llm_settings.get("enabled") and raw_text:
-            llm_payload = call_groq_extraction(
+    if not raw_text:
+        extracted_data.additional_fields["extraction_warning"] = (
+            "No text extracted. Enable OCR fallback to read scanned documents."
+        )
+        extracted_data.confidence = 0.2
+    else:
+        extracted_data.confidence = 0.7 if llm_settings.get("enabled") else 1.0
+    if base_error:
+        extracted_data.additional_fields["text_extraction_error"] = base_error
+    if ocr_error:
+        extracted_data.additional_fields["ocr_error"] = ocr_error
+    if ocr_used:
+        extracted_data.additional_fields["ocr_used"] = True
+
+    llm_payload = None
+    if llm_settings.get("enabled") and raw_text:
+        prefilter_decided = False
+        if summary_reference is not None and uses_prefilter(llm_settings):
+            prefilter = run_prefilter(normalized_text, summary_reference, llm_settings)
+            if prefilter["decided_by"]:
+                extracted_data.additional_fields["prefilter"] = prefilter
+                prefilter_decided = True
+        if (
+            summary_reference is not None
+            and llm_settings.get("combined_call", True)
+            and not prefilter_decided
+        ):
+            candidate_types = None
+            if llm_settings.get("compact_context", True):
+                candidate_types = keyword_candidate_types(normalized_text, summary_reference)
+            # One completion does both jobs, so it runs on the extraction model:
+            # field extraction is the accuracy-critical half of the reply
+            combined = call_groq_combined(
                 model=llm_settings.get("extraction_model", DEFAULT_EXTRACTION_MODEL),
                 api_key=llm_settings.get("api_key", ""),
                 doc_text=raw_text,
                 filename=document.file_name,
+                summary_reference=summary_reference,
+                bypass_cache=bool(llm_settings.get("bypass_cache")),
+                candidate_types=candidate_types,
             )
-            if llm_payload.get("status") == "error":
-                extracted_data.additional_fields["llm_extraction_error"] = llm_payload.get("message")
+            if combined.get("status") == "ok":
+                llm_payload = combined["fields"]
+                extracted_data.additional_fields["llm_classification"] = combined["classification"]
             else:
-                apply_llm_fields(extracted_data, llm_payload)
-                extracted_data.additional_fields["llm_extraction"] = llm_payload
-
-        apply_regex_fallback(extracted_data, normalized_text)
-
-        result.extraction_results.append(
-            DocumentExtractionResult(
-                document=document,
-                extracted_data=extracted_data,
-                success=True,
+                extracted_data.additional_fields["llm_combined_error"] = combined.get("message")
+        if llm_payload is None:
+            llm_payload = call_groq_extraction(
+                model=llm_settings.get("extraction_model", DEFAULT_EXTRACTION_MODEL),
+                api_key=llm_settings.get("api_key", ""),
+                doc_text=raw_text,
+                filename=document.file_name,
+                bypass_cache=bool(llm_settings.get("bypass_cache")),
             )
-        )
+        if llm_payload.get("status") == "error":
+            extracted_data.additional_fields["llm_extraction_error"] = llm_payload.get("message")
+        else:
+            apply_llm_fields(extracted_data, llm_payload)
+            extracted_data.additional_fields["llm_extraction"] = llm_payload
 
-    return result
+    apply_regex_fallback(extracted_data, normalized_text)
 
+    return DocumentExtractionResult(
+        document=document,
+        extracted_data=extracted_data,
+        success=True,
+    )
 
-def normalize_purpose(value: str) -> str:
-    if not value:
-        return ""
-    value = value.lower()
-    value = value.replace("para_", "").replace("_", " ")
-    return normalize_text(value)
 
+def process_collection_with_llm(
+    collection,
+    llm_settings: Dict[str, str],
+    max_workers: int = EXTRACTION_MAX_WORKERS,
+    progress_callback: Optional[Callable[[int, int, DocumentExtractionResult], None]] = None,
+    summary_reference: Optional[Dict[str, Any]] = None,
+) -> CollectionExtractionResult:
+    # Documents are independent and mostly wait on file reads and Groq,
+    # so they run on threads (OCR itself goes to the shared OCR process pool).
+    result = CollectionExtractionResult(collection=collection)
+    documents = collection.documents
+    results: List[Optional[DocumentExtractionResult]] = [None] * len(documents)
+    if not documents:
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(documents)))) as executor:
+        futures = {
+            executor.submit(process_document_with_llm, document, llm_settings, summary_reference): index
+            for index, document in enumerate(documents)
+        }
+        for completed, future in enumerate(as_completed(futures), start=1):
+            index = futures[future]
+            try:
+                results[index] = future.result()
+            except Exception as exc:
+                results[index] = DocumentExtractionResult(
+                    document=documents[index],
+                    error=str(exc),
+                    success=False,
+                )
+            if progress_callback:
+                progress_callback(completed, len(documents), results[index])
 
-def make_filename_keys(filename: str) -> List[str]:
-    if not filename:
-        return []
-    path = Path(filename)
-    keys = {
-        normalize_text(path.name),
-        normalize_text(path.stem),
-    }
-    return [key for key in keys if key]
+    result.extraction_results.extend(results)
+    return result
 
 
 def detect_pan_card_hint(doc_text: str) -> Optional[str]:
@@ -355,65 +542,6 @@ def detect_pan_card_hint(doc_text: str) -> Optional[str]:
     return None
 
 
-@st.cache_data(show_spinner=False)
-def build_llm_reference(summary: Dict[str, Any]) -> Dict[str, Any]:
-    reference = {}
-    for cert_type, info in summary.get("identified_certificate_types", {}).items():
-        reference[cert_type] = {
-            "count": info.get("count", 0),
-            "purposes": list(info.get("purposes", {}).keys()),
-            "attributes": info.get("attributes", []),
-            "examples": info.get("examples", [])[:3],
-        }
-    return reference
-
-
-def keyword_classification(doc_text: str, summary_reference: Dict[str, Any]) -> Dict[str, Any]:
-    text_norm = normalize_text(doc_text)
-    if not text_norm:
-        return {"status": "error", "message": "No text for keyword classification."}
-
-    best_type = None
-    best_score = 0
-    matched_attrs: List[str] = []
-
-    for cert_type, info in summary_reference.items():
-        attrs = [normalize_text(attr) for attr in info.get("attributes", [])]
-        score = 0
-        hits = []
-        for attr in attrs:
-            if attr and attr in text_norm:
-                score += 1
-                hits.append(attr)
-        if score > best_score:
-            best_score = score
-            best_type = cert_type
-            matched_attrs = hits
-
-    detected_purpose = ""
-    for cert_type, info in summary_reference.items():
-        for purpose in info.get("purposes", []):
-            purpose_norm = normalize_purpose(purpose)
-            if purpose_norm and purpose_norm in text_norm:
-                detected_purpose = purpose
-                break
-        if detected_purpose:
-            break
-
-    if best_type and best_score > 0:
-        confidence = min(0.8, 0.2 + 0.1 * best_score)
-        return {
-            "status": "ok",
-            "is_certificate": True,
-            "certificate_type": best_type,
-            "purpose": detected_purpose or "",
-            "confidence": confidence,
-            "reason": f"Matched attributes: {', '.join(matched_attrs)}" if matched_attrs else "Matched attributes.",
-        }
-
-    return {"status": "error", "message": "No keyword match found."}
-
-
 def map_summary_type_to_intent(cert_type: str) -> str:
     cert_norm = normalize_text(cert_type)
     if "firma" in cert_norm:
@@ -527,24 +655,30 @@ def choose_intent_override(
     return result
 
 
+def build_category_context(
+    summary_reference: Dict[str, Any],
+    candidate_types: Optional[List[str]] = None,
+) -> str:
+    # Compiled once per summary version; candidate types select the compact variant
+    taxonomy = get_taxonomy_context(summary_reference)
+    if candidate_types:
+        return taxonomy.compact(candidate_types)
+    return taxonomy.text
+
+
 def call_groq_classification(
     model: str,
     api_key: str,
     doc_text: str,
     summary_reference: Dict[str, Any],
+    bypass_cache: bool = False,
+    candidate_types: Optional[List[str]] = None,
 ) -> Dict[str, Any]:
     if not api_key:
         return {"status": "error", "message": "Missing GROQ_API_KEY."}
 
-    client = Groq(api_key=api_key)
-    context_lines = []
-    for cert_type, info in summary_reference.items():
-        purposes = ", ".join(info.get("purposes", [])) or "none"
-        examples = "; ".join(info.get("examples", [])) or "none"
-        context_lines.append(
-            f"- {cert_type}: purposes={purposes}; examples={examples}"
-        )
-    context_text = "\n".join(context_lines)
+    gateway = get_gateway(api_key)
+    context_text = build_category_context(summary_reference, candidate_types)
 
     prompt = (
         "You classify Uruguayan notarial documents.\n"
@@ -560,15 +694,17 @@ def call_groq_classification(
     )
 
     try:
-        response = client.chat.completions.create(
+        content = gateway.chat(
             model=model,
             messages=[
                 {"role": "system", "content": "You are a precise document classifier."},
                 {"role": "user", "content": prompt},
             ],
             temperature=0.1,
+            prompt_version=CLASSIFICATION_PROMPT_VERSION,
+            bypass_cache=bypass_cache,
+            cacheable=is_json_reply,
         )
-        content = response.choices[0].message.content or ""
         parsed = parse_json_from_text(content)
         if parsed is not None:
             return parsed
@@ -584,236 +720,148 @@ def call_groq_classification(
         }
 
 
-@st.cache_data(show_spinner=False)
-def load_summary(path: str) -> Dict[str, Any]:
-    with open(path, "r", encoding="utf-8") as handle:
-        return json.load(handle)
-
-
-@st.cache_data(show_spinner=False)
-def build_summary_index(summary: Dict[str, Any]) -> Dict[str, Any]:
-    entries: List[Dict[str, Any]] = []
-
-    for group, group_entries in summary.get("certificate_file_mapping", {}).items():
-        for entry in group_entries:
-            item = dict(entry)
-            item["group"] = group
-            item["entry_type"] = "certificate"
-            entries.append(item)
-
-    for entry in summary.get("non_certificate_documents", []):
-        item = dict(entry)
-        item["group"] = "non_certificate"
-        item["entry_type"] = "non_certificate"
-        entries.append(item)
-
-    filename_index: Dict[str, List[Dict[str, Any]]] = {}
-    customer_index: Dict[str, List[Dict[str, Any]]] = {}
-    all_filenames_display: List[str] = []
-    all_customers_display: List[str] = []
-
-    for entry in entries:
-        filename = entry.get("filename") or entry.get("path") or ""
-        if filename:
-            all_filenames_display.append(filename)
-        for key in make_filename_keys(filename):
-            filename_index.setdefault(key, []).append(entry)
-
-        customer = entry.get("customer") or ""
-        if customer:
-            all_customers_display.append(customer)
-        customer_key = normalize_text(customer)
-        if customer_key:
-            customer_index.setdefault(customer_key, []).append(entry)
-
-    return {
-        "entries": entries,
-        "filename_index": filename_index,
-        "customer_index": customer_index,
-        "all_filenames_display": sorted(set(all_filenames_display)),
-        "all_customers_display": sorted(set(all_customers_display)),
-    }
-
-
-def is_certificate_entry(entry: Dict[str, Any]) -> bool:
-    return entry.get("entry_type") == "certificate"
-
-
-def entry_has_error(entry: Dict[str, Any]) -> bool:
-    return bool(entry.get("error_flag"))
-
-
-def purpose_matches(entry_purpose: str, user_purpose: str) -> bool:
-    if not entry_purpose or not user_purpose:
-        return False
-    entry_norm = normalize_purpose(entry_purpose)
-    user_norm = normalize_purpose(user_purpose)
-    if not entry_norm or not user_norm:
-        return False
-    return entry_norm == user_norm or entry_norm in user_norm or user_norm in entry_norm
+def parse_batch_reply(text: str, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Valid per-document classifications from a batch reply, keyed by document id"""
+    payload = parse_json_from_text(text)
+    if not isinstance(payload, dict):
+        return {}
+    results = {}
+    for doc_id in doc_ids:
+        classification = payload.get(doc_id)
+        if not validate_classification(classification, doc_id):
+            classification = dict(classification)
+            classification["status"] = "ok"
+            results[doc_id] = classification
+    return results
 
 
-def top_fuzzy_matches(query: str, candidates: List[str], limit: int = 5) -> List[Tuple[str, float]]:
-    query_norm = normalize_text(query)
-    if not query_norm:
-        return []
-    scored = []
-    for candidate in candidates:
-        candidate_norm = normalize_text(candidate)
-        ratio = difflib.SequenceMatcher(None, query_norm, candidate_norm).ratio()
-        scored.append((candidate, ratio))
-    scored.sort(key=lambda item: item[1], reverse=True)
-    return [(cand, score) for cand, score in scored[:limit] if score > 0]
-
-
-def dedupe_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    seen = set()
-    unique = []
-    for entry in entries:
-        key = (entry.get("customer"), entry.get("filename"), entry.get("path"))
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(entry)
-    return unique
+def call_groq_classification_batch(
+    model: str,
+    api_key: str,
+    doc_texts: Dict[str, str],
+    summary_reference: Dict[str, Any],
+    bypass_cache: bool = False,
+    candidate_types: Optional[List[str]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Classify several documents in one request, keyed by document id.
+    Documents missing from the reply (or with invalid entries) are left out.
+    """
+    gateway = get_gateway(api_key)
+    doc_ids = list(doc_texts)
+    documents_text = "\n\n".join(
+        f"=== Document {doc_id} ===\n{doc_texts[doc_id][:MAX_LLM_CHARS]}"
+        for doc_id in doc_ids
+    )
+    prompt = (
+        "You classify Uruguayan notarial documents.\n"
+        "Use ONLY the categories provided. Reply with JSON only.\n"
+        "Do not use Markdown or code fences.\n\n"
+        "Categories (from certificate_summary.json):\n"
+        f"{build_category_context(summary_reference, candidate_types)}\n\n"
+        "Return one JSON object keyed by document id "
+        f"({', '.join(doc_ids)}); each value has keys:\n"
+        "is_certificate (true/false), certificate_type, purpose, confidence (0-1), reason.\n"
+        "If non-certificate, set certificate_type='non_certificate'.\n\n"
+        f"{documents_text}\n"
+    )
 
+    content = gateway.chat(
+        model=model,
+        messages=[
+            {"role": "system", "content": "You are a precise document classifier."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.1,
+        max_tokens=CLASSIFICATION_REPLY_TOKENS * len(doc_ids),
+        response_format={"type": "json_object"},
+        prompt_version=BATCH_CLASSIFICATION_PROMPT_VERSION,
+        bypass_cache=bypass_cache,
+        cacheable=lambda reply: len(parse_batch_reply(reply, doc_ids)) == len(doc_ids),
+    )
+    return parse_batch_reply(content, doc_ids)
 
-def match_document(
-    filename: str,
-    subject_name: str,
-    extracted_company: Optional[str],
-    purpose_value: str,
-    summary_index: Dict[str, Any],
-    llm_result: Optional[Dict[str, Any]] = None,
-    keyword_result: Optional[Dict[str, Any]] = None,
-    content_text: str = "",
-    content_only: bool = False,
-) -> Dict[str, Any]:
-    if not content_only:
-        filename_keys = make_filename_keys(filename)
-        matched_entries: List[Dict[str, Any]] = []
-
-        for key in filename_keys:
-            matched_entries.extend(summary_index["filename_index"].get(key, []))
-
-        matched_entries = dedupe_entries(matched_entries)
-
-        if matched_entries:
-            cert_entries = [e for e in matched_entries if is_certificate_entry(e)]
-            non_cert_entries = [e for e in matched_entries if not is_certificate_entry(e)]
-            if cert_entries:
-                if any(entry_has_error(entry) for entry in cert_entries):
-                    return {
-                        "status": "not_found",
-                        "match_type": "filename_error",
-                        "confidence": 0.6,
-                        "reason": "Filename matched, but entry is flagged as error in dataset.",
-                        "matches": cert_entries,
-                    }
-                return {
-                    "status": "correct",
-                    "match_type": "filename",
-                    "confidence": 1.0,
-                    "reason": "Exact filename match found in certificate dataset.",
-                    "matches": cert_entries,
-                }
-            if non_cert_entries:
-                if llm_result and llm_result.get("is_certificate") is True:
-                    return {
-                        "status": "needs_review",
-                        "match_type": "filename_non_certificate_llm_conflict",
-                        "confidence": 0.6,
-                        "reason": "Filename is non-certificate, but LLM classified as certificate.",
-                        "matches": non_cert_entries,
-                        "llm_result": llm_result,
-                    }
-                return {
-                    "status": "not_found",
-                    "match_type": "filename_non_certificate",
-                    "confidence": 0.8,
-                    "reason": "Filename matched, but document is classified as non-certificate.",
-                    "matches": non_cert_entries,
-                }
 
-    customer_keys = []
-    if subject_name:
-        customer_keys.append(normalize_text(subject_name))
-    if extracted_company and normalize_text(extracted_company) not in customer_keys:
-        customer_keys.append(normalize_text(extracted_company))
-
-    customer_matches: List[Dict[str, Any]] = []
-    for key in customer_keys:
-        customer_matches.extend(summary_index["customer_index"].get(key, []))
-    customer_matches = dedupe_entries(customer_matches)
-
-    if customer_matches:
-        purpose_matches_entries = [
-            entry for entry in customer_matches
-            if purpose_matches(entry.get("purpose", ""), purpose_value)
-        ]
-        cert_entries = [e for e in purpose_matches_entries if is_certificate_entry(e)]
-        if cert_entries:
-            return {
-                "status": "correct",
-                "match_type": "customer_purpose",
-                "confidence": 0.7,
-                "reason": "Customer and purpose match found in certificate dataset.",
-                "matches": cert_entries,
-            }
-        return {
-            "status": "not_found",
-            "match_type": "customer_only",
-            "confidence": 0.5,
-            "reason": "Customer match found, but no purpose match for this document.",
-            "matches": customer_matches[:5],
-        }
+def classify_documents_batched(
+    model: str,
+    api_key: str,
+    doc_texts: Dict[str, str],
+    summary_reference: Dict[str, Any],
+    token_budget: int = CLASSIFICATION_BATCH_TOKEN_BUDGET,
+    bypass_cache: bool = False,
+    candidate_types: Optional[Dict[str, List[str]]] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Classify many documents with as few requests as the token budget allows.
+
+    Documents are packed in order into batches that share one copy of the
+    category context. A batch whose reply fails is split in half and retried;
+    documents missing from an otherwise good reply are retried on their own
+    batch; single documents use call_groq_classification.
+
+    candidate_types (per document key) selects the compact context: a batch
+    gets the union of its documents' candidates, or the full context if any
+    document has none.
+    """
+    if not api_key:
+        return {key: {"status": "error", "message": "Missing GROQ_API_KEY."} for key in doc_texts}
 
-    if llm_result and llm_result.get("is_certificate") is True:
-        llm_type = llm_result.get("certificate_type", "")
-        llm_purpose = llm_result.get("purpose", "")
-        summary_types = summary_index.get("summary_reference", {})
-        if llm_type in summary_types:
-            purpose_list = summary_types[llm_type].get("purposes", [])
-            if not purpose_list or normalize_purpose(llm_purpose) in [
-                normalize_purpose(p) for p in purpose_list
-            ]:
-                return {
-                    "status": "correct",
-                    "match_type": "llm_only",
-                    "confidence": float(llm_result.get("confidence", 0.5)),
-                    "reason": "LLM classified document type matches summary taxonomy.",
-                    "matches": [],
-                    "llm_result": llm_result,
-                }
+    gateway = get_gateway(api_key)
+    # Budget against the full context; compact batches only come in under it
+    context_tokens = get_taxonomy_context(summary_reference).token_count + 150  # Instructions
+    candidate_types = candidate_types or {}
+    keys = list(doc_texts)
+    doc_ids = {key: f"doc{index}" for index, key in enumerate(keys, start=1)}
 
-    if content_text:
-        if not keyword_result:
-            keyword_result = keyword_classification(content_text, summary_index.get("summary_reference", {}))
-        if keyword_result.get("status") == "ok":
-            return {
-                "status": "correct",
-                "match_type": "content_keywords",
-                "confidence": float(keyword_result.get("confidence", 0.5)),
-                "reason": keyword_result.get("reason", "Keyword match from content."),
-                "matches": [],
-                "llm_result": llm_result,
-                "keyword_result": keyword_result,
-            }
-
-    filename_suggestions = top_fuzzy_matches(filename, summary_index["all_filenames_display"])
-    customer_suggestions = top_fuzzy_matches(subject_name, summary_index["all_customers_display"])
+    def batch_candidates(batch: List[str]) -> Optional[List[str]]:
+        if not all(candidate_types.get(key) for key in batch):
+            return None
+        return sorted({cert_type for key in batch for cert_type in candidate_types[key]})
+
+    def classify_batch(batch: List[str]) -> Dict[str, Dict[str, Any]]:
+        if len(batch) == 1:
+            key = batch[0]
+            return {key: call_groq_classification(
+                model=model,
+                api_key=api_key,
+                doc_text=doc_texts[key],
+                summary_reference=summary_reference,
+                bypass_cache=bypass_cache,
+                candidate_types=candidate_types.get(key),
+            )}
+        try:
+            by_id = call_groq_classification_batch(
+                model=model,
+                api_key=api_key,
+                doc_texts={doc_ids[key]: doc_texts[key] for key in batch},
+                summary_reference=summary_reference,
+                bypass_cache=bypass_cache,
+                candidate_types=batch_candidates(batch),
+            )
+        except Exception:
+            by_id = {}  # e.g. request too large: split below
+
+        results = {key: by_id[doc_ids[key]] for key in batch if doc_ids[key] in by_id}
+        missing = [key for key in batch if key not in results]
+        if not missing:
+            return results
+        if len(missing) == len(batch):
+            middle = len(batch) // 2
+            results.update(classify_batch(batch[:middle]))
+            results.update(classify_batch(batch[middle:]))
+        else:
+            results.update(classify_batch(missing))
+        return results
 
-    return {
-        "status": "not_found",
-        "match_type": "none",
-        "confidence": 0.0,
-        "reason": "No strong match found in certificate_summary.json.",
-        "matches": [],
-        "suggestions": {
-            "filename": filename_suggestions,
-            "customer": customer_suggestions,
-        },
-    }
+    batches = pack_by_budget(
+        keys,
+        cost=lambda key: estimate_text_tokens(doc_texts[key][:MAX_LLM_CHARS]) + CLASSIFICATION_REPLY_TOKENS,
+        budget=max(1, token_budget - context_tokens),
+    )
+    results: Dict[str, Dict[str, Any]] = {}
+    for batch_results in gateway.map(classify_batch, batches):
+        results.update(batch_results)
+    return results
 
 
 def perform_web_search(query: str, provider: str, api_key: str) -> Dict[str, Any]:
@@ -845,6 +893,7 @@ def run_flow(
     search_settings: Dict[str, str],
     llm_settings: Dict[str, str],
     content_only: bool,
+    progress_callback: Optional[Callable[[int, int, DocumentExtractionResult], None]] = None,
 ) -> Dict[str, Any]:
     results: Dict[str, Any] = {}
 
@@ -862,7 +911,13 @@ def run_flow(
     file_paths = [item["path"] for item in uploaded_files]
     collection = DocumentIntake.add_files_to_collection(collection, file_paths)
 
-    extraction = process_collection_with_llm(collection, llm_settings)
+    summary_reference = summary_index.get("summary_reference", {})
+    extraction = process_collection_with_llm(
+        collection,
+        llm_settings,
+        progress_callback=progress_callback,
+        summary_reference=summary_reference,
+    )
     results["phase4"] = extraction.get_summary()
 
     extracted_company = extract_company_name(extraction)
@@ -878,13 +933,11 @@ def run_flow(
 
     per_file_data: Dict[str, Dict[str, Any]] = {}
     intent_candidates: List[Dict[str, Any]] = []
-    summary_reference = summary_index.get("summary_reference", {})
 
+    doc_texts: Dict[str, str] = {}
     for file_info in uploaded_files:
         path = file_info["path"]
-        original_filename = file_info["filename"]
         extraction_result = extraction_by_path.get(path)
-
         doc_text = ""
         if content_only or llm_settings.get("enabled"):
             if (
@@ -897,38 +950,110 @@ def run_flow(
                     or extraction_result.extracted_data.raw_text
                     or ""
                 )
+        doc_texts[path] = doc_text
 
-        llm_result = None
-        if llm_settings.get("enabled"):
-            if doc_text:
-                llm_result = call_groq_classification(
-                    model=llm_settings.get("analysis_model", DEFAULT_ANALYSIS_MODEL),
-                    api_key=llm_settings.get("api_key", ""),
-                    doc_text=doc_text,
-                    summary_reference=summary_reference,
-                )
+    # Cascade: cheap keyword / authority-pattern classification first,
+    # the LLM only for documents it leaves undecided
+    prefilters: Dict[str, Dict[str, Any]] = {}
+    for path, doc_text in doc_texts.items():
+        if not doc_text:
+            continue
+        extraction_result = extraction_by_path.get(path)
+        stored = None
+        if extraction_result and extraction_result.extracted_data:
+            stored = extraction_result.extracted_data.additional_fields.get("prefilter")
+        prefilters[path] = stored or run_prefilter(doc_text, summary_reference, llm_settings)
+    decided_paths = set()
+    if uses_prefilter(llm_settings):
+        decided_paths = {path for path, prefilter in prefilters.items() if prefilter["decided_by"]}
+
+    candidate_types: Dict[str, List[str]] = {}
+    if llm_settings.get("compact_context", True):
+        candidate_types = {
+            path: keyword_candidate_types(doc_text, summary_reference)
+            for path, doc_text in doc_texts.items()
+            if doc_text
+        }
+
+    def classify_with_llm(path: str) -> Dict[str, Any]:
+        return call_groq_classification(
+            model=llm_settings.get("analysis_model", DEFAULT_ANALYSIS_MODEL),
+            api_key=llm_settings.get("api_key", ""),
+            doc_text=doc_texts[path],
+            summary_reference=summary_reference,
+            bypass_cache=bool(llm_settings.get("bypass_cache")),
+            candidate_types=candidate_types.get(path),
+        )
+
+    llm_results: Dict[str, Any] = {}
+    if llm_settings.get("enabled"):
+        pending = []
+        for file_info in uploaded_files:
+            path = file_info["path"]
+            extraction_result = extraction_by_path.get(path)
+            combined = None
+            if extraction_result and extraction_result.extracted_data:
+                # Already classified by the combined extraction call
+                combined = extraction_result.extracted_data.additional_fields.get("llm_classification")
+            if combined:
+                llm_results[path] = combined
+            elif path in decided_paths:
+                continue
+            elif not doc_texts[path]:
+                llm_results[path] = {"status": "error", "message": "No text extracted for LLM."}
             else:
-                llm_result = {"status": "error", "message": "No text extracted for LLM."}
+                pending.append(path)
 
-        keyword_result = None
-        if doc_text:
-            keyword_result = keyword_classification(doc_text, summary_reference)
+        if len(pending) > 1 and llm_settings.get("batch_classification", True):
+            llm_results.update(classify_documents_batched(
+                model=llm_settings.get("analysis_model", DEFAULT_ANALYSIS_MODEL),
+                api_key=llm_settings.get("api_key", ""),
+                doc_texts={path: doc_texts[path] for path in pending},
+                summary_reference=summary_reference,
+                bypass_cache=bool(llm_settings.get("bypass_cache")),
+                candidate_types=candidate_types,
+            ))
+        elif pending:
+            # Classification calls are independent: fan them out, the gateway keeps them within rate limits
+            gateway = get_gateway(llm_settings.get("api_key", ""))
+            llm_results.update(zip(pending, gateway.map(classify_with_llm, pending)))
 
-        chosen_classification = choose_classification(llm_result, keyword_result)
+    for file_info in uploaded_files:
+        path = file_info["path"]
+        original_filename = file_info["filename"]
+        doc_text = doc_texts[path]
+        llm_result = llm_results.get(path)
+        prefilter = prefilters.get(path, {})
+        keyword_result = prefilter.get("keyword_result")
+
+        chosen_classification = None
         chosen_source = None
-        if chosen_classification:
-            if llm_result and chosen_classification == llm_result:
-                chosen_source = "llm"
-            elif keyword_result and chosen_classification == keyword_result:
+        decided_by = None
+        if path in decided_paths:
+            decided_by = prefilter["decided_by"]
+            if decided_by == "keywords":
+                # Authority documents are never certificates: no classification to choose
+                chosen_classification = prefilter["classification"]
                 chosen_source = "keywords"
+        else:
+            chosen_classification = choose_classification(llm_result, keyword_result)
+            if chosen_classification:
+                if llm_result and chosen_classification == llm_result:
+                    chosen_source = "llm"
+                    decided_by = "llm"
+                elif keyword_result and chosen_classification == keyword_result:
+                    chosen_source = "keywords"
+                    decided_by = "keywords_after_llm" if llm_result else "keywords"
 
         per_file_data[path] = {
             "filename": original_filename,
             "doc_text": doc_text,
             "llm_result": llm_result,
             "keyword_result": keyword_result,
+            "prefilter_result": prefilter.get("classification") if path in decided_paths else None,
             "chosen_classification": chosen_classification,
             "chosen_source": chosen_source,
+            "decided_by": decided_by,
         }
 
         if chosen_classification:
@@ -979,8 +1104,23 @@ def run_flow(
         if doc_validation.document_type
     }
 
-    file_results = []
+    # Every file shares the customer and purpose: match them as one batch
+    match_inputs = []
     for file_info in uploaded_files:
+        per_file = per_file_data.get(file_info["path"], {})
+        match_inputs.append({
+            "filename": file_info["filename"],
+            "subject_name": intent.subject_name,
+            "extracted_company": extracted_company,
+            "purpose_value": intent.purpose.value,
+            "llm_result": per_file.get("llm_result"),
+            "keyword_result": per_file.get("keyword_result"),
+            "content_text": per_file.get("doc_text", ""),
+        })
+    match_results = match_documents(match_inputs, summary_index=summary_index, content_only=content_only)
+
+    file_results = []
+    for file_info, match_result in zip(uploaded_files, match_results):
         path = file_info["path"]
         original_filename = file_info["filename"]
         doc = documents_by_path.get(path)
@@ -991,18 +1131,6 @@ def run_flow(
         keyword_result = per_file.get("keyword_result")
         chosen_classification = per_file.get("chosen_classification")
 
-        match_result = match_document(
-            filename=original_filename,
-            subject_name=intent.subject_name,
-            extracted_company=extracted_company,
-            purpose_value=intent.purpose.value,
-            summary_index=summary_index,
-            llm_result=llm_result,
-            keyword_result=keyword_result,
-            content_text=doc_text,
-            content_only=content_only,
-        )
-
         validation_status = "unknown"
         validation_reason = "No validation available."
         validation_issues = []
@@ -1061,9 +1189,13 @@ def run_flow(
                 )
 
         extra_type_hint = detect_pan_card_hint(doc_text)
+        prefilter_result = per_file.get("prefilter_result")
         doc_type_label = "unknown"
         doc_type_source = "content_missing"
-        if llm_result and llm_result.get("status") != "error":
+        if prefilter_result:
+            doc_type_label = prefilter_result.get("certificate_type") or doc_type_label
+            doc_type_source = "content"
+        elif llm_result and llm_result.get("status") != "error":
             llm_type = llm_result.get("certificate_type")
             if llm_type:
                 doc_type_label = llm_type
@@ -1092,6 +1224,8 @@ def run_flow(
                 "match": match_result,
                 "llm_result": llm_result,
                 "keyword_result": keyword_result,
+                "prefilter_result": prefilter_result,
+                "decided_by": per_file.get("decided_by"),
                 "extraction_success": extraction_success,
                 "extraction_error": extraction_error,
                 "extraction_warning": extraction_warning,
@@ -1199,6 +1333,9 @@ def main() -> None:
     st.write("Streamlit UI for phases 1-11, dataset matching, and optional web search stub.")
     st.info("Note: LLMs read text only. Enable OCR fallback for scanned PDFs/images.")
 
+    if TextExtractor.cache is None:
+        TextExtractor.configure_cache(EXTRACTION_CACHE_DIR)
+
     st.sidebar.header("Settings")
     with st.sidebar.expander("Dataset settings", expanded=False):
         summary_path = st.text_input("certificate_summary.json path", DEFAULT_SUMMARY_PATH)
@@ -1219,14 +1356,57 @@ def main() -> None:
             "Groq analysis model",
             value=DEFAULT_ANALYSIS_MODEL,
         )
+        combined_llm_call = st.sidebar.checkbox(
+            "Single LLM call per document (extraction + classification)",
+            value=True,
+            help=(
+                "Classification then runs on the extraction model; "
+                "untick to classify separately with the analysis model."
+            ),
+        )
+        batch_classification = st.sidebar.checkbox(
+            "Classify several documents per LLM call",
+            value=True,
+        )
+        keyword_prefilter = st.sidebar.checkbox(
+            "Skip the LLM when keywords are decisive",
+            value=True,
+        )
+        keyword_threshold = st.sidebar.slider(
+            "Keyword confidence needed to skip the LLM",
+            min_value=0.3,
+            max_value=0.8,
+            value=KEYWORD_DECISIVE_CONFIDENCE,
+            step=0.1,
+            disabled=not keyword_prefilter,
+        )
+        compact_context = st.sidebar.checkbox(
+            "Send only keyword-plausible categories to the LLM",
+            value=True,
+        )
+        bypass_llm_cache = st.sidebar.checkbox("Bypass LLM response cache", value=False)
         if groq_api_key:
             st.sidebar.caption("GROQ API key loaded from .env")
+            gateway = get_gateway(groq_api_key)
+            if gateway.cache is None:
+                gateway.configure_cache(LLM_CACHE_PATH)
+            cache_stats = gateway.cache.get_stats()
+            st.sidebar.caption(
+                f"LLM cache: {cache_stats['entries']} entries, "
+                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+            )
         else:
             st.sidebar.warning("GROQ API key not found in .env")
     else:
         groq_api_key = ""
         extraction_model = DEFAULT_EXTRACTION_MODEL
         analysis_model = DEFAULT_ANALYSIS_MODEL
+        combined_llm_call = False
+        batch_classification = False
+        compact_context = False
+        keyword_prefilter = True
+        keyword_threshold = KEYWORD_DECISIVE_CONFIDENCE
+        bypass_llm_cache = False
     enable_search = st.sidebar.checkbox("Enable web search fallback (stub)", value=False)
     if enable_search:
         search_provider = st.sidebar.selectbox("Search provider", ["none", "serpapi", "bing"])
@@ -1240,14 +1420,19 @@ def main() -> None:
         st.error(f"Summary file not found: {summary_path}")
         st.stop()
 
-    summary_data = load_summary(summary_path)
-    summary_index = build_summary_index(summary_data)
-    summary_index["summary_reference"] = build_llm_reference(summary_data)
+    # Shared, read-only summary structures: reloaded when the file's mtime changes
+    summary_store = get_summary_store(summary_path)
+    if st.sidebar.button("Reload summary"):
+        summary_store = reload_summary_store(summary_path)
+    summary_index = summary_store.summary_index
+    # Keyword patterns are compiled once per summary version and reused by every classification
+    get_keyword_index(summary_store.summary_reference)
 
     st.sidebar.markdown("### Summary stats")
-    st.sidebar.write(f"Total entries: {len(summary_index['entries'])}")
-    st.sidebar.write(f"Certificates: {len([e for e in summary_index['entries'] if e['entry_type'] == 'certificate'])}")
-    st.sidebar.write(f"Non-certificates: {len([e for e in summary_index['entries'] if e['entry_type'] == 'non_certificate'])}")
+    summary_counts = summary_store.counts
+    st.sidebar.write(f"Total entries: {summary_counts['entries']}")
+    st.sidebar.write(f"Certificates: {summary_counts['certificates']}")
+    st.sidebar.write(f"Non-certificates: {summary_counts['non_certificates']}")
 
     st.subheader("Inputs")
     cert_types = CertificateIntentCapture.get_available_certificate_types()
@@ -1364,8 +1549,22 @@ def main() -> None:
         "analysis_model": analysis_model,
         "api_key": groq_api_key,
         "ocr_fallback": enable_ocr_fallback,
+        "combined_call": combined_llm_call,
+        "batch_classification": batch_classification,
+        "compact_context": compact_context,
+        "keyword_prefilter": keyword_prefilter,
+        "keyword_threshold": keyword_threshold,
+        "bypass_cache": bypass_llm_cache,
     }
 
+    progress_bar = st.progress(0.0, text="Extracting documents...")
+
+    def report_progress(completed: int, total: int, result: DocumentExtractionResult) -> None:
+        progress_bar.progress(
+            completed / total,
+            text=f"Extracted {completed}/{total}: {result.document.file_name}",
+        )
+
     try:
         results = run_flow(
             uploaded_files=uploaded_items,
@@ -1375,6 +1574,7 @@ def main() -> None:
             search_settings=search_settings,
             llm_settings=llm_settings,
             content_only=content_only,
+            progress_callback=report_progress,
         )
     except Exception as exc:
         st.exception(exc)
@@ -1402,6 +1602,7 @@ def main() -> None:
                     "file": file_result.get("filename"),
                     "document_type": file_result.get("document_type"),
                     "type_source": file_result.get("type_source"),
+                    "decided_by": file_result.get("decided_by"),
                     "validation": validation.get("status"),
                     "validation_reason": validation.get("reason"),
                 }
@@ -1414,7 +1615,8 @@ def main() -> None:
                 st.write(
                     "Type: "
                     f"{file_result.get('document_type')} "
-                    f"(source: {file_result.get('type_source')})"
+                    f"(source: {file_result.get('type_source')}, "
+                    f"decided by: {file_result.get('decided_by') or 'none'})"
                 )
                 validation = file_result.get("validation", {})
                 st.write(
@@ -1440,6 +1642,9 @@ def main() -> None:
                 if match_result:
                     st.write("Dataset match:")
                     render_match_result(match_result)
+                if file_result.get("prefilter_result"):
+                    st.write("Keyword prefilter classification:")
+                    st.json(file_result["prefilter_result"])
                 if file_result.get("llm_result"):
                     st.write("LLM classification:")
                     st.json(file_result["llm_result"])
@@ -0,0 +1,147 @@
+"""
+Build Journal
+
+Append-only JSONL checkpoint of a long dataset build (certificate_summary.py):
+- One line per processed file, written and flushed as soon as it finishes,
+  so an interrupted build loses at most the file in flight
+- Keyed by file path + SHA-256 of the file bytes: on restart unchanged files
+  are skipped, new or modified files are processed again
+- Entries written under another build version (prompt / rules change) are
+  ignored, so a version bump reprocesses everything
+- A truncated last line (crash mid-write) is skipped on load and cut off
+  before new lines are appended
+"""
+
+from typing import Any, Dict, Iterable, Optional
+from pathlib import Path
+import json
+import os
+import tempfile
+import threading
+
+
+class BuildJournal:
+    """
+    Per-file results of a dataset build, persisted as JSON lines.
+
+    Later lines for the same key replace earlier ones; compact() rewrites
+    the file with one line per live key.
+    """
+
+    def __init__(self, path: str, version: str):
+        """
+        path: JSONL journal file
+        version: build version; entries from other versions are ignored
+        """
+        self.path = Path(path)
+        self.version = version
+        self.skipped_lines = 0
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        if self.path.parent and not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._load()
+        self._drop_partial_tail()
+        self._handle = open(self.path, 'a', encoding='utf-8')
+
+    @staticmethod
+    def make_key(file_path: str, digest: Optional[str]) -> str:
+        """Journal key of a file: its path plus content hash (None when the file is missing)"""
+        return f"{file_path}#{digest or 'missing'}"
+
+    def _load(self) -> None:
+        if not self.path.exists():
+            return
+        with open(self.path, 'r', encoding='utf-8') as handle:
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    key = record["key"]
+                    result = record["result"]
+                except (ValueError, KeyError, TypeError):
+                    self.skipped_lines += 1
+                    continue
+                if record.get("version") != self.version:
+                    self.skipped_lines += 1
+                    continue
+                self._entries[key] = result
+
+    def _drop_partial_tail(self) -> None:
+        """Cut a partial last line (crash mid-write), so the next append starts on a new line"""
+        if not self.path.exists():
+            return
+        with open(self.path, 'rb+') as handle:
+            size = handle.seek(0, os.SEEK_END)
+            if size == 0:
+                return
+            handle.seek(size - 1)
+            if handle.read(1) == b"\n":
+                return
+            # Find the end of the last complete line
+            position = size
+            while position > 0:
+                start = max(0, position - 4096)
+                handle.seek(start)
+                chunk = handle.read(position - start)
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    handle.truncate(start + newline + 1)
+                    return
+                position = start
+            handle.truncate(0)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Journaled result for key, or None"""
+        with self._lock:
+            return self._entries.get(key)
+
+    def append(self, key: str, result: Dict[str, Any]) -> None:
+        """Record a result and flush it to disk before returning"""
+        line = json.dumps(
+            {"key": key, "version": self.version, "result": result},
+            ensure_ascii=False
+        )
+        with self._lock:
+            self._handle.write(line + "\n")
+            self._handle.flush()
+            os.fsync(self._handle.fileno())
+            self._entries[key] = result
+
+    def compact(self, keys: Iterable[str]) -> int:
+        """
+        Rewrite the journal with only the given keys (e.g. the files of the
+        current build), dropping stale and duplicate lines; returns lines kept.
+        """
+        with self._lock:
+            kept = {key: self._entries[key] for key in keys if key in self._entries}
+            self._handle.close()
+
+            # Write to a temp file and rename, so a crash never loses the journal
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+            with os.fdopen(fd, 'w', encoding='utf-8') as handle:
+                for key, result in kept.items():
+                    handle.write(json.dumps(
+                        {"key": key, "version": self.version, "result": result},
+                        ensure_ascii=False
+                    ) + "\n")
+            os.replace(tmp_path, self.path)
+
+            self._entries = kept
+            self._handle = open(self.path, 'a', encoding='utf-8')
+            return len(kept)
+
+    def close(self) -> None:
+        with self._lock:
+            self._handle.close()
@@ -0,0 +1,148 @@
+"""
+Build Scheduler
+
+Two-stage pipeline for dataset builds (certificate_summary.py):
+- Stage 1 (extract) runs on a process pool sized to the local cores, so
+  PDF parsing and OCR use every CPU
+- Stage 2 (classify) runs on a few threads of the main process, where one
+  shared LLMGateway token bucket paces every LLM call to the allowed rate
+- A bounded number of items may sit between the two stages: once the LLM
+  stage falls behind, extraction waits instead of piling up documents
+  in memory
+
+Results are yielded as items complete, tagged with their input index.
+"""
+
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+import os
+import queue
+import threading
+
+
+_DONE = object()
+
+
+class TwoStageScheduler:
+    """
+    Runs extract(item) on a process pool, then classify(extracted) on threads.
+
+    extract must be a picklable top-level function; classify runs in the
+    calling process and may share clients, caches and rate limits.
+    """
+
+    def __init__(
+        self,
+        extract: Callable[[Any], Any],
+        classify: Callable[[Any], Any],
+        extract_workers: Optional[int] = None,
+        classify_workers: int = 4,
+        max_pending: Optional[int] = None,
+        initializer: Optional[Callable[[], None]] = None,
+        executor: Optional[Executor] = None
+    ):
+        """
+        extract_workers: processes of the extraction pool (default: CPU count)
+        classify_workers: threads of the LLM stage
+        max_pending: items extracted or being extracted but not yet classified
+            (default: twice the total number of workers)
+        initializer: run once in each extraction process
+        executor: pre-built executor for stage 1 (for tests); not shut down here
+        """
+        self.extract = extract
+        self.classify = classify
+        self.extract_workers = extract_workers or os.cpu_count() or 1
+        self.classify_workers = max(1, classify_workers)
+        self.max_pending = max_pending or 2 * (self.extract_workers + self.classify_workers)
+        self.initializer = initializer
+        self._executor = executor
+
+    def run(self, items: Iterable[Any]) -> Iterator[Tuple[int, Any]]:
+        """
+        Yield (index, classify result) for every item, in completion order.
+
+        Raises:
+            The first exception raised by either stage, after stopping the pipeline
+        """
+        items = list(items)
+        if not items:
+            return
+
+        executor = self._executor
+        owns_executor = executor is None
+        if owns_executor:
+            executor = ProcessPoolExecutor(
+                max_workers=min(self.extract_workers, len(items)),
+                initializer=self.initializer
+            )
+
+        slots = threading.BoundedSemaphore(self.max_pending)
+        extracted: 'queue.Queue[Any]' = queue.Queue()
+        results: 'queue.Queue[Tuple[int, Any, Optional[BaseException]]]' = queue.Queue()
+        stop = threading.Event()
+        submitted = []
+
+        def on_extracted(index: int, future: Future) -> None:
+            extracted.put((index, future))
+
+        def feed() -> None:
+            for index, item in enumerate(items):
+                # Backpressure: wait until the LLM stage frees a slot
+                while not slots.acquire(timeout=0.1):
+                    if stop.is_set():
+                        return
+                if stop.is_set():
+                    return
+                try:
+                    future = executor.submit(self.extract, item)
+                except Exception as exc:
+                    results.put((index, None, exc))
+                    return
+                submitted.append(future)
+                future.add_done_callback(lambda done, index=index: on_extracted(index, done))
+
+        def classify_loop() -> None:
+            while True:
+                entry = extracted.get()
+                if entry is _DONE:
+                    return
+                index, future = entry
+                try:
+                    if stop.is_set():
+                        continue
+                    try:
+                        result = self.classify(future.result())
+                    except Exception as exc:
+                        results.put((index, None, exc))
+                    else:
+                        results.put((index, result, None))
+                finally:
+                    slots.release()
+
+        feeder = threading.Thread(target=feed, name="build-feed", daemon=True)
+        classifiers = [
+            threading.Thread(target=classify_loop, name=f"build-classify-{n}", daemon=True)
+            for n in range(self.classify_workers)
+        ]
+        feeder.start()
+        for thread in classifiers:
+            thread.start()
+
+        try:
+            for _ in range(len(items)):
+                index, result, error = results.get()
+                if error is not None:
+                    raise error
+                yield index, result
+        finally:
+            stop.set()
+            feeder.join()
+            # Drop queued extractions; running ones finish before shutdown returns
+            for future in submitted:
+                future.cancel()
+            if owns_executor:
+                executor.shutdown(wait=True)
+            for _ in classifiers:
+                extracted.put(_DONE)
+            for thread in classifiers:
+                thread.join()
@@ -0,0 +1,287 @@
+"""
+Content Index
+
+Content-similarity lookup of an uploaded document against the texts of the
+historical certificates in certificate_summary.json:
+- Built offline ("cetificate from dataset/build_content_index.py") from the
+  extracted text of every certificate in the corpus, and stored next to the
+  summary (certificate_summary.content.idx) with the SHA-256 of the summary
+  it was built from; an index built from another summary is ignored
+- Sparse TF-IDF vectors (sublinear term frequency, smoothed idf, L2
+  normalized) kept as an inverted index in flat `array` columns: no NumPy
+  or SciPy needed at build or query time
+- Terms found in most certificates (the notarial boilerplate every one of
+  them shares) are dropped at build time, so postings stay short and a
+  query only walks the few lists its distinctive terms point at
+
+query() returns the nearest certificates with their cosine similarity;
+scores are exact for the indexed terms, and a query costs milliseconds.
+"""
+
+from array import array
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+
+from src.keyword_classifier import normalize_text
+from src.summary_index_file import source_digest, write_file_atomic
+
+
+# Bump whenever the layout, the tokenization or the weighting changes
+FORMAT_VERSION = 1
+MAGIC = b"NCNTIDX\0"
+CONTENT_INDEX_SUFFIX = ".content.idx"
+
+# Terms in more than this share of the documents are dropped (with at least
+# MIN_DOCUMENTS_FOR_MAX_DF documents; smaller corpora keep every term)
+MAX_DOCUMENT_FREQUENCY = 0.5
+MIN_DOCUMENTS_FOR_MAX_DF = 10
+# Highest-weighted terms kept per document vector
+MAX_TERMS_PER_DOCUMENT = 256
+MIN_TERM_LENGTH = 3
+
+# Spanish function words: frequent in every document, never distinctive
+STOPWORDS = frozenset("""
+    con del las los por que una para como mas sus este esta ese esa entre sin sobre
+    ante bajo desde hasta segun son fue han ser hace dicho dicha dichos dichas cual
+    quien cuyo cuya donde cuando tambien otro otra otros otras mismo misma the and
+""".split())
+
+# magic, format version, documents, terms, postings, header JSON length
+_HEADER = struct.Struct("<8sIIIII")
+_COLUMNS = (
+    ("idf", "f"),       # float32 per term
+    ("offsets", "I"),   # uint32 * (terms + 1), into doc_ids / weights
+    ("doc_ids", "I"),   # uint32 per posting
+    ("weights", "f"),   # float32 per posting, L2-normalized tf-idf
+)
+
+
+def content_index_path(summary_path: str) -> str:
+    """Index file of a summary: certificate_summary.json -> certificate_summary.content.idx"""
+    return os.path.splitext(summary_path)[0] + CONTENT_INDEX_SUFFIX
+
+
+def content_terms(text: str) -> List[str]:
+    """Indexed terms of a text: normalized words, without stopwords and very short words"""
+    return [
+        word for word in normalize_text(text).split()
+        if len(word) >= MIN_TERM_LENGTH and word not in STOPWORDS
+    ]
+
+
+def _little_endian(column: array) -> array:
+    if sys.byteorder == "big":
+        column = array(column.typecode, column)
+        column.byteswap()
+    return column
+
+
+@dataclass(frozen=True)
+class ContentMatch:
+    """A historical certificate close to the query text"""
+    score: float
+    entry: Dict[str, Any]
+
+    def to_dict(self) -> Dict[str, Any]:
+        item = dict(self.entry)
+        item["content_score"] = round(self.score, 4)
+        return item
+
+
+class ContentIndex:
+    """
+    TF-IDF inverted index over certificate texts.
+
+    entries[i] is the summary entry (customer, filename, path, purpose, group)
+    of document i; build() takes (entry, text) pairs, load()/save() use the
+    binary index file.
+    """
+
+    def __init__(
+        self,
+        entries: Sequence[Dict[str, Any]],
+        terms: Sequence[str],
+        idf: array,
+        offsets: array,
+        doc_ids: array,
+        weights: array,
+        meta: Optional[Dict[str, Any]] = None
+    ):
+        self.entries: Tuple[Dict[str, Any], ...] = tuple(entries)
+        self.terms: Tuple[str, ...] = tuple(terms)
+        self.term_ids: Dict[str, int] = {term: term_id for term_id, term in enumerate(self.terms)}
+        self.idf = idf
+        self.offsets = offsets
+        self.doc_ids = doc_ids
+        self.weights = weights
+        self.meta: Dict[str, Any] = dict(meta or {})
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @classmethod
+    def build(
+        cls,
+        documents: Iterable[Tuple[Dict[str, Any], str]],
+        meta: Optional[Dict[str, Any]] = None
+    ) -> 'ContentIndex':
+        """Index (entry, extracted text) pairs; documents without terms are skipped"""
+        entries: List[Dict[str, Any]] = []
+        counts: List[Counter] = []
+        for entry, text in documents:
+            term_counts = Counter(content_terms(text))
+            if term_counts:
+                entries.append(dict(entry))
+                counts.append(term_counts)
+
+        total = len(entries)
+        document_frequency: Counter = Counter()
+        for term_counts in counts:
+            document_frequency.update(term_counts.keys())
+
+        max_df = total * MAX_DOCUMENT_FREQUENCY if total >= MIN_DOCUMENTS_FOR_MAX_DF else total
+        terms = sorted(term for term, df in document_frequency.items() if df <= max_df)
+        term_ids = {term: term_id for term_id, term in enumerate(terms)}
+        idf = array("f", (math.log((1.0 + total) / (1.0 + document_frequency[term])) + 1.0 for term in terms))
+
+        postings: List[List[Tuple[int, float]]] = [[] for _ in terms]
+        for doc_id, term_counts in enumerate(counts):
+            vector = [
+                (term_ids[term], (1.0 + math.log(count)) * idf[term_ids[term]])
+                for term, count in term_counts.items() if term in term_ids
+            ]
+            if len(vector) > MAX_TERMS_PER_DOCUMENT:
+                vector = heapq.nlargest(MAX_TERMS_PER_DOCUMENT, vector, key=lambda item: (item[1], -item[0]))
+            norm = math.sqrt(sum(weight * weight for _, weight in vector))
+            for term_id, weight in vector:
+                postings[term_id].append((doc_id, weight / norm))
+
+        offsets = array("I", [0])
+        doc_ids = array("I")
+        weights = array("f")
+        for term_postings in postings:
+            for doc_id, weight in term_postings:
+                doc_ids.append(doc_id)
+                weights.append(weight)
+            offsets.append(len(doc_ids))
+
+        return cls(entries, terms, idf, offsets, doc_ids, weights, meta)
+
+    def query_vector(self, text: str) -> Tuple[Dict[int, float], float]:
+        """
+        tf-idf weights of the indexed terms of a text, and their norm.
+        Terms the index does not hold (unseen, or dropped as boilerplate) are
+        ignored, as they are in the document vectors.
+        """
+        vector: Dict[int, float] = {}
+        for term, count in Counter(content_terms(text)).items():
+            term_id = self.term_ids.get(term)
+            if term_id is not None:
+                vector[term_id] = (1.0 + math.log(count)) * self.idf[term_id]
+        return vector, math.sqrt(sum(weight * weight for weight in vector.values()))
+
+    def query(self, text: str, limit: int = 5, min_score: float = 0.0) -> List[ContentMatch]:
+        """Nearest certificates to text as ContentMatch, best first, score > min_score"""
+        if not self.entries or limit <= 0:
+            return []
+        vector, norm = self.query_vector(text)
+        if not vector:
+            return []
+
+        offsets, doc_ids, weights = self.offsets, self.doc_ids, self.weights
+        scores: Dict[int, float] = {}
+        for term_id, weight in vector.items():
+            for position in range(offsets[term_id], offsets[term_id + 1]):
+                doc_id = doc_ids[position]
+                scores[doc_id] = scores.get(doc_id, 0.0) + weight * weights[position]
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [
+            ContentMatch(score=min(1.0, score / norm), entry=self.entries[doc_id])
+            for doc_id, score in best
+            if score / norm > min_score
+        ]
+
+    def save(self, path: str) -> str:
+        """Write the index file (temp file + rename, so readers never see half a file)"""
+        header_json = json.dumps(
+            {"entries": list(self.entries), "terms": list(self.terms), "meta": self.meta},
+            ensure_ascii=False,
+            separators=(",", ":")
+        ).encode("utf-8")
+        header = _HEADER.pack(
+            MAGIC, FORMAT_VERSION, len(self.entries), len(self.terms),
+            len(self.doc_ids), len(header_json)
+        )
+        columns = [_little_endian(getattr(self, name)).tobytes() for name, _ in _COLUMNS]
+        return write_file_atomic(path, [header, header_json] + columns)
+
+    @classmethod
+    def load(cls, path: str) -> 'ContentIndex':
+        """
+        Read an index file.
+
+        Raises:
+            ValueError: not a content index, or written with another FORMAT_VERSION
+        """
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        if len(raw) < _HEADER.size:
+            raise ValueError(f"{path}: not a content index")
+        magic, version, documents, terms, postings, header_length = _HEADER.unpack_from(raw)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path}: not a content index of format version {FORMAT_VERSION}")
+
+        position = _HEADER.size
+        header = json.loads(raw[position:position + header_length].decode("utf-8"))
+        if not isinstance(header, dict) or not isinstance(header.get("entries"), list) \
+                or not isinstance(header.get("terms"), list):
+            raise ValueError(f"{path}: malformed content index header")
+        position += header_length
+
+        lengths = {"idf": terms, "offsets": terms + 1, "doc_ids": postings, "weights": postings}
+        columns = {}
+        for name, typecode in _COLUMNS:
+            column = array(typecode)
+            size = lengths[name] * column.itemsize
+            column.frombytes(raw[position:position + size])
+            position += size
+            columns[name] = _little_endian(column)
+        if len(header["entries"]) != documents or position != len(raw):
+            raise ValueError(f"{path}: truncated content index")
+
+        return cls(header["entries"], header["terms"], meta=header.get("meta"), **columns)
+
+
+def open_content_index(
+    summary_path: str,
+    index_path: Optional[str] = None,
+    summary_sha256: Optional[str] = None
+) -> Optional[ContentIndex]:
+    """
+    Content index built for a summary, or None when it was never built, is
+    unreadable (corrupt, truncated, other FORMAT_VERSION) or was built from
+    another version of the summary.
+
+    summary_sha256: hex SHA-256 of the summary, when the caller already has it
+    """
+    index_path = index_path or content_index_path(summary_path)
+    if not os.path.exists(index_path):
+        return None
+    try:
+        index = ContentIndex.load(index_path)
+        if summary_sha256 is None:
+            summary_sha256 = source_digest(summary_path).hex()
+    except (OSError, ValueError):
+        return None
+    # Entries of a stale index may no longer exist in the summary
+    if index.meta.get("summary_sha256") != summary_sha256:
+        return None
+    return index
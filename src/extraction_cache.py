@@ -0,0 +1,193 @@
+"""
+Extraction Cache
+
+On-disk cache of Phase 4 text extraction results, shared across phases and runs:
+- Keyed by SHA-256 of the file bytes + extractor version + settings
+  (OCR language, DPI, max_pages, ...)
+- Stores raw text, normalized text and per-page metadata
+- Size-bounded with least-recently-used eviction
+
+Re-uploading the same document costs one hash and one read.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Dict, Optional, Any
+from pathlib import Path
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+
+# Bump whenever extraction or normalization output changes,
+# so stale entries are never served
+EXTRACTOR_VERSION = "3"
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024  # 512 MB
+
+
+def file_digest(file_path: Path, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedExtraction:
+    """Text extracted from one document, as stored in the cache"""
+    raw_text: str
+    normalized_text: str
+    extraction_method: str
+    pages: List[Dict[str, Any]] = field(default_factory=list)  # ExtractedPage.to_dict() per page
+    page_spans: List[int] = field(default_factory=list)  # (start, end) per page in normalized_text, flattened
+
+    @property
+    def page_char_counts(self) -> List[int]:
+        return [page.get("char_count", 0) for page in self.pages]
+
+    def to_dict(self) -> dict:
+        return {
+            "raw_text": self.raw_text,
+            "normalized_text": self.normalized_text,
+            "extraction_method": self.extraction_method,
+            "pages": self.pages,
+            "page_spans": self.page_spans
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'CachedExtraction':
+        return cls(
+            raw_text=data["raw_text"],
+            normalized_text=data["normalized_text"],
+            extraction_method=data["extraction_method"],
+            pages=data.get("pages", []),
+            page_spans=data.get("page_spans", [])
+        )
+
+
+class ExtractionCache:
+    """
+    Content-addressed extraction cache stored as one JSON file per entry.
+
+    Entry files live under cache_dir/<first two hex chars>/<key>.json.
+    A hit refreshes the entry's mtime, which is the recency used for LRU
+    eviction once the cache grows past max_bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self._total_bytes = sum(path.stat().st_size for path in self._entry_files())
+
+    @staticmethod
+    def make_key(digest: str, settings: Dict[str, Any]) -> str:
+        """Combine a file digest with the extractor version and settings"""
+        material = json.dumps(
+            {"digest": digest, "version": EXTRACTOR_VERSION, "settings": settings},
+            sort_keys=True
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def key_for_file(self, file_path: Path, settings: Dict[str, Any]) -> str:
+        """Hash a file and return its cache key for the given settings"""
+        return self.make_key(file_digest(file_path), settings)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / f"{key}.json"
+
+    def _entry_files(self) -> List[Path]:
+        return list(self.cache_dir.glob("*/*.json"))
+
+    def get(self, key: str) -> Optional[CachedExtraction]:
+        """Return the cached extraction for key, or None"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as handle:
+                entry = CachedExtraction.from_dict(json.load(handle))
+            os.utime(path)  # Mark as recently used
+        except (OSError, ValueError, KeyError):
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def put(self, key: str, entry: CachedExtraction) -> None:
+        """Store an extraction, evicting old entries if over max_bytes"""
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry.to_dict(), ensure_ascii=False).encode('utf-8')
+
+        # Write to a temp file and rename, so readers never see partial entries
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            previous_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        with self._lock:
+            self._total_bytes += len(data) - previous_size
+            over_limit = self._total_bytes > self.max_bytes
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete least-recently-used entries until under max_bytes; returns count removed"""
+        with self._lock:
+            entries = []
+            for path in self._entry_files():
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                try:
+                    path.unlink()
+                except OSError:
+                    continue
+                total -= size
+                removed += 1
+
+            self._total_bytes = total
+            return removed
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            for path in self._entry_files():
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            self._total_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": len(self._entry_files()),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
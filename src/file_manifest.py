@@ -0,0 +1,143 @@
+"""
+File Manifest
+
+Size, mtime and SHA-256 of every file in the Notaria customer folders, as
+kept by the customer index build ("cetificate from dataset/all_file_data.py"):
+- A re-scan only hashes files whose size or mtime changed since the
+  previous manifest
+- diff_manifests() reports the files added, removed and modified between
+  two manifests; append_changes() keeps those reports as a JSONL log, one
+  line per run that changed something
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+import json
+import os
+import time
+
+from src.extraction_cache import file_digest
+
+
+# Bump whenever the manifest layout changes; older manifests are ignored
+MANIFEST_VERSION = 1
+
+
+def scan_customer_folder(folder_path: str, previous: Optional[Dict] = None) -> Dict[str, Dict]:
+    """
+    Manifest entries of every file under a customer folder, keyed by relative path.
+
+    Uses os.scandir, whose entries carry the file type without an extra
+    syscall. A file keeps its previous hash when its size and mtime are
+    unchanged; only new or touched files are read and hashed.
+    """
+    previous = previous or {}
+    entries = {}
+    pending_dirs = [folder_path]
+
+    while pending_dirs:
+        current = pending_dirs.pop()
+        with os.scandir(current) as scanner:
+            for entry in scanner:
+                # Symlinked folders are not entered (as with os.walk): no loops,
+                # nothing from outside the tree
+                if entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(entry.path)
+                    continue
+                if not entry.is_file():
+                    continue
+
+                stat = entry.stat()
+                rel_path = os.path.relpath(entry.path, folder_path)
+                known = previous.get(rel_path)
+                if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+                    sha256 = known["sha256"]
+                else:
+                    sha256 = file_digest(entry.path)
+                entries[rel_path] = {
+                    "size": stat.st_size,
+                    "mtime_ns": stat.st_mtime_ns,
+                    "sha256": sha256
+                }
+
+    return entries
+
+
+def scan_notaria_folders(base_dir: str, previous_manifest: Optional[Dict] = None, workers: int = 1) -> Dict:
+    """
+    Manifest of every customer folder under base_dir.
+    With workers > 1, customer folders are scanned in parallel threads.
+    """
+    previous_customers = (previous_manifest or {}).get("customers", {})
+
+    with os.scandir(base_dir) as scanner:
+        customer_names = sorted(entry.name for entry in scanner if entry.is_dir())
+
+    def scan(customer_name):
+        return scan_customer_folder(
+            os.path.join(base_dir, customer_name),
+            previous_customers.get(customer_name)
+        )
+
+    if workers > 1 and len(customer_names) > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scanned = list(executor.map(scan, customer_names))
+    else:
+        scanned = [scan(customer_name) for customer_name in customer_names]
+
+    return {
+        "version": MANIFEST_VERSION,
+        "customers": dict(zip(customer_names, scanned))
+    }
+
+
+def diff_manifests(previous: Optional[Dict], current: Dict) -> Dict[str, List[Dict]]:
+    """Files added, removed and modified (content hash changed) between two manifests"""
+    previous_customers = (previous or {}).get("customers", {})
+    current_customers = current.get("customers", {})
+    changes = {"added": [], "removed": [], "modified": []}
+
+    for customer_name in sorted(set(previous_customers) | set(current_customers)):
+        before = previous_customers.get(customer_name, {})
+        after = current_customers.get(customer_name, {})
+        for rel_path in sorted(set(before) | set(after)):
+            if rel_path not in before:
+                kind = "added"
+            elif rel_path not in after:
+                kind = "removed"
+            elif before[rel_path]["sha256"] != after[rel_path]["sha256"]:
+                kind = "modified"
+            else:
+                continue
+            changes[kind].append({"customer": customer_name, "relative_path": rel_path})
+
+    return changes
+
+
+def load_manifest(path: str) -> Optional[Dict]:
+    """Manifest stored at path, or None when missing, unreadable or of another version"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def append_changes(path: str, changes: Dict[str, List[Dict]], **details) -> bool:
+    """
+    Append one timestamped line with the changes of a run to the JSONL log at path.
+    Runs that changed nothing are not logged; returns whether a line was written.
+    """
+    if not any(changes.values()):
+        return False
+    record = {"indexed_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+    record.update(details)
+    record.update(changes)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return True
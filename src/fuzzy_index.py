@@ -0,0 +1,138 @@
+"""
+Fuzzy Index
+
+"Did you mean" suggestions over the filenames and customer names of
+certificate_summary.json, built once per summary:
+- Candidates are normalized once, at build time, with their lengths and
+  character counts
+- A character-trigram inverted index shortlists the candidates sharing the
+  most trigrams with the query; difflib scores that shortlist first
+- The remaining candidates are skipped unless their length and character
+  counts leave room to beat the current top results (the bounds behind
+  SequenceMatcher.real_quick_ratio / quick_ratio), so results are exactly
+  those of scoring every candidate while difflib runs on only a few
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+import difflib
+import heapq
+
+from src.keyword_classifier import normalize_text
+
+
+# Candidates scored with difflib before the bounds kick in: at least this
+# many, or SHORTLIST_FACTOR times the number of suggestions asked for
+MIN_SHORTLIST = 40
+SHORTLIST_FACTOR = 8
+
+
+def trigrams(text_norm: str) -> Tuple[str, ...]:
+    """Distinct character trigrams of normalized text, padded so short words still have some"""
+    if not text_norm:
+        return ()
+    padded = f"  {text_norm} "
+    return tuple({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class TrigramIndex:
+    """
+    Fuzzy lookup over a fixed list of display strings.
+
+    top_matches() returns the same (candidate, difflib ratio) pairs, in the
+    same order, as scoring every candidate and stable-sorting by ratio.
+    """
+
+    def __init__(self, candidates: Sequence[str]):
+        self.candidates: Tuple[str, ...] = tuple(candidates)
+        self.normalized: Tuple[str, ...] = tuple(normalize_text(candidate) for candidate in self.candidates)
+        self._char_counts: Tuple[Dict[str, int], ...] = tuple(dict(Counter(text)) for text in self.normalized)
+        self._sizes: List[int] = []
+        postings: Dict[str, List[int]] = {}
+        for position, candidate_norm in enumerate(self.normalized):
+            grams = trigrams(candidate_norm)
+            self._sizes.append(len(grams))
+            for gram in grams:
+                postings.setdefault(gram, []).append(position)
+        self._postings: Dict[str, Tuple[int, ...]] = {gram: tuple(ids) for gram, ids in postings.items()}
+
+        # Candidate positions ordered by normalized length, for length-window scans
+        by_length = sorted(range(len(self.normalized)), key=lambda position: len(self.normalized[position]))
+        self._by_length: Tuple[int, ...] = tuple(by_length)
+        self._lengths: Tuple[int, ...] = tuple(len(self.normalized[position]) for position in by_length)
+
+    def __len__(self) -> int:
+        return len(self.candidates)
+
+    def shortlist(self, query_norm: str, size: int) -> List[int]:
+        """Positions of the candidates with the highest trigram (Dice) similarity to the query"""
+        query_grams = trigrams(query_norm)
+        shared: Counter = Counter()
+        for gram in query_grams:
+            shared.update(self._postings.get(gram, ()))
+        if not shared:
+            return []
+        query_size = len(query_grams)
+        sizes = self._sizes
+        ranked = heapq.nsmallest(
+            size,
+            shared.items(),
+            key=lambda item: (-2.0 * item[1] / (query_size + sizes[item[0]]), item[0])
+        )
+        return [position for position, _ in ranked]
+
+    def _length_window(self, query_length: int, threshold: float) -> range:
+        """Indexes into _by_length of candidates whose length allows a ratio >= threshold"""
+        if threshold <= 0:
+            return range(len(self._lengths))
+        # ratio <= 2 * min(a, b) / (a + b)
+        low = query_length * threshold / (2.0 - threshold)
+        high = query_length * (2.0 - threshold) / threshold
+        return range(bisect_left(self._lengths, low - 1e-9), bisect_right(self._lengths, high + 1e-9))
+
+    def top_matches(self, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Best candidates for query as (candidate, difflib ratio), best first, ratio > 0"""
+        query_norm = normalize_text(query)
+        if not query_norm or not self.candidates or limit <= 0:
+            return []
+
+        # Same argument order as the plain scan: ratio() is not symmetric
+        matcher = difflib.SequenceMatcher(None, query_norm, "")
+        query_length = len(query_norm)
+        query_counts = Counter(query_norm)
+        scored: Dict[int, float] = {}
+
+        def score(position: int) -> None:
+            matcher.set_seq2(self.normalized[position])
+            scored[position] = matcher.ratio()
+
+        def threshold() -> float:
+            if len(scored) < limit:
+                return 0.0
+            return heapq.nlargest(limit, scored.values())[-1]
+
+        for position in self.shortlist(query_norm, max(MIN_SHORTLIST, SHORTLIST_FACTOR * limit)):
+            score(position)
+
+        # Everything else is scored only if its upper bound reaches the current top results
+        floor = threshold()
+        for index in self._length_window(query_length, floor):
+            position = self._by_length[index]
+            if position in scored:
+                continue
+            if floor > 0:
+                total = query_length + self._lengths[index]
+                common = sum(
+                    min(count, query_counts[char])
+                    for char, count in self._char_counts[position].items()
+                )
+                if 2.0 * common / total < floor:
+                    continue
+            score(position)
+            if len(scored) >= limit:
+                floor = threshold()
+
+        # Ties keep candidate order, as a stable sort over the full list would
+        ranked = heapq.nsmallest(limit, scored.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.candidates[position], ratio) for position, ratio in ranked if ratio > 0]
@@ -0,0 +1,308 @@
+"""
+Keyword Classifier
+
+Cheap, LLM-free classification of uploaded documents against the
+certificate_summary.json taxonomy:
+- Attribute keywords per certificate type, scored by how many appear in the text
+- Authority document patterns (DGI / BPS / BCU constancias) that are never
+  notarial certificates; they only decide when the text has no notarial
+  markers and no attribute hits, since certificates often cite having seen
+  such a constancia
+- prefilter_classification(), the first stage of the classification cascade:
+  the LLM is only called when this stage is not decisive
+
+Patterns are normalized once per summary version into a KeywordIndex, and
+one scan of the document finds every attribute, purpose and authority
+pattern at once; all types are scored from that single result.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+import re
+import threading
+import unicodedata
+
+from src.taxonomy_context import TaxonomyContext
+
+
+# A keyword result decides on its own at this confidence (4+ attributes)
+# when it beats the runner-up type by at least this many attributes
+KEYWORD_DECISIVE_CONFIDENCE = 0.6
+KEYWORD_DECISIVE_MARGIN = 1
+
+# Same as PURE_AUTHORITY_PATTERNS in "cetificate from dataset/certificate_summary.py",
+# normalized; documents matching them are never notarial, even when certified
+AUTHORITY_DOCUMENT_PATTERNS = [
+    "certificado comun bps",
+    "constancia dgi",
+    "certificado dgi",
+    "acuse bcu",
+    "formulario 0352",
+]
+AUTHORITY_PURPOSES = ["dgi", "bps", "bcu"]
+# Same as NOTARIAL_KEYWORDS in the dataset script, normalized: a text with any of
+# them is a notarial act, even when it cites an authority document
+NOTARIAL_MARKERS = [
+    "escribano",
+    "escribana",
+    "notario",
+    "notaria",
+    "doy fe",
+    "ante mi",
+    "certificacion notarial",
+    "certifico que",
+    "certifica que",
+]
+
+
+def normalize_text(value: str) -> str:
+    """Lowercase ASCII words separated by single spaces"""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value)
+    value = value.encode("ascii", "ignore").decode("ascii")
+    value = value.lower()
+    value = re.sub(r"[^a-z0-9]+", " ", value)
+    return re.sub(r"\s+", " ", value).strip()
+
+
+def normalize_purpose(value: str) -> str:
+    if not value:
+        return ""
+    value = value.lower()
+    value = value.replace("para_", "").replace("_", " ")
+    return normalize_text(value)
+
+
+class KeywordIndex:
+    """
+    Normalized keyword patterns of one summary reference.
+
+    Each distinct pattern is searched once per document, whatever the number
+    of types sharing it. When pyahocorasick is installed the patterns are
+    compiled into an Aho-Corasick automaton and found in a single pass over
+    the text; otherwise each distinct pattern is a C-level substring search,
+    which for the few dozen patterns in the summary is faster than a
+    pure-Python automaton.
+    """
+
+    def __init__(self, summary_reference: Dict[str, Any]):
+        self.version = TaxonomyContext.reference_version(summary_reference)
+        self.type_attributes: Dict[str, Tuple[str, ...]] = {}
+        self.purposes: List[Tuple[str, str]] = []  # (normalized, as in summary), in summary order
+        for cert_type, info in summary_reference.items():
+            attrs = (normalize_text(attr) for attr in info.get("attributes", []))
+            self.type_attributes[cert_type] = tuple(attr for attr in attrs if attr)
+            for purpose in info.get("purposes", []):
+                purpose_norm = normalize_purpose(purpose)
+                if purpose_norm:
+                    self.purposes.append((purpose_norm, purpose))
+
+        patterns = set(AUTHORITY_DOCUMENT_PATTERNS)
+        patterns.update(NOTARIAL_MARKERS)
+        patterns.update(purpose_norm for purpose_norm, _ in self.purposes)
+        for attrs in self.type_attributes.values():
+            patterns.update(attrs)
+        self.patterns: Tuple[str, ...] = tuple(sorted(patterns))
+        self._automaton = self._build_automaton(self.patterns)
+
+    @staticmethod
+    def _build_automaton(patterns: Tuple[str, ...]) -> Any:
+        try:
+            import ahocorasick
+        except ImportError:
+            return None
+        automaton = ahocorasick.Automaton()
+        for pattern in patterns:
+            automaton.add_word(pattern, pattern)
+        automaton.make_automaton()
+        return automaton
+
+    def find(self, text_norm: str) -> FrozenSet[str]:
+        """Every pattern occurring in normalized text"""
+        if not text_norm:
+            return frozenset()
+        if self._automaton is not None:
+            return frozenset(pattern for _, pattern in self._automaton.iter(text_norm))
+        return frozenset(pattern for pattern in self.patterns if pattern in text_norm)
+
+    def attribute_hits(self, found: FrozenSet[str]) -> Dict[str, List[str]]:
+        """Attributes of each certificate type among the found patterns"""
+        return {
+            cert_type: [attr for attr in attrs if attr in found]
+            for cert_type, attrs in self.type_attributes.items()
+        }
+
+    def first_purpose(self, found: FrozenSet[str]) -> str:
+        """First purpose, in summary order, among the found patterns"""
+        for purpose_norm, purpose in self.purposes:
+            if purpose_norm in found:
+                return purpose
+        return ""
+
+
+_indexes: Dict[str, KeywordIndex] = {}
+_indexes_by_id: 'OrderedDict[int, Tuple[Dict[str, Any], KeywordIndex]]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def get_keyword_index(summary_reference: Dict[str, Any]) -> KeywordIndex:
+    """
+    Return the index for a summary reference, building it once per version.
+    Repeated calls with the same reference object skip even the version hash.
+    """
+    with _indexes_lock:
+        entry = _indexes_by_id.get(id(summary_reference))
+        if entry is not None and entry[0] is summary_reference:
+            return entry[1]
+
+        version = TaxonomyContext.reference_version(summary_reference)
+        index = _indexes.get(version)
+        if index is None:
+            index = KeywordIndex(summary_reference)
+            _indexes[version] = index
+        # Holding the reference keeps its id from being reused by another object
+        _indexes_by_id[id(summary_reference)] = (summary_reference, index)
+        while len(_indexes_by_id) > 8:
+            _indexes_by_id.popitem(last=False)
+        return index
+
+
+def keyword_attribute_hits(text_norm: str, summary_reference: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Attributes of each certificate type found in normalized text"""
+    index = get_keyword_index(summary_reference)
+    return index.attribute_hits(index.find(text_norm))
+
+
+def keyword_candidate_types(doc_text: str, summary_reference: Dict[str, Any]) -> List[str]:
+    """Certificate types with at least one attribute found in the text"""
+    hits_by_type = keyword_attribute_hits(normalize_text(doc_text), summary_reference)
+    return [cert_type for cert_type, hits in hits_by_type.items() if hits]
+
+
+def _classify_found(index: KeywordIndex, found: FrozenSet[str]) -> Dict[str, Any]:
+    best_type = None
+    best_score = 0
+    runner_up_score = 0
+    matched_attrs: List[str] = []
+
+    for cert_type, hits in index.attribute_hits(found).items():
+        score = len(hits)
+        if score > best_score:
+            runner_up_score = best_score
+            best_score = score
+            best_type = cert_type
+            matched_attrs = hits
+        elif score > runner_up_score:
+            runner_up_score = score
+
+    detected_purpose = index.first_purpose(found)
+
+    if best_type and best_score > 0:
+        confidence = min(0.8, 0.2 + 0.1 * best_score)
+        return {
+            "status": "ok",
+            "is_certificate": True,
+            "certificate_type": best_type,
+            "purpose": detected_purpose or "",
+            "confidence": confidence,
+            "score": best_score,
+            "margin": best_score - runner_up_score,
+            "reason": f"Matched attributes: {', '.join(matched_attrs)}" if matched_attrs else "Matched attributes.",
+        }
+
+    return {"status": "error", "message": "No keyword match found."}
+
+
+def keyword_classification(doc_text: str, summary_reference: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Best certificate type by attribute hits.
+
+    Returns a classification dict (status "ok") with the type's score and its
+    margin over the runner-up, or status "error" when nothing matched.
+    """
+    text_norm = normalize_text(doc_text)
+    if not text_norm:
+        return {"status": "error", "message": "No text for keyword classification."}
+    index = get_keyword_index(summary_reference)
+    return _classify_found(index, index.find(text_norm))
+
+
+def _authority_found(found: FrozenSet[str], has_attributes: bool = False) -> Optional[Dict[str, Any]]:
+    # A notarial act citing an authority document is left to the other classifiers
+    if has_attributes or any(marker in found for marker in NOTARIAL_MARKERS):
+        return None
+    for pattern in AUTHORITY_DOCUMENT_PATTERNS:
+        if pattern in found:
+            purpose = next((name for name in AUTHORITY_PURPOSES if name in pattern.split()), "")
+            return {
+                "status": "ok",
+                "is_certificate": False,
+                "certificate_type": "non_certificate",
+                "purpose": purpose,
+                "confidence": 0.9,
+                "reason": f"Authority document pattern: {pattern}",
+            }
+    return None
+
+
+def authority_classification(doc_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Non-certificate classification when the text matches an authority
+    document pattern and has no notarial markers
+    """
+    text_norm = normalize_text(doc_text)
+    patterns = AUTHORITY_DOCUMENT_PATTERNS + NOTARIAL_MARKERS
+    return _authority_found(frozenset(pattern for pattern in patterns if pattern in text_norm))
+
+
+def is_decisive(
+    keyword_result: Optional[Dict[str, Any]],
+    min_confidence: float = KEYWORD_DECISIVE_CONFIDENCE,
+    min_margin: int = KEYWORD_DECISIVE_MARGIN,
+) -> bool:
+    """Whether a keyword result is strong and unambiguous enough to skip the LLM"""
+    if not keyword_result or keyword_result.get("status") != "ok":
+        return False
+    return (
+        float(keyword_result.get("confidence", 0.0)) >= min_confidence
+        and int(keyword_result.get("margin", 0)) >= min_margin
+    )
+
+
+def prefilter_classification(
+    doc_text: str,
+    summary_reference: Dict[str, Any],
+    min_confidence: float = KEYWORD_DECISIVE_CONFIDENCE,
+    min_margin: int = KEYWORD_DECISIVE_MARGIN,
+) -> Dict[str, Any]:
+    """
+    Run the cheap classifiers ahead of the LLM.
+
+    Returns:
+        {"decided_by": "authority_pattern" | "keywords" | None,
+         "classification": the deciding result or None,
+         "keyword_result": keyword_classification() output}
+    """
+    # One normalization and one scan serve both classifiers
+    text_norm = normalize_text(doc_text)
+    if not text_norm:
+        keyword_result = {"status": "error", "message": "No text for keyword classification."}
+        return {"decided_by": None, "classification": None, "keyword_result": keyword_result}
+    index = get_keyword_index(summary_reference)
+    found = index.find(text_norm)
+    keyword_result = _classify_found(index, found)
+    authority_result = _authority_found(found, has_attributes=keyword_result["status"] == "ok")
+    if authority_result:
+        return {
+            "decided_by": "authority_pattern",
+            "classification": authority_result,
+            "keyword_result": keyword_result,
+        }
+    if is_decisive(keyword_result, min_confidence, min_margin):
+        return {
+            "decided_by": "keywords",
+            "classification": keyword_result,
+            "keyword_result": keyword_result,
+        }
+    return {"decided_by": None, "classification": None, "keyword_result": keyword_result}
@@ -0,0 +1,164 @@
+"""
+LLM Response Cache
+
+Persistent cache of chat completion responses, shared across Streamlit
+reruns, processes and dataset rebuilds:
+- Keyed by SHA-256 of model + prompt template version + the exact messages
+  sent (which embed the truncated document text) + sampling parameters
+- Stored in a single SQLite file, safe for concurrent threads and processes
+- Entries expire after ttl_seconds; least-recently-used entries are evicted
+  once the cache holds more than max_entries
+
+Bump a prompt's template version whenever its wording changes, so stale
+answers are never served.
+"""
+
+from typing import Any, Callable, Dict, List, Optional
+from pathlib import Path
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+DEFAULT_TTL_SECONDS = 30 * 24 * 3600  # 30 days
+DEFAULT_MAX_ENTRIES = 20000
+
+
+class LLMCache:
+    """
+    SQLite-backed cache of LLM responses.
+
+    A hit refreshes the entry's last_used time, which is the recency used
+    for LRU eviction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: Optional[float] = DEFAULT_TTL_SECONDS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        clock: Callable[[], float] = time.time
+    ):
+        """
+        path: SQLite database file
+        ttl_seconds: entry lifetime; None keeps entries until evicted by size
+        max_entries: entries kept before least-recently-used ones are evicted
+        """
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        if self.path.parent and not self.path.parent.exists():
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, "
+                "response TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+            )
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(
+        model: str,
+        prompt_version: str,
+        messages: List[Dict[str, str]],
+        **params: Any
+    ) -> str:
+        """Hash everything that determines the response"""
+        material = json.dumps(
+            {"model": model, "version": prompt_version, "messages": messages, "params": params},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+    def _is_expired(self, created: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - created > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response for key, or None"""
+        now = self._clock()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT response, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._is_expired(row[1], now):
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._entries = max(0, self._entries - 1)
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, response: str, model: str = "", prompt_version: str = "") -> None:
+        """Store a response, evicting old entries if over max_entries"""
+        now = self._clock()
+        with self._lock, self._conn:
+            exists = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, model, prompt_version, response, created, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, prompt_version, response, now, now)
+            )
+            if not exists:
+                self._entries += 1
+            over_limit = self._entries > self.max_entries
+        if over_limit:
+            self.evict()
+
+    def evict(self) -> int:
+        """Delete expired entries, then least-recently-used ones beyond max_entries; returns count removed"""
+        now = self._clock()
+        with self._lock, self._conn:
+            removed = 0
+            if self.ttl_seconds is not None:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?", (now - self.ttl_seconds,)
+                ).rowcount
+            total = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            if total > self.max_entries:
+                removed += self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (total - self.max_entries,)
+                ).rowcount
+                total = self.max_entries
+            self._entries = total
+            return removed
+
+    def clear(self) -> None:
+        """Remove every cached response"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM responses")
+            self._entries = 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "entries": entries,
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds
+            }
@@ -0,0 +1,348 @@
+"""
+LLM Gateway
+
+Shared access to the Groq chat completions API:
+- One pooled client per API key / base URL, reused across calls and threads
+- Token-bucket limits for requests-per-minute and tokens-per-minute, per model
+- Retry with jittered exponential backoff on 429 (rate limit) responses
+- Thread-pool fan-out to run chat calls for many documents at once
+- Optional persistent response cache (see llm_cache), consulted before
+  any rate limit is spent
+
+The Groq SDK is imported only when the first client is created. Tests can
+inject any client exposing chat.completions.create(...), or point base_url
+at a local stub server.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import os
+import random
+import threading
+import time
+
+from src.llm_cache import LLMCache
+
+
+# Groq free-tier limits for most chat models; override per deployment
+DEFAULT_REQUESTS_PER_MINUTE = int(os.getenv("GROQ_REQUESTS_PER_MINUTE", "30"))
+DEFAULT_TOKENS_PER_MINUTE = int(os.getenv("GROQ_TOKENS_PER_MINUTE", "6000"))
+
+# Completion tokens reserved per call when max_tokens is not given
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket refilled continuously at rate_per_minute.
+
+    acquire() blocks until enough tokens are available. adjust() settles
+    the difference once the real cost of a call is known; the level may go
+    negative, which simply makes later callers wait longer.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        capacity: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._clock = clock
+        self._sleep = sleep
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, amount: float = 1.0) -> bool:
+        """Take tokens if available right now"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return True
+            return False
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """
+        Take tokens, waiting for the bucket to refill if needed.
+        Requests larger than the capacity wait for a full bucket.
+
+        Returns:
+            Seconds spent waiting
+        """
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= amount:
+                    self.tokens -= amount
+                    return waited
+                wait = (amount - self.tokens) / self.rate
+            self._sleep(wait)
+            waited += wait
+
+    def adjust(self, delta: float) -> None:
+        """Charge (positive) or refund (negative) tokens after the fact"""
+        with self._lock:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens - delta)
+
+
+def estimate_text_tokens(text: str) -> int:
+    """Rough token count of a text (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def pack_by_budget(
+    items: List[Any],
+    cost: Callable[[Any], int],
+    budget: int,
+    max_items: Optional[int] = None
+) -> List[List[Any]]:
+    """
+    Group items, in order, into batches whose total cost stays within budget.
+    An item costing more than the budget on its own gets a batch to itself.
+    """
+    batches: List[List[Any]] = []
+    current: List[Any] = []
+    current_cost = 0
+    for item in items:
+        item_cost = cost(item)
+        full = max_items is not None and len(current) >= max_items
+        if current and (current_cost + item_cost > budget or full):
+            batches.append(current)
+            current, current_cost = [], 0
+        current.append(item)
+        current_cost += item_cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """Whether an exception from the client is a 429 response"""
+    if getattr(exc, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+def get_retry_after(exc: Exception) -> Optional[float]:
+    """Retry-After header of a 429 response, in seconds"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") if hasattr(headers, "get") else None
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class LLMGateway:
+    """
+    Rate-limited, retrying access to one Groq account.
+
+    Use get_gateway() to share one instance (and its connection pool)
+    across the whole process.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int = DEFAULT_TOKENS_PER_MINUTE,
+        max_retries: int = 4,
+        backoff_base: float = 1.0,
+        backoff_max: float = 30.0,
+        max_workers: int = 4,
+        client: Any = None,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        api_key: Groq API key
+        base_url: Alternative endpoint (e.g. a local stub server)
+        requests_per_minute / tokens_per_minute: limits enforced per model
+        max_retries: retries after a 429 before giving up
+        backoff_base / backoff_max: exponential backoff bounds, in seconds
+        max_workers: threads used by map()
+        client: pre-built client exposing chat.completions.create (for tests)
+        """
+        self.api_key = api_key
+        self.base_url = base_url
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_workers = max_workers
+        self._client = client
+        self._sleep = sleep
+        self._buckets: Dict[str, Tuple[TokenBucket, TokenBucket]] = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.rate_limited = 0
+        self.cache: Optional[LLMCache] = None
+
+    def configure_cache(self, path: str, **kwargs) -> LLMCache:
+        """Enable the persistent response cache (kwargs go to LLMCache)"""
+        self.cache = LLMCache(path, **kwargs)
+        return self.cache
+
+    @property
+    def client(self) -> Any:
+        """The pooled Groq client, created on first use"""
+        with self._lock:
+            if self._client is None:
+                from groq import Groq
+
+                kwargs = {"api_key": self.api_key, "max_retries": 0}  # Retries are handled here
+                if self.base_url:
+                    kwargs["base_url"] = self.base_url
+                self._client = Groq(**kwargs)
+            return self._client
+
+    def get_buckets(self, model: str) -> Tuple[TokenBucket, TokenBucket]:
+        """(requests, tokens) buckets for a model; Groq limits each model separately"""
+        with self._lock:
+            if model not in self._buckets:
+                self._buckets[model] = (
+                    TokenBucket(self.requests_per_minute, sleep=self._sleep),
+                    TokenBucket(self.tokens_per_minute, sleep=self._sleep)
+                )
+            return self._buckets[model]
+
+    @staticmethod
+    def estimate_tokens(messages: List[Dict[str, str]], max_tokens: Optional[int] = None) -> int:
+        """Rough token cost of a call: ~4 characters per prompt token plus the completion budget"""
+        prompt_tokens = sum(estimate_text_tokens(message.get("content") or "") for message in messages)
+        return prompt_tokens + (max_tokens or DEFAULT_COMPLETION_TOKENS)
+
+    def backoff_delay(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential backoff, never shorter than the server's Retry-After"""
+        cap = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return max(random.uniform(0, cap), retry_after or 0.0)
+
+    def chat(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float = 0.1,
+        max_tokens: Optional[int] = None,
+        prompt_version: Optional[str] = None,
+        bypass_cache: bool = False,
+        cacheable: Optional[Callable[[str], bool]] = None,
+        **kwargs
+    ) -> str:
+        """
+        Run one chat completion within the rate limits.
+
+        prompt_version: template version of the prompt; calls without one
+            are never cached
+        bypass_cache: skip the cache lookup (the fresh answer is still stored)
+        cacheable: predicate deciding whether an answer is worth storing,
+            e.g. that it parses as JSON
+
+        Returns:
+            The message content of the first choice
+
+        Raises:
+            The client's exception when the call fails, or when it is still
+            rate limited after max_retries retries
+        """
+        cache = self.cache if prompt_version is not None else None
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.make_key(
+                model, prompt_version, messages, temperature=temperature, max_tokens=max_tokens, **kwargs
+            )
+            if not bypass_cache:
+                cached = cache.get(cache_key)
+                if cached is not None:
+                    return cached
+
+        content = self._complete(model, messages, temperature, max_tokens, **kwargs)
+        if cache is not None and (cacheable is None or cacheable(content)):
+            cache.put(cache_key, content, model=model, prompt_version=prompt_version)
+        return content
+
+    def _complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: Optional[int],
+        **kwargs
+    ) -> str:
+        request_bucket, token_bucket = self.get_buckets(model)
+        estimate = self.estimate_tokens(messages, max_tokens)
+        if max_tokens is not None:
+            kwargs["max_tokens"] = max_tokens
+
+        attempt = 0
+        while True:
+            request_bucket.acquire(1)
+            token_bucket.acquire(estimate)
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    **kwargs
+                )
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt >= self.max_retries:
+                    raise
+                with self._lock:
+                    self.rate_limited += 1
+                self._sleep(self.backoff_delay(attempt, get_retry_after(exc)))
+                attempt += 1
+                continue
+
+            # Settle the estimate against what the call really used
+            usage = getattr(response, "usage", None)
+            total_tokens = getattr(usage, "total_tokens", None)
+            if total_tokens:
+                token_bucket.adjust(total_tokens - estimate)
+            return response.choices[0].message.content or ""
+
+    def map(self, func: Callable[[Any], Any], items: List[Any], max_workers: Optional[int] = None) -> List[Any]:
+        """
+        Apply func to every item on a thread pool, returning results in order.
+        Rate limits still apply to each chat() call made by func.
+        """
+        items = list(items)
+        if not items:
+            return []
+        workers = max(1, min(max_workers or self.max_workers, len(items)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(func, items))
+
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "rate_limited": self.rate_limited}
+
+
+_gateways: Dict[Tuple[str, Optional[str]], LLMGateway] = {}
+_gateways_lock = threading.Lock()
+
+
+def get_gateway(api_key: str, base_url: Optional[str] = None) -> LLMGateway:
+    """Return the process-wide gateway for an API key and endpoint"""
+    key = (api_key, base_url)
+    with _gateways_lock:
+        gateway = _gateways.get(key)
+        if gateway is None:
+            gateway = LLMGateway(api_key, base_url=base_url)
+            _gateways[key] = gateway
+        return gateway
@@ -0,0 +1,231 @@
+"""
+OCR Executor
+
+This module runs OCR for Phase 4 on a bounded process pool:
+- One page is the unit of work (render + Tesseract)
+- Results are returned in page order
+- A job can be cancelled or given a per-document deadline
+- Every page is returned as an ExtractedPage with source "ocr"
+
+A scanned document therefore takes about as long as its slowest page
+instead of the sum of all its pages.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, Future, TimeoutError as FutureTimeoutError
+from typing import Callable, Dict, List, Optional
+from pathlib import Path
+import atexit
+import os
+import threading
+import time
+
+from src.phase4_text_extraction import ExtractedPage
+
+
+def ocr_pdf_page(file_path: str, page_number: int, lang: str, dpi: int) -> str:
+    """
+    Render a single PDF page and run Tesseract on it.
+    Runs inside a worker process. Requires pdf2image (poppler) and pytesseract.
+    """
+    from pdf2image import convert_from_path
+    import pytesseract
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number)
+    return "\n".join(pytesseract.image_to_string(image, lang=lang) for image in images).strip()
+
+
+def ocr_image_file(file_path: str, page_number: int, lang: str, dpi: int) -> str:
+    """
+    Run Tesseract on an image file (JPG, PNG). page_number is always 1.
+    Runs inside a worker process. Requires Pillow and pytesseract.
+    """
+    from PIL import Image
+    import pytesseract
+
+    with Image.open(file_path) as image:
+        return pytesseract.image_to_string(image, lang=lang).strip()
+
+
+class OCRJob:
+    """
+    OCR work for one document: one future per page.
+
+    Pages can be collected one at a time with page() (so callers can
+    stream them in order) or all together with results().
+    """
+
+    def __init__(self, futures: Dict[int, Future], deadline_seconds: Optional[float] = None):
+        self._futures = futures
+        self._deadline = time.monotonic() + deadline_seconds if deadline_seconds is not None else None
+        self._cancelled = threading.Event()
+
+    @property
+    def page_numbers(self) -> List[int]:
+        return sorted(self._futures)
+
+    def cancel(self) -> None:
+        """Cancel pages that have not started; pending page() calls return skipped pages"""
+        self._cancelled.set()
+        for future in self._futures.values():
+            future.cancel()
+
+    def is_cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def _remaining(self) -> Optional[float]:
+        if self._deadline is None:
+            return None
+        return max(0.0, self._deadline - time.monotonic())
+
+    def page(self, page_number: int) -> ExtractedPage:
+        """Wait for one page, bounded by the job deadline"""
+        future = self._futures[page_number]
+
+        # Poll in short steps so cancel() from another thread is honoured
+        while not future.done():
+            if self._cancelled.is_set():
+                return ExtractedPage(page_number, "", "skipped", error="OCR cancelled")
+            remaining = self._remaining()
+            if remaining == 0.0:
+                future.cancel()
+                return ExtractedPage(page_number, "", "skipped", error="OCR deadline exceeded")
+            try:
+                future.result(timeout=0.1 if remaining is None else min(0.1, remaining))
+            except FutureTimeoutError:
+                continue
+            except Exception:
+                break
+
+        if future.cancelled():
+            return ExtractedPage(page_number, "", "skipped", error="OCR cancelled")
+        error = future.exception()
+        if error is not None:
+            return ExtractedPage(page_number, "", "skipped", error=f"OCR failed: {error}")
+        return ExtractedPage(page_number, future.result(), "ocr")
+
+    def results(self) -> List[ExtractedPage]:
+        """Wait for every page and return them in page order"""
+        pages = [self.page(page_number) for page_number in self.page_numbers]
+        if self._deadline is not None and self._remaining() == 0.0:
+            # Anything still queued will never be collected
+            self.cancel()
+        return pages
+
+
+class OCRExecutor:
+    """
+    Bounded process pool for page-level OCR.
+
+    The pool is created on first use and reused for every document,
+    so worker start-up is paid once per process.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        lang: str = "spa",
+        dpi: int = 300,
+        page_worker: Callable[[str, int, str, int], str] = ocr_pdf_page
+    ):
+        """
+        max_workers: size of the process pool (default: CPU count, at most 4)
+        lang: Tesseract language
+        dpi: page rendering resolution
+        page_worker: picklable function (file_path, page_number, lang, dpi) -> text
+        """
+        self.max_workers = max_workers or min(4, os.cpu_count() or 1)
+        self.lang = lang
+        self.dpi = dpi
+        self.page_worker = page_worker
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def submit(
+        self,
+        file_path: Path,
+        page_numbers: List[int],
+        deadline_seconds: Optional[float] = None,
+        page_worker: Optional[Callable[[str, int, str, int], str]] = None
+    ) -> OCRJob:
+        """
+        Queue OCR for the given pages of one document.
+
+        Args:
+            file_path: Document to OCR
+            page_numbers: 1-based pages to OCR
+            deadline_seconds: Optional time budget for the whole document
+            page_worker: Override the executor's page worker for this job
+
+        Returns:
+            OCRJob to collect results from
+        """
+        pool = self._get_pool()
+        worker = page_worker or self.page_worker
+        futures = {
+            page_number: pool.submit(worker, str(file_path), page_number, self.lang, self.dpi)
+            for page_number in sorted(set(page_numbers))
+        }
+        return OCRJob(futures, deadline_seconds=deadline_seconds)
+
+    def ocr_pages(
+        self,
+        file_path: Path,
+        page_numbers: List[int],
+        deadline_seconds: Optional[float] = None
+    ) -> List[ExtractedPage]:
+        """OCR pages and wait for them, returning results in page order"""
+        return self.submit(file_path, page_numbers, deadline_seconds=deadline_seconds).results()
+
+    def shutdown(self, cancel_queued: bool = True) -> None:
+        """
+        Stop the pool without waiting for it.
+        Queued pages are dropped unless cancel_queued is False, in which case
+        every submitted page still runs and the workers exit afterwards.
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=cancel_queued)
+                self._pool = None
+
+    def __enter__(self) -> 'OCRExecutor':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.shutdown()
+
+
+_default_executor: Optional[OCRExecutor] = None
+_default_lock = threading.Lock()
+
+
+def get_ocr_executor(lang: str = "spa", dpi: int = 300, max_workers: Optional[int] = None) -> OCRExecutor:
+    """
+    Return the process-wide executor, recreating it if the OCR settings changed.
+    The replaced executor is drained, not cancelled: jobs other threads
+    submitted to it still get their pages.
+    """
+    global _default_executor
+    replaced = None
+    with _default_lock:
+        executor = _default_executor
+        if executor is None or (executor.lang, executor.dpi) != (lang, dpi) or (
+            max_workers is not None and executor.max_workers != max_workers
+        ):
+            replaced = executor
+            executor = OCRExecutor(max_workers=max_workers, lang=lang, dpi=dpi)
+            _default_executor = executor
+    if replaced is not None:
+        replaced.shutdown(cancel_queued=False)
+    return executor
+
+
+@atexit.register
+def _shutdown_default_executor() -> None:
+    if _default_executor is not None:
+        _default_executor.shutdown()
@@ -225,11 +225,55 @@ class DocumentTypeDetector:
 
         return None
 
+    # Pages whose text layer has fewer letters/digits than this need OCR
+    MIN_TEXT_CHARS_PER_PAGE = 25
+
+    @staticmethod
+    def page_needs_ocr(text: str) -> bool:
+        """Whether a page's text layer has fewer than MIN_TEXT_CHARS_PER_PAGE letters/digits"""
+        return sum(1 for char in text if char.isalnum()) < DocumentTypeDetector.MIN_TEXT_CHARS_PER_PAGE
+
     @staticmethod
-    def is_likely_scanned(file_format: FileFormat) -> bool:
-        """Determine if file is likely scanned (will be refined in Phase 4)"""
-        # Images are likely scanned
-        return file_format in [FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG]
+    def classify_pdf_pages(file_path: Path, max_pages: Optional[int] = None) -> Dict[str, any]:
+        """
+        Classify the pages of a PDF as digital or scanned by text density.
+
+        A page counts as scanned when page_needs_ocr() says so, so a digital
+        cover followed by scanned actas is detected page by page. With
+        max_pages, only the first max_pages pages are read.
+
+        Returns:
+            Dict with "page_count" (pages read) and "ocr_pages" (1-based page numbers)
+        """
+        # Imported here because Phase 4 depends on this module
+        from src.phase4_text_extraction import TextExtractor
+
+        page_count = 0
+        ocr_pages = []
+        for page in TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages):
+            page_count += 1
+            if DocumentTypeDetector.page_needs_ocr(page.text):
+                ocr_pages.append(page.page_number)
+
+        return {"page_count": page_count, "ocr_pages": ocr_pages}
+
+    @staticmethod
+    def is_likely_scanned(
+        file_format: FileFormat,
+        ocr_pages: Optional[List[int]] = None,
+        page_count: Optional[int] = None
+    ) -> bool:
+        """
+        Determine if a whole file is scanned.
+
+        Images are always scanned. A PDF is scanned only when the per-page
+        classification found no page with a usable text layer.
+        """
+        if file_format in [FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG]:
+            return True
+        if file_format == FileFormat.PDF and page_count:
+            return len(ocr_pages or []) == page_count
+        return False
 
 
 class DocumentIntake:
@@ -274,7 +318,13 @@ class DocumentIntake:
         # Detect document type from filename
         detected_type = DocumentTypeDetector.detect_from_filename(file_name)
 
-        # Check if likely scanned
+        metadata = {
+            "original_path": str(path),
+            "mime_type": mimetypes.guess_type(str(path))[0]
+        }
+
+        # Check if likely scanned. PDF pages are classified in Phase 4, after
+        # its cache lookup, so intake never parses the file
         is_scanned = DocumentTypeDetector.is_likely_scanned(file_format)
 
         # Get modification time as proxy for upload time
@@ -295,10 +345,7 @@ class DocumentIntake:
             processing_status=status,
             detected_type=detected_type,
             is_scanned=is_scanned,
-            metadata={
-                "original_path": str(path),
-                "mime_type": mimetypes.guess_type(str(path))[0]
-            }
+            metadata=metadata
         )
 
     @staticmethod
@@ -11,14 +11,27 @@ This module handles:
 This prepares extracted data for Phase 5 (validation).
 """
 
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Iterator, Callable
 from pathlib import Path
 from datetime import datetime
+from functools import lru_cache
+import atexit
 import json
+import os
 import re
+import threading
+import zlib
 
-from src.phase3_document_intake import UploadedDocument, DocumentCollection, FileFormat, DocumentType
+from src.phase3_document_intake import (
+    UploadedDocument, DocumentCollection, FileFormat, DocumentType, DocumentTypeDetector
+)
+from src.extraction_cache import ExtractionCache, CachedExtraction, DEFAULT_MAX_BYTES
 
 
 class TextNormalizer:
@@ -27,24 +40,61 @@ class TextNormalizer:
     Fixes encoding issues common in OCR (especially Spanish tildes).
     """
 
-    # Common OCR encoding errors in Spanish
+    # Common OCR encoding errors in Spanish (UTF-8 read as cp1252/latin-1).
+    # Replaced longest key first, so the result does not depend on order.
     ENCODING_FIXES = {
         'Ã³': 'ó',
         'Ã¡': 'á',
         'Ã©': 'é',
-        'Ã­': 'í',
+        'Ã\xad': 'í',
         'Ãº': 'ú',
         'Ã±': 'ñ',
-        'Ã': 'Á',
+        'Ã¼': 'ü',
+        'Ã\x81': 'Á',
         'Ã‰': 'É',
-        'Ã': 'Í',
+        'Ã\x8d': 'Í',
+        'Ã“': 'Ó',
         'Ã"': 'Ó',
         'Ãš': 'Ú',
-        'Ñ': 'Ñ',  # Capital N with tilde
+        'Ã‘': 'Ñ',
+        'Ãœ': 'Ü',
+        'Ã': 'Í',  # Second byte lost in extraction (most often Í, as in "ARTÃCULO")
         'Â°': '°',
         'Âº': 'º',
         'Âª': 'ª',
     }
+    ENCODING_FIXES_RE = re.compile(
+        "|".join(map(re.escape, sorted(ENCODING_FIXES, key=len, reverse=True)))
+    )
+
+    # Characters that only show up in Spanish text when it was double encoded
+    MOJIBAKE_MARKERS = ('Ã', 'Â', 'â€')
+
+    @staticmethod
+    def redecode(text: str) -> Optional[str]:
+        """
+        Undo whole-text double encoding (UTF-8 bytes decoded as cp1252 or latin-1).
+
+        Returns the repaired text, or None when the text is not double encoded:
+        correctly encoded accents do not survive the round trip, so mixed text
+        is left to the replacement table.
+        """
+        if not text or not any(marker in text for marker in TextNormalizer.MOJIBAKE_MARKERS):
+            return None
+        for codec in ('cp1252', 'latin-1'):
+            try:
+                return text.encode(codec).decode('utf-8')
+            except UnicodeError:
+                continue
+        return None
+
+    @staticmethod
+    def replace_mojibake(text: str) -> str:
+        """Replace known mojibake sequences in one pass, longest match first"""
+        if not text:
+            return text
+        fixes = TextNormalizer.ENCODING_FIXES
+        return TextNormalizer.ENCODING_FIXES_RE.sub(lambda match: fixes[match.group(0)], text)
 
     @staticmethod
     def fix_encoding(text: str) -> str:
@@ -52,11 +102,10 @@ class TextNormalizer:
         if not text:
             return text
 
-        fixed_text = text
-        for wrong, correct in TextNormalizer.ENCODING_FIXES.items():
-            fixed_text = fixed_text.replace(wrong, correct)
-
-        return fixed_text
+        redecoded = TextNormalizer.redecode(text)
+        if redecoded is not None:
+            return redecoded
+        return TextNormalizer.replace_mojibake(text)
 
     @staticmethod
     def normalize_whitespace(text: str) -> str:
@@ -78,6 +127,56 @@ class TextNormalizer:
         text = TextNormalizer.normalize_whitespace(text)
         return text
 
+    @staticmethod
+    def normalize_pages(page_texts: List[str]) -> tuple:
+        """
+        Normalize each page and join them with a single space.
+
+        Gives the same text as normalize_text() on the pages joined with
+        whitespace, plus each page's position in it.
+
+        Returns:
+            tuple: (normalized_text, page_spans) where page_spans is an
+            array of (start, end) offsets per page, flattened
+        """
+        # Double encoding is decided for the whole document, like normalize_text()
+        double_encoded = TextNormalizer.redecode("\n\n".join(page_texts)) is not None
+
+        parts = []
+        page_spans = array('i')
+        offset = 0
+        for text in page_texts:
+            if double_encoded:
+                fixed = TextNormalizer.redecode(text) or text
+            else:
+                fixed = TextNormalizer.replace_mojibake(text)
+            normalized = TextNormalizer.normalize_whitespace(fixed) or ""
+            if normalized and parts:
+                offset += 1  # Separator between pages
+            if normalized:
+                parts.append(normalized)
+            page_spans.extend((offset, offset + len(normalized)))
+            offset += len(normalized)
+        return " ".join(parts), page_spans
+
+
+@dataclass
+class FieldMatch:
+    """A field value found in the text, with its offsets"""
+    field: str  # ExtractedData field name
+    value: str
+    start: int
+    end: int
+    pattern: str  # Scan field that matched (e.g. "company_0")
+
+    def to_dict(self) -> dict:
+        return {
+            "field": self.field,
+            "value": self.value,
+            "start": self.start,
+            "end": self.end
+        }
+
 
 class DataExtractor:
     """
@@ -97,6 +196,159 @@ class DataExtractor:
         'padron_bps': r'Padrón\s+(?:BPS\s+)?(?:N°|Nro\.?|Número)?\s*(\d+)',
     }
 
+    # Company name patterns, in priority order:
+    # "NOMBRE S.A.", "NOMBRE SOCIEDAD ANÓNIMA", "NOMBRE S.R.L."
+    COMPANY_PREFIX = r'([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ\s]+)\s+'
+    COMPANY_SUFFIXES = [
+        r'S\.?A\.?(?:\s|$)',
+        r'SOCIEDAD\s+ANÓNIMA',
+        r'S\.?R\.?L\.?(?:\s|$)',
+    ]
+    COMPANY_PATTERNS = [
+        COMPANY_PREFIX + COMPANY_SUFFIXES[0],
+        COMPANY_PREFIX + COMPANY_SUFFIXES[1],
+        COMPANY_PREFIX + COMPANY_SUFFIXES[2],
+    ]
+
+    # Fields filled by scan(): (scan name, ExtractedData field, pattern, case-insensitive).
+    # Single-valued fields keep their first match like re.search; dates and
+    # emails keep every non-overlapping match like re.findall.
+    SCAN_FIELDS = [
+        ('company_0', 'company_name', COMPANY_PATTERNS[0], True),
+        ('company_1', 'company_name', COMPANY_PATTERNS[1], True),
+        ('company_2', 'company_name', COMPANY_PATTERNS[2], True),
+        ('rut', 'rut', PATTERNS['rut'], True),
+        ('ci', 'ci', PATTERNS['ci'], True),
+        ('registro_comercio', 'registro_comercio', PATTERNS['registro_comercio'], True),
+        ('acta_number', 'acta_number', PATTERNS['acta_number'], True),
+        ('padron_bps', 'padron_bps', PATTERNS['padron_bps'], True),
+        ('date', 'dates', PATTERNS['date'], False),
+        ('email', 'emails', PATTERNS['email'], False),
+    ]
+    LIST_FIELDS = {'dates', 'emails'}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _field_regex(name: str) -> 're.Pattern':
+        """Compiled pattern for one scan field"""
+        for scan_name, _, pattern, ignore_case in DataExtractor.SCAN_FIELDS:
+            if scan_name == name:
+                return re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+        raise KeyError(name)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def _candidate_regex(names: tuple) -> 're.Pattern':
+        """
+        One zero-width alternation over the given fields.
+        It matches at every position where at least one field pattern
+        matches, so the regex engine skips everything else in a single pass.
+        """
+        alternatives = []
+        company_suffixes = []
+        for scan_name, _, pattern, ignore_case in DataExtractor.SCAN_FIELDS:
+            if scan_name not in names:
+                continue
+            if scan_name.startswith('company_'):
+                company_suffixes.append(DataExtractor.COMPANY_SUFFIXES[int(scan_name.split('_')[1])])
+                continue
+            alternatives.append(f"(?i:{pattern})" if ignore_case else f"(?:{pattern})")
+
+        if company_suffixes:
+            # The company patterns share their prefix, so test it once. The first
+            # match always starts at a word start: if the previous character were
+            # a letter, the pattern would already have matched one position earlier.
+            alternatives.insert(0, (
+                r"(?i:(?<![A-ZÁÉÍÓÚÑa-záéíóúñ])" + DataExtractor.COMPANY_PREFIX
+                + "(?:" + "|".join(company_suffixes) + "))"
+            ))
+        return re.compile("(?=" + "|".join(alternatives) + ")")
+
+    @staticmethod
+    def _field_value(scan_name: str, match: 're.Match') -> tuple:
+        """(value, start, end) of a field match, formatted like the extract_* methods"""
+        if scan_name == 'rut':
+            return re.sub(r'[\s\.-]', '', match.group(0)), match.start(), match.end()
+        if scan_name in ('registro_comercio', 'acta_number', 'padron_bps'):
+            return match.group(1), match.start(1), match.end(1)
+        if scan_name.startswith('company_'):
+            value = match.group(0).strip()
+            return value, match.start(), match.start() + len(value)
+        return match.group(0), match.start(), match.end()
+
+    @staticmethod
+    def scan(text: str) -> List[FieldMatch]:
+        """
+        Find every ExtractedData field in one pass over the text.
+
+        Gives the same values as the individual extract_* methods, plus
+        offsets into the text. Single-valued fields stop being searched
+        once found, so the rest of the scan only looks for what is missing.
+
+        Returns:
+            FieldMatch list in text order
+        """
+        fields = {scan_name: field_name for scan_name, field_name, _, _ in DataExtractor.SCAN_FIELDS}
+        company_names = [f"company_{i}" for i in range(len(DataExtractor.COMPANY_PATTERNS))]
+        remaining = [scan_name for scan_name, _, _, _ in DataExtractor.SCAN_FIELDS]
+        list_ends = {}  # End of the last accepted match, for findall-style non-overlap
+        matches = []
+        pos = 0
+
+        while remaining:
+            candidates = DataExtractor._candidate_regex(tuple(remaining)).finditer(text, pos)
+            for candidate in candidates:
+                start = candidate.start()
+                found_single = False
+                for scan_name in list(remaining):
+                    field_name = fields[scan_name]
+                    if field_name in DataExtractor.LIST_FIELDS and start < list_ends.get(scan_name, 0):
+                        continue
+                    match = DataExtractor._field_regex(scan_name).match(text, start)
+                    if not match:
+                        continue
+                    value, value_start, value_end = DataExtractor._field_value(scan_name, match)
+                    matches.append(FieldMatch(field_name, value, value_start, value_end, scan_name))
+                    if field_name in DataExtractor.LIST_FIELDS:
+                        list_ends[scan_name] = match.end()
+                    elif scan_name in company_names:
+                        # Lower-priority company patterns are no longer needed
+                        for lower in company_names[company_names.index(scan_name):]:
+                            if lower in remaining:
+                                remaining.remove(lower)
+                        found_single = True
+                    else:
+                        remaining.remove(scan_name)
+                        found_single = True
+                if found_single:
+                    # Continue with a narrower alternation
+                    pos = start + 1
+                    break
+            else:
+                break
+
+        return matches
+
+    @staticmethod
+    def fields_from_matches(matches: List[FieldMatch]) -> Dict[str, Any]:
+        """Turn scan() matches into ExtractedData field values"""
+        values = {field_name: None for _, field_name, _, _ in DataExtractor.SCAN_FIELDS}
+        for field_name in DataExtractor.LIST_FIELDS:
+            values[field_name] = []
+
+        company_priority = None
+        for match in matches:
+            if match.field in DataExtractor.LIST_FIELDS:
+                values[match.field].append(match.value)
+            elif match.field == 'company_name':
+                priority = int(match.pattern.split('_')[1])
+                if company_priority is None or priority < company_priority:
+                    values['company_name'] = match.value
+                    company_priority = priority
+            elif values[match.field] is None:
+                values[match.field] = match.value
+        return values
+
     @staticmethod
     def extract_rut(text: str) -> Optional[str]:
         """Extract RUT (tax ID) from text"""
@@ -155,14 +407,7 @@ class DataExtractor:
         Extract company name (S.A., S.R.L., etc.)
         This is a simple heuristic - can be improved with NER
         """
-        # Look for patterns like "NOMBRE S.A." or "NOMBRE SOCIEDAD ANÓNIMA"
-        patterns = [
-            r'([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ\s]+)\s+S\.?A\.?(?:\s|$)',
-            r'([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ\s]+)\s+SOCIEDAD\s+ANÓNIMA',
-            r'([A-ZÁÉÍÓÚÑ][A-ZÁÉÍÓÚÑa-záéíóúñ\s]+)\s+S\.?R\.?L\.?(?:\s|$)',
-        ]
-
-        for pattern in patterns:
+        for pattern in DataExtractor.COMPANY_PATTERNS:
             match = re.search(pattern, text, re.IGNORECASE)
             if match:
                 company_name = match.group(0).strip()
@@ -171,12 +416,97 @@ class DataExtractor:
         return None
 
 
+@dataclass
+class ExtractedPage:
+    """Text of a single page, with its origin kept for legal traceability"""
+    page_number: int  # 1-based
+    text: str
+    source: str  # "pdf_text" | "ocr" | "text" | "docx" | "skipped"
+    error: Optional[str] = None  # Why a page was skipped (OCR failure, deadline)
+
+    @property
+    def char_count(self) -> int:
+        return len(self.text)
+
+    def to_dict(self) -> dict:
+        return {
+            "page_number": self.page_number,
+            "source": self.source,
+            "char_count": self.char_count,
+            "error": self.error
+        }
+
+
+class TextStore:
+    """
+    A document's raw and normalized text, held once.
+
+    Bodies of COMPRESS_MIN_CHARS or more are kept zlib-compressed and
+    decompressed on every access, never cached, so a record keeps only the
+    compressed copy however often it is read. preview() decodes no more
+    than the characters it returns. Stores are immutable and compare by
+    their text.
+    """
+
+    COMPRESS_MIN_CHARS = 4096
+
+    __slots__ = ('_raw', '_normalized')
+
+    def __init__(self, raw_text: str = "", normalized_text: Optional[str] = None):
+        """normalized_text is derived from raw_text when omitted"""
+        raw_text = raw_text or ""
+        if normalized_text is None:
+            normalized_text = TextNormalizer.normalize_text(raw_text)
+        self._raw = TextStore._pack(raw_text)
+        self._normalized = TextStore._pack(normalized_text)
+
+    @staticmethod
+    def _pack(text: str):
+        if len(text) < TextStore.COMPRESS_MIN_CHARS:
+            return text
+        return zlib.compress(text.encode('utf-8'))
+
+    @staticmethod
+    def _unpack(data) -> str:
+        if isinstance(data, bytes):
+            return zlib.decompress(data).decode('utf-8')
+        return data
+
+    @property
+    def raw_text(self) -> str:
+        return TextStore._unpack(self._raw)
+
+    @property
+    def normalized_text(self) -> str:
+        return TextStore._unpack(self._normalized)
+
+    def preview(self, max_chars: int = 200) -> str:
+        """First max_chars of the normalized text, with "..." when there is more"""
+        data = self._normalized
+        if isinstance(data, bytes):
+            # Compressed bodies are longer than any preview: decode just the
+            # head (max_chars characters take at most 4 * max_chars bytes)
+            head = zlib.decompressobj().decompress(data, 4 * max_chars)
+            return head.decode('utf-8', 'ignore')[:max_chars] + "..."
+        return data[:max_chars] + "..." if len(data) > max_chars else data
+
+    def stored_bytes(self) -> int:
+        """Approximate memory held by the text bodies"""
+        return len(self._raw) + len(self._normalized)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, TextStore):
+            return NotImplemented
+        return (self._raw, self._normalized) == (other._raw, other._normalized)
+
+    def __hash__(self) -> int:
+        return hash((self._raw, self._normalized))
+
+
 @dataclass
 class ExtractedData:
     """Structured data extracted from a document"""
     document_type: DocumentType
-    raw_text: str
-    normalized_text: str
 
     # Extracted fields
     company_name: Optional[str] = None
@@ -192,12 +522,118 @@ class ExtractedData:
     extraction_timestamp: datetime = field(default_factory=datetime.now)
     extraction_method: str = "text"  # "text" or "ocr"
     confidence: float = 1.0  # 0.0 to 1.0
+    page_char_counts: List[int] = field(default_factory=list)  # Characters per page, in page order
+
+    # Where things are in normalized_text, as flat int arrays:
+    # page_spans is (start, end) per page, field_spans is (field code, page, start, end) per value
+    page_spans: array = field(default_factory=lambda: array('i'))
+    field_spans: array = field(default_factory=lambda: array('i'))
 
     # Additional structured data
     additional_fields: Dict[str, Any] = field(default_factory=dict)
 
-    def to_dict(self) -> dict:
-        return {
+    # raw_text and normalized_text live here, stored once (see TextStore)
+    text_store: TextStore = field(default_factory=TextStore, repr=False)
+
+    # Field codes used in field_spans
+    SPAN_FIELDS = (
+        'company_name', 'rut', 'ci', 'registro_comercio',
+        'acta_number', 'padron_bps', 'dates', 'emails'
+    )
+
+    @classmethod
+    def from_text(
+        cls,
+        document_type: DocumentType,
+        raw_text: str = "",
+        normalized_text: Optional[str] = None,
+        **fields
+    ) -> 'ExtractedData':
+        """Build a record from its texts; normalized_text is derived from raw_text when omitted"""
+        return cls(document_type=document_type, text_store=TextStore(raw_text, normalized_text), **fields)
+
+    @property
+    def raw_text(self) -> str:
+        return self.text_store.raw_text
+
+    @raw_text.setter
+    def raw_text(self, value: str) -> None:
+        # Keep the normalized text as it was
+        self.text_store = TextStore(value, self.text_store.normalized_text)
+
+    @property
+    def normalized_text(self) -> str:
+        return self.text_store.normalized_text
+
+    @normalized_text.setter
+    def normalized_text(self, value: str) -> None:
+        self.text_store = TextStore(self.text_store.raw_text, value)
+
+    def page_for_offset(self, offset: int) -> Optional[int]:
+        """1-based page containing a normalized_text offset, or None without page data"""
+        if not self.page_spans:
+            return None
+        index = bisect_right(self.page_spans[0::2], offset) - 1
+        return max(index, 0) + 1
+
+    def page_text(self, page_number: int) -> str:
+        """Normalized text of one page (1-based), sliced without rebuilding the document"""
+        page_count = len(self.page_spans) // 2
+        if not 1 <= page_number <= page_count:
+            raise IndexError(f"Page {page_number} out of range (1-{page_count})")
+        start, end = self.page_spans[2 * (page_number - 1)], self.page_spans[2 * page_number - 1]
+        return self.normalized_text[start:end]
+
+    def record_field_spans(self, matches: List['FieldMatch']) -> None:
+        """
+        Store the location of every field value this record holds.
+
+        Only matches equal to the current values are kept: the first one
+        for single fields, one per listed value for dates and emails.
+        """
+        spans = array('i')
+        located = set()
+        for match in matches:
+            if match.field not in self.SPAN_FIELDS:
+                continue
+            current = getattr(self, match.field)
+            if isinstance(current, list):
+                if match.value not in current:
+                    continue
+            elif current != match.value or match.field in located:
+                continue
+            located.add(match.field)
+            page = self.page_for_offset(match.start) or 0
+            spans.extend((self.SPAN_FIELDS.index(match.field), page, match.start, match.end))
+        self.field_spans = spans
+
+    def field_locations(self, field_name: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Decode field_spans, optionally for a single field"""
+        locations = []
+        spans = self.field_spans
+        text = self.normalized_text if spans else ""
+        for i in range(0, len(spans), 4):
+            name = self.SPAN_FIELDS[spans[i]]
+            if field_name is not None and name != field_name:
+                continue
+            start, end = spans[i + 2], spans[i + 3]
+            locations.append({
+                "field": name,
+                "page": spans[i + 1] or None,
+                "start": start,
+                "end": end,
+                "text": text[start:end]
+            })
+        return locations
+
+    def get_field_page(self, field_name: str) -> Optional[int]:
+        """Page where a single-valued field was found"""
+        locations = self.field_locations(field_name)
+        return locations[0]["page"] if locations else None
+
+    def to_dict(self, include_text: bool = False) -> dict:
+        """Serialize the extracted fields; text bodies are only included on request"""
+        data = {
             "document_type": self.document_type.value if self.document_type else None,
             "company_name": self.company_name,
             "rut": self.rut,
@@ -210,9 +646,16 @@ class ExtractedData:
             "extraction_timestamp": self.extraction_timestamp.isoformat(),
             "extraction_method": self.extraction_method,
             "confidence": self.confidence,
+            "page_count": len(self.page_char_counts),
+            "page_char_counts": self.page_char_counts,
+            "field_locations": self.field_locations(),
             "additional_fields": self.additional_fields,
-            "text_preview": self.normalized_text[:200] + "..." if len(self.normalized_text) > 200 else self.normalized_text
+            "text_preview": self.text_store.preview(200)
         }
+        if include_text:
+            data["raw_text"] = self.raw_text
+            data["normalized_text"] = self.normalized_text
+        return data
 
     def to_json(self) -> str:
         return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
@@ -228,18 +671,20 @@ class ExtractedData:
 
 📊 DATOS EXTRAÍDOS:
 """
-        if self.company_name:
-            summary += f"   Empresa: {self.company_name}\n"
-        if self.rut:
-            summary += f"   RUT: {self.rut}\n"
-        if self.ci:
-            summary += f"   CI: {self.ci}\n"
-        if self.registro_comercio:
-            summary += f"   Registro Comercio: {self.registro_comercio}\n"
-        if self.acta_number:
-            summary += f"   Acta N°: {self.acta_number}\n"
-        if self.padron_bps:
-            summary += f"   Padrón BPS: {self.padron_bps}\n"
+        labels = [
+            ('company_name', "Empresa"),
+            ('rut', "RUT"),
+            ('ci', "CI"),
+            ('registro_comercio', "Registro Comercio"),
+            ('acta_number', "Acta N°"),
+            ('padron_bps', "Padrón BPS"),
+        ]
+        for field_name, label in labels:
+            value = getattr(self, field_name)
+            if value:
+                page = self.get_field_page(field_name)
+                location = f" (pág. {page})" if page else ""
+                summary += f"   {label}: {value}{location}\n"
         if self.dates:
             summary += f"   Fechas encontradas: {', '.join(self.dates[:3])}\n"
         if self.emails:
@@ -256,14 +701,14 @@ class DocumentExtractionResult:
     error: Optional[str] = None
     success: bool = False
 
-    def to_dict(self) -> dict:
+    def to_dict(self, include_text: bool = False) -> dict:
         return {
             "file_name": self.document.file_name,
             "file_path": str(self.document.file_path),
             "document_type": self.document.detected_type.value if self.document.detected_type else None,
             "success": self.success,
             "error": self.error,
-            "extracted_data": self.extracted_data.to_dict() if self.extracted_data else None
+            "extracted_data": self.extracted_data.to_dict(include_text=include_text) if self.extracted_data else None
         }
 
 
@@ -282,17 +727,17 @@ class CollectionExtractionResult:
         """Get count of failed extractions"""
         return sum(1 for result in self.extraction_results if not result.success)
 
-    def to_dict(self) -> dict:
+    def to_dict(self, include_text: bool = False) -> dict:
         return {
             "total_documents": len(self.extraction_results),
             "successful": self.get_success_count(),
             "failed": self.get_failed_count(),
             "extraction_timestamp": self.extraction_timestamp.isoformat(),
-            "results": [result.to_dict() for result in self.extraction_results]
+            "results": [result.to_dict(include_text=include_text) for result in self.extraction_results]
         }
 
-    def to_json(self) -> str:
-        return json.dumps(self.to_dict(), ensure_ascii=False, indent=2)
+    def to_json(self, include_text: bool = False) -> str:
+        return json.dumps(self.to_dict(include_text=include_text), ensure_ascii=False, indent=2)
 
     def get_summary(self) -> str:
         """Get human-readable summary"""
@@ -331,6 +776,42 @@ class TextExtractor:
     Handles both digital PDFs and scanned documents (OCR).
     """
 
+    # Separator placed between pages when joining them into a single text
+    PAGE_SEPARATOR = "\n\n"
+
+    # OCR settings (Tesseract language and page rendering resolution)
+    OCR_LANGUAGE = "spa"
+    OCR_DPI = 300
+    OCR_MAX_WORKERS: Optional[int] = None  # None = CPU count, at most 4
+    OCR_DEADLINE_SECONDS: Optional[float] = None  # Time budget per document
+
+    # Documents processed at once by process_collection (1 = one after another)
+    COLLECTION_MAX_WORKERS = 1
+
+    # Shared on-disk extraction cache, disabled until configure_cache() is called
+    cache: Optional[ExtractionCache] = None
+
+    @staticmethod
+    def configure_cache(cache_dir: Optional[str], max_bytes: int = DEFAULT_MAX_BYTES) -> Optional[ExtractionCache]:
+        """Enable the extraction cache in cache_dir (or disable it with None)"""
+        TextExtractor.cache = ExtractionCache(cache_dir, max_bytes=max_bytes) if cache_dir else None
+        return TextExtractor.cache
+
+    @staticmethod
+    def get_cache_settings(document: UploadedDocument, max_pages: Optional[int], ocr: bool) -> Dict[str, Any]:
+        """
+        Settings that change extraction output, and therefore the cache key.
+        Which pages need OCR is not one of them: it follows from the file bytes.
+        """
+        return {
+            "ocr": ocr,
+            "ocr_language": TextExtractor.OCR_LANGUAGE,
+            "ocr_dpi": TextExtractor.OCR_DPI,
+            "max_pages": max_pages,
+            "file_format": document.file_format.value,
+            "is_scanned": document.is_scanned
+        }
+
     @staticmethod
     def extract_from_text_file(file_path: Path) -> str:
         """Extract text from plain text file"""
@@ -343,17 +824,146 @@ class TextExtractor:
                 return f.read()
 
     @staticmethod
-    def extract_from_pdf(file_path: Path) -> str:
+    @contextmanager
+    def _open_pdf_pages(file_path: Path):
         """
-        Extract text from PDF file.
+        Open a PDF and yield its page sequence without parsing page content.
 
-        Note: This is a placeholder. In production, use:
-        - PyPDF2 or pdfplumber for digital PDFs
-        - pytesseract + pdf2image for scanned PDFs
+        Uses PyPDF2 when installed, falling back to pdfplumber. Both expose
+        pages with an extract_text() method that parses only that page.
+        """
+        try:
+            from PyPDF2 import PdfReader
+        except ImportError:
+            PdfReader = None
+
+        if PdfReader is not None:
+            with open(file_path, 'rb') as handle:
+                yield PdfReader(handle).pages
+            return
+
+        try:
+            import pdfplumber
+        except ImportError as e:
+            raise ImportError("PDF extraction requires PyPDF2 or pdfplumber") from e
+
+        with pdfplumber.open(str(file_path)) as pdf:
+            yield pdf.pages
+
+    @staticmethod
+    def iter_pdf_pages(file_path: Path, max_pages: Optional[int] = None) -> Iterator[ExtractedPage]:
+        """
+        Lazily yield the text layer of a PDF, one page at a time.
+
+        Each page is parsed only when the caller asks for it, so consumers can
+        start working on page 1 before the rest of the document is read, and
+        stop after max_pages without touching the remaining pages.
+
+        Args:
+            file_path: Path to the PDF
+            max_pages: Optional cap on the number of pages to read
+
+        Yields:
+            ExtractedPage with source "pdf_text" (empty text for image-only pages)
+        """
+        with TextExtractor._open_pdf_pages(file_path) as pages:
+            total_pages = len(pages)
+            page_limit = total_pages if max_pages is None else min(total_pages, max_pages)
+
+            for index in range(page_limit):
+                text = pages[index].extract_text() or ""
+                yield ExtractedPage(
+                    page_number=index + 1,
+                    text=text.strip(),
+                    source="pdf_text"
+                )
+
+    @staticmethod
+    def extract_from_pdf(file_path: Path, max_pages: Optional[int] = None) -> str:
+        """
+        Extract the text layer of a digital PDF.
+
+        Pages are joined with PAGE_SEPARATOR. Use iter_pdf_pages() to
+        consume the document page by page instead.
         """
-        # TODO: Implement with PyPDF2 or pdfplumber
-        # For now, return mock text
-        return f"[PDF TEXT EXTRACTION - TODO: Implement with PyPDF2]\nFile: {file_path.name}"
+        pages = TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages)
+        return TextExtractor.PAGE_SEPARATOR.join(page.text for page in pages)
+
+    @staticmethod
+    def ocr_pdf_pages(file_path: Path, page_numbers: List[int]):
+        """
+        Queue OCR for PDF pages on the shared process pool.
+
+        Returns:
+            OCRJob whose page(n) / results() give ExtractedPage objects
+        """
+        from src.ocr_executor import get_ocr_executor
+
+        executor = get_ocr_executor(
+            lang=TextExtractor.OCR_LANGUAGE,
+            dpi=TextExtractor.OCR_DPI,
+            max_workers=TextExtractor.OCR_MAX_WORKERS
+        )
+        return executor.submit(file_path, page_numbers, deadline_seconds=TextExtractor.OCR_DEADLINE_SECONDS)
+
+    @staticmethod
+    def iter_mixed_pdf_pages(
+        file_path: Path,
+        ocr_pages: Optional[List[int]] = None,
+        max_pages: Optional[int] = None
+    ) -> Iterator[ExtractedPage]:
+        """
+        Yield PDF pages, OCRing only the pages listed in ocr_pages.
+
+        Pages with a text layer are taken as-is (source "pdf_text"). The pages
+        listed in ocr_pages (all pages when None) are OCRed in parallel as soon
+        as iteration starts, and each one is yielded in page order once ready.
+        """
+        if ocr_pages is None:
+            with TextExtractor._open_pdf_pages(file_path) as pages:
+                ocr_pages = list(range(1, len(pages) + 1))
+
+        wanted = [n for n in ocr_pages if max_pages is None or n <= max_pages]
+        if not wanted:
+            yield from TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages)
+            return
+
+        job = TextExtractor.ocr_pdf_pages(file_path, wanted)
+        ocr_set = set(wanted)
+
+        try:
+            for page in TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages):
+                if page.page_number in ocr_set:
+                    yield job.page(page.page_number)
+                else:
+                    yield page
+        finally:
+            # Consumer stopped early: drop OCR work nobody will read
+            job.cancel()
+
+    @staticmethod
+    def iter_classified_pdf_pages(file_path: Path, max_pages: Optional[int] = None) -> Iterator[ExtractedPage]:
+        """
+        Yield PDF pages, OCRing the ones whose text layer is too thin.
+
+        Pages are classified as they are read (DocumentTypeDetector.page_needs_ocr),
+        so the text layer is parsed once. OCR for every thin page is queued
+        before the first page is yielded, and runs in parallel.
+        """
+        pages = list(TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages))
+        wanted = [page.page_number for page in pages if DocumentTypeDetector.page_needs_ocr(page.text)]
+        if not wanted:
+            yield from pages
+            return
+
+        job = TextExtractor.ocr_pdf_pages(file_path, wanted)
+        ocr_set = set(wanted)
+        try:
+            for page in pages:
+                yield job.page(page.page_number) if page.page_number in ocr_set else page
+        finally:
+            # Consumer stopped early: drop OCR work nobody will read
+            job.cancel()
 
     @staticmethod
     def extract_from_docx(file_path: Path) -> str:
@@ -369,83 +979,189 @@ class TextExtractor:
     @staticmethod
     def extract_from_image_ocr(file_path: Path) -> str:
         """
-        Extract text from image using OCR.
+        Extract text from an image (JPG, PNG) using Tesseract OCR.
 
-        Note: This is a placeholder. In production, use:
-        - pytesseract with Spanish language support
-        - Or cloud OCR services (Google Vision, AWS Textract)
+        Runs on the shared OCR process pool; requires pytesseract and Pillow.
         """
-        # TODO: Implement with pytesseract
-        return f"[OCR EXTRACTION - TODO: Implement with pytesseract]\nFile: {file_path.name}"
+        from src.ocr_executor import get_ocr_executor, ocr_image_file
+
+        executor = get_ocr_executor(
+            lang=TextExtractor.OCR_LANGUAGE,
+            dpi=TextExtractor.OCR_DPI,
+            max_workers=TextExtractor.OCR_MAX_WORKERS
+        )
+        job = executor.submit(
+            file_path,
+            [1],
+            deadline_seconds=TextExtractor.OCR_DEADLINE_SECONDS,
+            page_worker=ocr_image_file
+        )
+        page = job.page(1)
+        if page.error:
+            raise RuntimeError(page.error)
+        return page.text
 
     @staticmethod
-    def extract_text(document: UploadedDocument) -> tuple[str, str]:
+    def get_extraction_method(
+        document: UploadedDocument,
+        ocr: bool = True,
+        pages: Optional[List[ExtractedPage]] = None
+    ) -> str:
         """
-        Extract text from document based on file format.
+        Return "ocr" for scanned documents and images, "text" otherwise.
+        With the extracted pages given, a PDF with any OCRed page is "ocr" too.
+        """
+        if not ocr:
+            return "text"
+        if document.file_format in [FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG]:
+            return "ocr"
+        if document.file_format == FileFormat.PDF:
+            if document.is_scanned or document.metadata.get("ocr_pages"):
+                return "ocr"
+            if pages and any(page.source in ("ocr", "skipped") for page in pages):
+                return "ocr"
+        return "text"
 
-        Returns:
-            tuple: (raw_text, extraction_method)
+    @staticmethod
+    def extract_pages(
+        document: UploadedDocument,
+        max_pages: Optional[int] = None,
+        ocr: bool = True
+    ) -> Iterator[ExtractedPage]:
+        """
+        Stream a document's text page by page, based on file format.
+
+        PDFs with a text layer are read lazily; formats without pagination
+        are returned as a single page. PDF pages are classified as digital
+        or scanned here, unless intake metadata already lists "ocr_pages".
+
+        Args:
+            document: UploadedDocument to read
+            max_pages: Optional cap on the number of pages to read
+            ocr: When False, only read existing text layers (images yield nothing)
+
+        Yields:
+            ExtractedPage objects in page order
         """
         file_path = document.file_path
 
         if document.file_format == FileFormat.TXT:
-            text = TextExtractor.extract_from_text_file(file_path)
-            return text, "text"
+            yield ExtractedPage(1, TextExtractor.extract_from_text_file(file_path), "text")
 
         elif document.file_format == FileFormat.PDF:
-            if document.is_scanned:
-                text = TextExtractor.extract_from_image_ocr(file_path)
-                return text, "ocr"
+            ocr_pages = document.metadata.get("ocr_pages")
+            if not ocr:
+                yield from TextExtractor.iter_pdf_pages(file_path, max_pages=max_pages)
+            elif ocr_pages is not None:
+                # Pages already classified (document metadata): OCR only those
+                yield from TextExtractor.iter_mixed_pdf_pages(file_path, ocr_pages, max_pages=max_pages)
+            elif document.is_scanned:
+                yield from TextExtractor.iter_mixed_pdf_pages(file_path, max_pages=max_pages)
             else:
-                text = TextExtractor.extract_from_pdf(file_path)
-                return text, "text"
+                yield from TextExtractor.iter_classified_pdf_pages(file_path, max_pages=max_pages)
 
         elif document.file_format in [FileFormat.DOCX, FileFormat.DOC]:
-            text = TextExtractor.extract_from_docx(file_path)
-            return text, "text"
+            yield ExtractedPage(1, TextExtractor.extract_from_docx(file_path), "docx")
 
         elif document.file_format in [FileFormat.JPG, FileFormat.JPEG, FileFormat.PNG]:
-            text = TextExtractor.extract_from_image_ocr(file_path)
-            return text, "ocr"
+            if ocr:
+                yield ExtractedPage(1, TextExtractor.extract_from_image_ocr(file_path), "ocr")
 
         else:
             raise ValueError(f"Unsupported file format: {document.file_format}")
 
     @staticmethod
-    def process_document(document: UploadedDocument) -> DocumentExtractionResult:
+    def extract_document(
+        document: UploadedDocument,
+        max_pages: Optional[int] = None,
+        ocr: bool = True
+    ) -> CachedExtraction:
+        """
+        Extract raw text, normalized text and page metadata for a document.
+
+        The extraction cache (if configured) is consulted first, so the same
+        bytes are never read, page-classified or OCRed twice. Results with
+        skipped pages are not cached, since an OCR deadline or failure may
+        not happen again.
+
+        Args:
+            document: UploadedDocument to read
+            max_pages: Optional cap on the number of pages to read
+            ocr: When False, only read existing text layers
+
+        Returns:
+            CachedExtraction
+        """
+        cache = TextExtractor.cache
+        key = None
+        if cache is not None:
+            settings = TextExtractor.get_cache_settings(document, max_pages, ocr)
+            key = cache.key_for_file(document.file_path, settings)
+            cached = cache.get(key)
+            if cached is not None:
+                return cached
+
+        pages = list(TextExtractor.extract_pages(document, max_pages=max_pages, ocr=ocr))
+        raw_text = TextExtractor.PAGE_SEPARATOR.join(page.text for page in pages)
+        normalized_text, page_spans = TextNormalizer.normalize_pages([page.text for page in pages])
+        entry = CachedExtraction(
+            raw_text=raw_text,
+            normalized_text=normalized_text,
+            extraction_method=TextExtractor.get_extraction_method(document, ocr=ocr, pages=pages),
+            pages=[page.to_dict() for page in pages],
+            page_spans=list(page_spans)
+        )
+
+        if cache is not None and not any(page.error for page in pages):
+            cache.put(key, entry)
+
+        return entry
+
+    @staticmethod
+    def extract_text(document: UploadedDocument, max_pages: Optional[int] = None) -> tuple[str, str]:
+        """
+        Extract text from document based on file format.
+
+        Returns:
+            tuple: (raw_text, extraction_method)
+        """
+        entry = TextExtractor.extract_document(document, max_pages=max_pages)
+        return entry.raw_text, entry.extraction_method
+
+    @staticmethod
+    def process_document(document: UploadedDocument, max_pages: Optional[int] = None) -> DocumentExtractionResult:
         """
         Process a single document: extract text and structure data.
 
         Args:
             document: UploadedDocument to process
+            max_pages: Optional cap on the number of pages to read
 
         Returns:
             DocumentExtractionResult
         """
         try:
-            # Step 1: Extract raw text
-            raw_text, extraction_method = TextExtractor.extract_text(document)
-
-            # Step 2: Normalize text
-            normalized_text = TextNormalizer.normalize_text(raw_text)
+            # Step 1 & 2: Extract raw text page by page and normalize it (cached)
+            extraction = TextExtractor.extract_document(document, max_pages=max_pages)
+            raw_text = extraction.raw_text
+            normalized_text = extraction.normalized_text
+            extraction_method = extraction.extraction_method
 
             # Step 3: Extract structured data
-            extracted_data = ExtractedData(
+            extracted_data = ExtractedData.from_text(
                 document_type=document.detected_type,
                 raw_text=raw_text,
                 normalized_text=normalized_text,
-                extraction_method=extraction_method
+                extraction_method=extraction_method,
+                page_char_counts=extraction.page_char_counts,
+                page_spans=array('i', extraction.page_spans)
             )
 
-            # Extract specific fields
-            extracted_data.company_name = DataExtractor.extract_company_name(normalized_text)
-            extracted_data.rut = DataExtractor.extract_rut(normalized_text)
-            extracted_data.ci = DataExtractor.extract_ci(normalized_text)
-            extracted_data.registro_comercio = DataExtractor.extract_registro_comercio(normalized_text)
-            extracted_data.acta_number = DataExtractor.extract_acta_number(normalized_text)
-            extracted_data.padron_bps = DataExtractor.extract_padron_bps(normalized_text)
-            extracted_data.dates = DataExtractor.extract_dates(normalized_text)
-            extracted_data.emails = DataExtractor.extract_emails(normalized_text)
+            # Extract specific fields in a single pass, keeping where each was found
+            matches = DataExtractor.scan(normalized_text)
+            for name, value in DataExtractor.fields_from_matches(matches).items():
+                setattr(extracted_data, name, value)
+            extracted_data.record_field_spans(matches)
 
             # Set confidence (OCR = lower confidence)
             extracted_data.confidence = 0.8 if extraction_method == "ocr" else 1.0
@@ -464,22 +1180,113 @@ class TextExtractor:
             )
 
     @staticmethod
-    def process_collection(collection: DocumentCollection) -> CollectionExtractionResult:
+    def uses_process_worker(document: UploadedDocument) -> bool:
+        """
+        Whether a document is processed in a worker process.
+
+        Parsing a PDF text layer is CPU-bound pure Python, so PDFs not known
+        to be scanned go to processes; pages a worker finds need OCR are OCRed
+        there (see _init_extraction_worker). Everything else runs in threads:
+        text and DOCX reads are I/O, and OCR already runs on the shared OCR
+        process pool.
+        """
+        return document.file_format == FileFormat.PDF and TextExtractor.get_extraction_method(document) != "ocr"
+
+    @staticmethod
+    def process_documents(
+        documents: List[UploadedDocument],
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int, DocumentExtractionResult], None]] = None,
+        max_pages: Optional[int] = None
+    ) -> List[DocumentExtractionResult]:
+        """
+        Process several documents, concurrently when max_workers > 1.
+
+        Args:
+            documents: Documents to process
+            max_workers: Documents processed at once (default: COLLECTION_MAX_WORKERS)
+            progress_callback: Called as (completed, total, result) after each
+                document finishes, always from the calling thread
+            max_pages: Optional cap on the number of pages to read per document
+
+        Returns:
+            DocumentExtractionResult list in the same order as documents
+        """
+        total = len(documents)
+        max_workers = max_workers or TextExtractor.COLLECTION_MAX_WORKERS
+        results: List[Optional[DocumentExtractionResult]] = [None] * total
+
+        if max_workers <= 1 or total <= 1:
+            for index, document in enumerate(documents):
+                results[index] = TextExtractor.process_document(document, max_pages=max_pages)
+                if progress_callback:
+                    progress_callback(index + 1, total, results[index])
+            return results
+
+        cache = TextExtractor.cache
+        cache_args = (str(cache.cache_dir), cache.max_bytes) if cache is not None else (None, DEFAULT_MAX_BYTES)
+        process_count = sum(1 for document in documents if TextExtractor.uses_process_worker(document))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as threads:
+            # Process documents also go through the threads, which bound how many
+            # documents this call has in flight on the shared pool
+            processes = get_extraction_pool() if process_count else None
+            futures = {}
+            try:
+                for index, document in enumerate(documents):
+                    if processes is not None and TextExtractor.uses_process_worker(document):
+                        future = threads.submit(
+                            _run_in_process, processes, document, max_pages, *cache_args
+                        )
+                    else:
+                        future = threads.submit(TextExtractor.process_document, document, max_pages)
+                    futures[future] = index
+
+                for completed, future in enumerate(as_completed(futures), start=1):
+                    index = futures[future]
+                    try:
+                        results[index] = future.result()
+                    except Exception as e:
+                        # process_document handles its own errors; this is the worker itself failing
+                        if isinstance(e, BrokenProcessPool):
+                            discard_extraction_pool(processes)
+                        results[index] = DocumentExtractionResult(
+                            document=documents[index],
+                            error=str(e),
+                            success=False
+                        )
+                    if progress_callback:
+                        progress_callback(completed, total, results[index])
+            finally:
+                # The pool outlives this call: drop only this call's queued documents
+                for future in futures:
+                    future.cancel()
+
+        return results
+
+    @staticmethod
+    def process_collection(
+        collection: DocumentCollection,
+        max_workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int, DocumentExtractionResult], None]] = None
+    ) -> CollectionExtractionResult:
         """
         Process entire document collection.
 
         Args:
             collection: DocumentCollection to process
+            max_workers: Documents processed at once (default: COLLECTION_MAX_WORKERS)
+            progress_callback: Called as (completed, total, result) after each document
 
         Returns:
-            CollectionExtractionResult
+            CollectionExtractionResult, with results in collection order
         """
         result = CollectionExtractionResult(collection=collection)
-
-        for document in collection.documents:
-            extraction_result = TextExtractor.process_document(document)
-            result.extraction_results.append(extraction_result)
-
+        result.extraction_results.extend(TextExtractor.process_documents(
+            collection.documents,
+            max_workers=max_workers,
+            progress_callback=progress_callback
+        ))
         return result
 
     @staticmethod
@@ -490,6 +1297,80 @@ class TextExtractor:
         print(f"\n✅ Resultados de extracción guardados en: {output_path}")
 
 
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+_extraction_pool_lock = threading.Lock()
+
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    """
+    Process pool (one worker per CPU) for digital-PDF extraction, created on
+    first use and shared by every process_documents() call, so worker
+    start-up is paid once per process.
+    """
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None:
+            _extraction_pool = ProcessPoolExecutor(
+                max_workers=os.cpu_count() or 1, initializer=_init_extraction_worker
+            )
+        return _extraction_pool
+
+
+def discard_extraction_pool(pool: Optional[ProcessPoolExecutor] = None) -> None:
+    """
+    Shut the shared pool down; the next call creates a new one.
+    With pool given, only if it is still the shared one (e.g. a broken pool).
+    """
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is None or (pool is not None and _extraction_pool is not pool):
+            return
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
+
+atexit.register(discard_extraction_pool)
+
+
+def _init_extraction_worker() -> None:
+    """
+    Set up a new extraction process. Pools inherited through fork belong
+    to the parent and are dropped. PDF pages found to need OCR here use a
+    one-process OCR pool, since the extraction pool already runs one
+    document per CPU.
+    """
+    global _extraction_pool
+    from src import ocr_executor
+
+    _extraction_pool = None
+    ocr_executor._default_executor = None
+    TextExtractor.OCR_MAX_WORKERS = 1
+
+
+def _run_in_process(
+    pool: ProcessPoolExecutor,
+    document: UploadedDocument,
+    max_pages: Optional[int],
+    cache_dir: Optional[str],
+    cache_max_bytes: int
+) -> DocumentExtractionResult:
+    """Process one document on the shared pool and wait for it (runs in a process_documents thread)"""
+    return pool.submit(_process_document_worker, document, max_pages, cache_dir, cache_max_bytes).result()
+
+
+def _process_document_worker(
+    document: UploadedDocument,
+    max_pages: Optional[int],
+    cache_dir: Optional[str],
+    cache_max_bytes: int
+) -> DocumentExtractionResult:
+    """Process one document in a worker process, sharing the parent's cache directory"""
+    cache = TextExtractor.cache
+    if cache_dir is not None and (cache is None or str(cache.cache_dir) != cache_dir):
+        TextExtractor.configure_cache(cache_dir, cache_max_bytes)
+    return TextExtractor.process_document(document, max_pages=max_pages)
+
+
 def example_usage():
     """Example usage of Phase 4"""
 
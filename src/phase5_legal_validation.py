@@ -490,6 +490,19 @@ class LegalValidator:
 
         return validation
 
+    @staticmethod
+    def _describe_source(result: DocumentExtractionResult, field_name: str) -> str:
+        """File name and page where a field value was found"""
+        page = result.extracted_data.get_field_page(field_name)
+        if page:
+            return f"{result.document.file_name}, pág. {page}"
+        return result.document.file_name
+
+    @staticmethod
+    def _describe_values(values: Dict[str, List[str]]) -> str:
+        """'VALUE (source; source), ...' for inconsistency reports"""
+        return ', '.join(f"{value} ({'; '.join(sources)})" for value, sources in values.items())
+
     @staticmethod
     def validate_cross_document_consistency(
         extraction_result: CollectionExtractionResult
@@ -500,16 +513,21 @@ class LegalValidator:
         """
         issues = []
 
-        # Collect all company names
-        company_names = set()
-        rut_numbers = set()
+        # Collect all company names and RUTs, with where each was found
+        company_names: Dict[str, List[str]] = {}
+        rut_numbers: Dict[str, List[str]] = {}
 
         for result in extraction_result.extraction_results:
             if result.success and result.extracted_data:
-                if result.extracted_data.company_name:
-                    company_names.add(result.extracted_data.company_name)
-                if result.extracted_data.rut:
-                    rut_numbers.add(result.extracted_data.rut)
+                data = result.extracted_data
+                if data.company_name:
+                    company_names.setdefault(data.company_name, []).append(
+                        LegalValidator._describe_source(result, 'company_name')
+                    )
+                if data.rut:
+                    rut_numbers.setdefault(data.rut, []).append(
+                        LegalValidator._describe_source(result, 'rut')
+                    )
 
         # Check for inconsistencies
         if len(company_names) > 1:
@@ -517,7 +535,7 @@ class LegalValidator:
                 field="company_name_consistency",
                 issue_type="inconsistent_data",
                 severity=ValidationSeverity.ERROR,
-                description=f"Nombre de empresa inconsistente entre documentos: {', '.join(company_names)}",
+                description=f"Nombre de empresa inconsistente entre documentos: {LegalValidator._describe_values(company_names)}",
                 recommendation="Verificar que todos los documentos correspondan a la misma empresa"
             ))
 
@@ -526,7 +544,7 @@ class LegalValidator:
                 field="rut_consistency",
                 issue_type="inconsistent_data",
                 severity=ValidationSeverity.ERROR,
-                description=f"RUT inconsistente entre documentos: {', '.join(rut_numbers)}",
+                description=f"RUT inconsistente entre documentos: {LegalValidator._describe_values(rut_numbers)}",
                 recommendation="Verificar que todos los documentos correspondan al mismo RUT"
             ))
 
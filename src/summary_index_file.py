@@ -0,0 +1,452 @@
+"""
+Summary Index File
+
+Compiled, memory-mapped lookup tables for certificate_summary.json, stored
+next to it (certificate_summary.json.idx):
+- Every summary entry (certificate mapping + non-certificate documents)
+  encoded once into a compact entry store, addressed through an offset table
+- Filename and customer keys, normalized at compile time, sorted into
+  fixed-size records that are binary-searched straight from the mapping;
+  each key points at its entry ids
+- Versioned by the SHA-256 of the source JSON: the file is recompiled only
+  when the summary content changes
+- Written through a temp file + rename, so open mappings stay valid; when
+  the summary's folder is read-only the index goes to a cache folder
+
+Opening an up-to-date index reads a fixed-size header and maps the file, and
+a lookup touches only the pages of the records and entries it needs, so
+neither depends on the size of the dataset. Entries are decoded on access.
+"""
+
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+import errno
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from src.fuzzy_index import TrigramIndex
+from src.keyword_classifier import normalize_text
+
+
+# Bump whenever the layout or the key normalization changes
+FORMAT_VERSION = 1
+MAGIC = b"NSUMIDX\0"
+INDEX_SUFFIX = ".idx"
+# Index files of summaries whose own folder is not writable
+INDEX_CACHE_DIR = os.path.join(tempfile.gettempdir(), "summary_index")
+
+SECTIONS = (
+    "entry_offsets",      # uint64 * (entries + 1), into entries
+    "entries",            # compact JSON per entry
+    "filename_records",   # sorted (key offset, key length, postings offset, postings count)
+    "filename_keys",
+    "filename_postings",  # uint32 entry ids
+    "customer_records",
+    "customer_keys",
+    "customer_postings",
+    "meta",               # JSON: counts and identified_certificate_types
+    "display",            # JSON: display filenames and customers, for suggestions
+)
+
+# magic, format version, source size, source mtime_ns, source sha256, then (offset, length) per section
+_HEADER = struct.Struct("<8sIqq32s" + "QQ" * len(SECTIONS))
+_RECORD = struct.Struct("<IIII")
+_OFFSET = struct.Struct("<Q")
+_ENTRY_ID = struct.Struct("<I")
+
+# mkstemp creates files readable by the owner only; written files get the
+# usual umask-based mode instead (read once: os.umask can only be read by setting it)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def make_filename_keys(filename: str) -> List[str]:
+    """Normalized lookup keys of a filename: with and without extension"""
+    if not filename:
+        return []
+    path = Path(filename)
+    keys = {
+        normalize_text(path.name),
+        normalize_text(path.stem),
+    }
+    return [key for key in keys if key]
+
+
+def source_digest(path: str, chunk_size: int = 1024 * 1024) -> bytes:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for chunk in iter(lambda: handle.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.digest()
+
+
+def summary_entries(summary: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Flat entry list of a summary, tagged with group and entry_type"""
+    entries: List[Dict[str, Any]] = []
+
+    for group, group_entries in summary.get("certificate_file_mapping", {}).items():
+        for entry in group_entries:
+            item = dict(entry)
+            item["group"] = group
+            item["entry_type"] = "certificate"
+            entries.append(item)
+
+    for entry in summary.get("non_certificate_documents", []):
+        item = dict(entry)
+        item["group"] = "non_certificate"
+        item["entry_type"] = "non_certificate"
+        entries.append(item)
+
+    return entries
+
+
+def write_file_atomic(path: str, chunks: Iterable[bytes]) -> str:
+    """
+    Write a file through a temp file in the same folder and rename it over path,
+    so readers (and open mappings) never see a partial file.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def cache_index_path(summary_path: str) -> str:
+    """Index file of a summary in INDEX_CACHE_DIR, unique per summary location"""
+    location = hashlib.sha256(os.path.abspath(summary_path).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(INDEX_CACHE_DIR, f"{os.path.basename(summary_path)}.{location}{INDEX_SUFFIX}")
+
+
+def _key_table(index: Dict[str, List[int]]) -> Tuple[bytes, bytes, bytes]:
+    records = bytearray()
+    keys = bytearray()
+    postings = bytearray()
+    for key in sorted(index, key=lambda value: value.encode("utf-8")):
+        key_bytes = key.encode("utf-8")
+        ids = index[key]
+        records += _RECORD.pack(len(keys), len(key_bytes), len(postings) // _ENTRY_ID.size, len(ids))
+        keys += key_bytes
+        postings += struct.pack(f"<{len(ids)}I", *ids)
+    return bytes(records), bytes(keys), bytes(postings)
+
+
+def compile_summary_index(summary_path: str, index_path: Optional[str] = None) -> str:
+    """
+    Compile certificate_summary.json into its index file.
+    The file is written to a temp file and renamed, so open mappings stay valid.
+
+    Returns:
+        Path of the index file
+    """
+    index_path = index_path or summary_path + INDEX_SUFFIX
+    stat = os.stat(summary_path)
+    with open(summary_path, "rb") as handle:
+        raw = handle.read()
+    summary = json.loads(raw.decode("utf-8"))
+    entries = summary_entries(summary)
+
+    entry_blob = bytearray()
+    entry_offsets = bytearray(_OFFSET.pack(0))
+    filename_index: Dict[str, List[int]] = {}
+    customer_index: Dict[str, List[int]] = {}
+    filenames_display = set()
+    customers_display = set()
+    certificates = 0
+
+    for entry_id, entry in enumerate(entries):
+        entry_blob += json.dumps(entry, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry_offsets += _OFFSET.pack(len(entry_blob))
+        if entry["entry_type"] == "certificate":
+            certificates += 1
+
+        filename = entry.get("filename") or entry.get("path") or ""
+        if filename:
+            filenames_display.add(filename)
+        for key in make_filename_keys(filename):
+            filename_index.setdefault(key, []).append(entry_id)
+
+        customer = entry.get("customer") or ""
+        if customer:
+            customers_display.add(customer)
+        customer_key = normalize_text(customer)
+        if customer_key:
+            customer_index.setdefault(customer_key, []).append(entry_id)
+
+    meta = {
+        "counts": {
+            "entries": len(entries),
+            "certificates": certificates,
+            "non_certificates": len(entries) - certificates,
+        },
+        "identified_certificate_types": summary.get("identified_certificate_types", {}),
+    }
+    display = {
+        "filenames": sorted(filenames_display),
+        "customers": sorted(customers_display),
+    }
+
+    sections = [bytes(entry_offsets), bytes(entry_blob)]
+    sections.extend(_key_table(filename_index))
+    sections.extend(_key_table(customer_index))
+    sections.append(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+    sections.append(json.dumps(display, ensure_ascii=False).encode("utf-8"))
+
+    table = []
+    offset = _HEADER.size
+    for section in sections:
+        table.extend((offset, len(section)))
+        offset += len(section)
+    header = _HEADER.pack(
+        MAGIC, FORMAT_VERSION, stat.st_size, stat.st_mtime_ns,
+        hashlib.sha256(raw).digest(), *table
+    )
+
+    return write_file_atomic(index_path, [header] + sections)
+
+
+class EntryView(Sequence):
+    """Read-only sequence of the summary entries, decoded on access"""
+
+    def __init__(self, index_file: 'SummaryIndexFile'):
+        self._file = index_file
+
+    def __len__(self) -> int:
+        return self._file.entry_count
+
+    def __getitem__(self, entry_id):
+        if isinstance(entry_id, slice):
+            return [self._file.entry(i) for i in range(*entry_id.indices(len(self)))]
+        if entry_id < 0:
+            entry_id += len(self)
+        if not 0 <= entry_id < len(self):
+            raise IndexError(entry_id)
+        return self._file.entry(entry_id)
+
+
+class KeyTableView(Mapping):
+    """Read-only mapping of normalized key -> list of entries, binary-searched in the file"""
+
+    def __init__(self, index_file: 'SummaryIndexFile', name: str):
+        self._file = index_file
+        self._records = index_file.section(f"{name}_records")
+        self._keys = index_file.section(f"{name}_keys")
+        self._postings = index_file.section(f"{name}_postings")
+        self._count = len(self._records) // _RECORD.size
+
+    def _record(self, position: int) -> Tuple[int, int, int, int]:
+        return _RECORD.unpack_from(self._records, position * _RECORD.size)
+
+    def _key_at(self, position: int) -> bytes:
+        key_offset, key_length, _, _ = self._record(position)
+        return bytes(self._keys[key_offset:key_offset + key_length])
+
+    def _find(self, key: str) -> Optional[int]:
+        target = key.encode("utf-8")
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._key_at(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self._count and self._key_at(low) == target:
+            return low
+        return None
+
+    def release(self) -> None:
+        for view in (self._records, self._keys, self._postings):
+            view.release()
+
+    def entry_ids(self, key: str) -> Tuple[int, ...]:
+        position = self._find(key) if isinstance(key, str) else None
+        if position is None:
+            return ()
+        _, _, postings_offset, postings_count = self._record(position)
+        return struct.unpack_from(f"<{postings_count}I", self._postings, postings_offset * _ENTRY_ID.size)
+
+    def __getitem__(self, key: str) -> List[Dict[str, Any]]:
+        entry_ids = self.entry_ids(key)
+        if not entry_ids:
+            raise KeyError(key)
+        return [self._file.entry(entry_id) for entry_id in entry_ids]
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self._find(key) is not None
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __iter__(self) -> Iterator[str]:
+        for position in range(self._count):
+            yield self._key_at(position).decode("utf-8")
+
+
+class SummaryIndexFile:
+    """An opened index file; safe to share across threads"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        if len(self._map) < _HEADER.size:
+            self.close()
+            raise ValueError(f"Not a summary index: {path}")
+        fields = _HEADER.unpack_from(self._map, 0)
+        magic, version, self.source_size, self.source_mtime_ns, self.source_sha256 = fields[:5]
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"Not a summary index (or another format version): {path}")
+        table = fields[5:]
+        self._sections = {
+            name: (table[2 * n], table[2 * n + 1]) for n, name in enumerate(SECTIONS)
+        }
+        self.entry_count = self._sections["entry_offsets"][1] // _OFFSET.size - 1
+        self.entries = EntryView(self)
+        self.filename_index = KeyTableView(self, "filename")
+        self.customer_index = KeyTableView(self, "customer")
+        self._lock = threading.Lock()
+        self._meta: Optional[Dict[str, Any]] = None
+        self._fuzzy: Dict[str, TrigramIndex] = {}
+
+    @property
+    def version(self) -> str:
+        """Short hash of the source summary"""
+        return self.source_sha256.hex()[:12]
+
+    def section(self, name: str) -> memoryview:
+        offset, length = self._sections[name]
+        return self._view[offset:offset + length]
+
+    def entry(self, entry_id: int) -> Dict[str, Any]:
+        """Decode one entry; each call returns a new dict"""
+        offsets_offset = self._sections["entry_offsets"][0]
+        start, end = struct.unpack_from("<QQ", self._map, offsets_offset + entry_id * _OFFSET.size)
+        entries_offset = self._sections["entries"][0]
+        return json.loads(self._map[entries_offset + start:entries_offset + end].decode("utf-8"))
+
+    def _json_section(self, name: str) -> Dict[str, Any]:
+        offset, length = self._sections[name]
+        return json.loads(self._map[offset:offset + length].decode("utf-8"))
+
+    @property
+    def meta(self) -> Dict[str, Any]:
+        with self._lock:
+            if self._meta is None:
+                self._meta = self._json_section("meta")
+            return self._meta
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        """Number of entries, certificates and non-certificates"""
+        return self.meta["counts"]
+
+    @property
+    def identified_certificate_types(self) -> Dict[str, Any]:
+        return self.meta["identified_certificate_types"]
+
+    def fuzzy(self, kind: str) -> TrigramIndex:
+        """Suggestion index over display "filenames" or "customers", built on first use"""
+        with self._lock:
+            if not self._fuzzy:
+                display = self._json_section("display")
+                self._fuzzy = {
+                    "filenames": TrigramIndex(display["filenames"]),
+                    "customers": TrigramIndex(display["customers"]),
+                }
+            return self._fuzzy[kind]
+
+    def matches_source(self, summary_path: str) -> bool:
+        """Whether the source file still has the size and mtime this index was compiled from"""
+        stat = os.stat(summary_path)
+        return stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns
+
+    def close(self) -> None:
+        # Views into the mapping must be released before it can be closed
+        for table in (getattr(self, "filename_index", None), getattr(self, "customer_index", None)):
+            if table is not None:
+                table.release()
+        self._view.release()
+        self._map.close()
+
+
+def _is_read_only_error(exc: OSError) -> bool:
+    return exc.errno in (errno.EACCES, errno.EPERM, errno.EROFS)
+
+
+def _touch_source_stat(index_path: str, summary_path: str) -> None:
+    """
+    Record a new size/mtime for a source whose content did not change.
+    The index is rewritten through a temp file, so other processes mapping
+    it never see a half-updated header.
+    """
+    stat = os.stat(summary_path)
+    with open(index_path, "rb") as handle:
+        raw = bytearray(handle.read())
+    struct.pack_into("<qq", raw, len(MAGIC) + 4, stat.st_size, stat.st_mtime_ns)
+    write_file_atomic(index_path, [bytes(raw)])
+
+
+def _open_current(summary_path: str, index_path: str) -> Optional[SummaryIndexFile]:
+    """The index at index_path if it was compiled from the current summary content"""
+    if not os.path.exists(index_path):
+        return None
+    try:
+        index_file = SummaryIndexFile(index_path)
+    except (OSError, ValueError):
+        return None
+
+    if index_file.matches_source(summary_path):
+        return index_file
+    if index_file.source_sha256 != source_digest(summary_path):
+        index_file.close()
+        return None
+    try:
+        index_file.close()
+        _touch_source_stat(index_path, summary_path)
+    except OSError as exc:
+        # Read-only folder: the index is still current, the source is re-hashed on the next open
+        if not _is_read_only_error(exc):
+            raise
+    return SummaryIndexFile(index_path)
+
+
+def open_summary_index(summary_path: str, index_path: Optional[str] = None) -> SummaryIndexFile:
+    """
+    Open the index of a summary, compiling it first when missing or stale.
+
+    An index whose recorded size and mtime match the source opens without
+    reading the source; otherwise the source is hashed and the index is
+    recompiled only if the content changed. When the index folder is not
+    writable, the index is compiled to (and later reopened from) cache_index_path().
+    """
+    index_path = index_path or summary_path + INDEX_SUFFIX
+    cache_path = cache_index_path(summary_path)
+    for path in (index_path, cache_path):
+        index_file = _open_current(summary_path, path)
+        if index_file is not None:
+            return index_file
+
+    try:
+        compile_summary_index(summary_path, index_path)
+        return SummaryIndexFile(index_path)
+    except OSError as exc:
+        if not _is_read_only_error(exc):
+            raise
+    os.makedirs(INDEX_CACHE_DIR, exist_ok=True)
+    compile_summary_index(summary_path, cache_path)
+    return SummaryIndexFile(cache_path)
@@ -0,0 +1,312 @@
+"""
+Summary Matching
+
+Matches uploaded documents against certificate_summary.json, for both
+Streamlit apps (chatbot.py and chatbot_llm.py). Each document goes down a
+fixed ladder and stops at the first rung that matches:
+- Filename match (certificate, error-flagged or non-certificate entry)
+- Customer (subject name or extracted company) and purpose
+- Content similarity against the historical certificates (ContentIndex),
+  left for review when the LLM says the document is not a certificate
+- LLM classification that fits the summary taxonomy
+- Keyword classification of the content
+Otherwise it gets fuzzy filename and customer suggestions.
+
+summary_index is SummaryStore.summary_index: filename_index,
+customer_index, summary_reference, index_file and content_index.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from src.keyword_classifier import keyword_classification, normalize_purpose, normalize_text
+from src.summary_index_file import make_filename_keys
+
+
+# Cosine similarity a historical certificate must exceed to count as a content match
+CONTENT_MATCH_MIN_SCORE = 0.5
+CONTENT_MATCH_LIMIT = 5
+
+
+def is_certificate_entry(entry: Dict[str, Any]) -> bool:
+    return entry.get("entry_type") == "certificate"
+
+
+def entry_has_error(entry: Dict[str, Any]) -> bool:
+    return bool(entry.get("error_flag"))
+
+
+def purpose_matches(
+    entry_purpose: str,
+    user_purpose: str,
+    normalize: Callable[[str], str] = normalize_purpose,
+) -> bool:
+    if not entry_purpose or not user_purpose:
+        return False
+    entry_norm = normalize(entry_purpose)
+    user_norm = normalize(user_purpose)
+    if not entry_norm or not user_norm:
+        return False
+    return entry_norm == user_norm or entry_norm in user_norm or user_norm in entry_norm
+
+
+def dedupe_entries(entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen = set()
+    unique = []
+    for entry in entries:
+        key = (entry.get("customer"), entry.get("filename"), entry.get("path"))
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(entry)
+    return unique
+
+
+class MatchContext:
+    """
+    Summary lookups shared by the documents of one match_documents() call.
+
+    Filename and customer lookups, purpose normalization and suggestions are
+    memoized by their input, so a folder of files from one customer resolves
+    the customer, its entries and its suggestions once.
+    """
+
+    def __init__(self, summary_index: Dict[str, Any]):
+        self.summary_index = summary_index
+        self._names: Dict[str, str] = {}
+        self._purposes: Dict[str, str] = {}
+        self._filename_entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._customer_entries: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+        self._customer_purpose_entries: Dict[Tuple[Tuple[str, ...], str], List[Dict[str, Any]]] = {}
+        self._taxonomy_purposes: Dict[str, List[str]] = {}
+        self._suggestions: Dict[Tuple[str, str], List[Tuple[str, float]]] = {}
+
+    def normalize_name(self, value: str) -> str:
+        if value not in self._names:
+            self._names[value] = normalize_text(value)
+        return self._names[value]
+
+    def normalize_purpose(self, value: str) -> str:
+        if value not in self._purposes:
+            self._purposes[value] = normalize_purpose(value)
+        return self._purposes[value]
+
+    def filename_entries(self, filename: str) -> List[Dict[str, Any]]:
+        if filename not in self._filename_entries:
+            matched_entries: List[Dict[str, Any]] = []
+            for key in make_filename_keys(filename):
+                matched_entries.extend(self.summary_index["filename_index"].get(key, []))
+            self._filename_entries[filename] = dedupe_entries(matched_entries)
+        return self._filename_entries[filename]
+
+    def customer_keys(self, subject_name: str, extracted_company: Optional[str]) -> Tuple[str, ...]:
+        customer_keys = []
+        if subject_name:
+            customer_keys.append(self.normalize_name(subject_name))
+        if extracted_company and self.normalize_name(extracted_company) not in customer_keys:
+            customer_keys.append(self.normalize_name(extracted_company))
+        return tuple(customer_keys)
+
+    def customer_entries(self, customer_keys: Tuple[str, ...]) -> List[Dict[str, Any]]:
+        if customer_keys not in self._customer_entries:
+            customer_matches: List[Dict[str, Any]] = []
+            for key in customer_keys:
+                customer_matches.extend(self.summary_index["customer_index"].get(key, []))
+            self._customer_entries[customer_keys] = dedupe_entries(customer_matches)
+        return self._customer_entries[customer_keys]
+
+    def customer_purpose_entries(self, customer_keys: Tuple[str, ...], purpose_value: str) -> List[Dict[str, Any]]:
+        """Certificate entries of the customer whose purpose matches purpose_value"""
+        key = (customer_keys, purpose_value)
+        if key not in self._customer_purpose_entries:
+            self._customer_purpose_entries[key] = [
+                entry for entry in self.customer_entries(customer_keys)
+                if purpose_matches(entry.get("purpose", ""), purpose_value, self.normalize_purpose)
+                and is_certificate_entry(entry)
+            ]
+        return self._customer_purpose_entries[key]
+
+    def taxonomy_purposes(self, cert_type: str) -> List[str]:
+        """Normalized purposes of a summary certificate type"""
+        if cert_type not in self._taxonomy_purposes:
+            purpose_list = self.summary_index.get("summary_reference", {})[cert_type].get("purposes", [])
+            self._taxonomy_purposes[cert_type] = [self.normalize_purpose(p) for p in purpose_list]
+        return self._taxonomy_purposes[cert_type]
+
+    def suggestions(self, kind: str, query: str) -> List[Tuple[str, float]]:
+        if (kind, query) not in self._suggestions:
+            self._suggestions[(kind, query)] = self.summary_index["index_file"].fuzzy(kind).top_matches(query)
+        return list(self._suggestions[(kind, query)])
+
+
+def match_document(
+    filename: str,
+    subject_name: str,
+    extracted_company: Optional[str],
+    purpose_value: str,
+    summary_index: Dict[str, Any],
+    llm_result: Optional[Dict[str, Any]] = None,
+    keyword_result: Optional[Dict[str, Any]] = None,
+    content_text: str = "",
+    content_only: bool = False,
+    context: Optional[MatchContext] = None,
+) -> Dict[str, Any]:
+    context = context or MatchContext(summary_index)
+
+    if not content_only:
+        matched_entries = context.filename_entries(filename)
+
+        if matched_entries:
+            cert_entries = [e for e in matched_entries if is_certificate_entry(e)]
+            non_cert_entries = [e for e in matched_entries if not is_certificate_entry(e)]
+            if cert_entries:
+                if any(entry_has_error(entry) for entry in cert_entries):
+                    return {
+                        "status": "not_found",
+                        "match_type": "filename_error",
+                        "confidence": 0.6,
+                        "reason": "Filename matched, but entry is flagged as error in dataset.",
+                        "matches": cert_entries,
+                    }
+                return {
+                    "status": "correct",
+                    "match_type": "filename",
+                    "confidence": 1.0,
+                    "reason": "Exact filename match found in certificate dataset.",
+                    "matches": cert_entries,
+                }
+            if non_cert_entries:
+                if llm_result and llm_result.get("is_certificate") is True:
+                    return {
+                        "status": "needs_review",
+                        "match_type": "filename_non_certificate_llm_conflict",
+                        "confidence": 0.6,
+                        "reason": "Filename is non-certificate, but LLM classified as certificate.",
+                        "matches": non_cert_entries,
+                        "llm_result": llm_result,
+                    }
+                return {
+                    "status": "not_found",
+                    "match_type": "filename_non_certificate",
+                    "confidence": 0.8,
+                    "reason": "Filename matched, but document is classified as non-certificate.",
+                    "matches": non_cert_entries,
+                }
+
+    customer_keys = context.customer_keys(subject_name, extracted_company)
+    customer_matches = context.customer_entries(customer_keys)
+
+    if customer_matches:
+        cert_entries = context.customer_purpose_entries(customer_keys, purpose_value)
+        if cert_entries:
+            return {
+                "status": "correct",
+                "match_type": "customer_purpose",
+                "confidence": 0.7,
+                "reason": "Customer and purpose match found in certificate dataset.",
+                "matches": list(cert_entries),
+            }
+        return {
+            "status": "not_found",
+            "match_type": "customer_only",
+            "confidence": 0.5,
+            "reason": "Customer match found, but no purpose match for this document.",
+            "matches": customer_matches[:5],
+        }
+
+    # Nearest historical certificates by extracted text: local, no API call
+    content_index = summary_index.get("content_index")
+    if content_text and content_index is not None:
+        content_matches = content_index.query(
+            content_text, limit=CONTENT_MATCH_LIMIT, min_score=CONTENT_MATCH_MIN_SCORE
+        )
+        if content_matches:
+            best = content_matches[0]
+            if llm_result and llm_result.get("is_certificate") is False:
+                return {
+                    "status": "needs_review",
+                    "match_type": "content_similarity_llm_conflict",
+                    "confidence": round(best.score, 3),
+                    "reason": "Content is similar to a historical certificate, but LLM classified as non-certificate.",
+                    "matches": [match.to_dict() for match in content_matches],
+                    "llm_result": llm_result,
+                }
+            return {
+                "status": "correct",
+                "match_type": "content_similarity",
+                "confidence": round(best.score, 3),
+                "reason": f"Content is similar to historical certificate {best.entry.get('filename', '')}.",
+                "matches": [match.to_dict() for match in content_matches],
+                "llm_result": llm_result,
+            }
+
+    if llm_result and llm_result.get("is_certificate") is True:
+        llm_type = llm_result.get("certificate_type", "")
+        llm_purpose = llm_result.get("purpose", "")
+        summary_types = summary_index.get("summary_reference", {})
+        if llm_type in summary_types:
+            purpose_list = context.taxonomy_purposes(llm_type)
+            if not purpose_list or context.normalize_purpose(llm_purpose) in purpose_list:
+                return {
+                    "status": "correct",
+                    "match_type": "llm_only",
+                    "confidence": float(llm_result.get("confidence", 0.5)),
+                    "reason": "LLM classified document type matches summary taxonomy.",
+                    "matches": [],
+                    "llm_result": llm_result,
+                }
+
+    if content_text:
+        if not keyword_result:
+            keyword_result = keyword_classification(content_text, summary_index.get("summary_reference", {}))
+        if keyword_result.get("status") == "ok":
+            return {
+                "status": "correct",
+                "match_type": "content_keywords",
+                "confidence": float(keyword_result.get("confidence", 0.5)),
+                "reason": keyword_result.get("reason", "Keyword match from content."),
+                "matches": [],
+                "llm_result": llm_result,
+                "keyword_result": keyword_result,
+            }
+
+    filename_suggestions = context.suggestions("filenames", filename)
+    customer_suggestions = context.suggestions("customers", subject_name)
+
+    return {
+        "status": "not_found",
+        "match_type": "none",
+        "confidence": 0.0,
+        "reason": "No strong match found in certificate_summary.json.",
+        "matches": [],
+        "suggestions": {
+            "filename": filename_suggestions,
+            "customer": customer_suggestions,
+        },
+    }
+
+
+def match_documents(
+    documents: List[Dict[str, Any]],
+    summary_index: Dict[str, Any],
+    content_only: bool = False,
+) -> List[Dict[str, Any]]:
+    """
+    Match a batch of documents (e.g. a whole client folder) against the summary.
+
+    Each document is a dict of match_document() keyword arguments: filename,
+    subject_name, extracted_company, purpose_value and optionally llm_result,
+    keyword_result and content_text. Results come back in input order and are
+    the same as calling match_document() per document; the documents share
+    one MatchContext, so repeated customers, purposes and filenames are
+    normalized and looked up once.
+    """
+    context = MatchContext(summary_index)
+    return [
+        match_document(
+            summary_index=summary_index,
+            content_only=content_only,
+            context=context,
+            **document,
+        )
+        for document in documents
+    ]
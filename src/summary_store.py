@@ -0,0 +1,160 @@
+"""
+Summary Store
+
+Process-wide, read-only view of certificate_summary.json shared by every
+Streamlit session and rerun:
+- One SummaryStore per summary path, built once and handed out as is:
+  no per-rerun serialization or copying
+- Everything reachable from it is immutable (FrozenDict, tuples, the
+  memory-mapped index views), so sessions can share it safely
+- get_summary_store() stats the file on each call and reloads when its
+  mtime or size changed; reload_summary_store() forces a reload
+- The content-similarity index built offline for the summary
+  (certificate_summary.content.idx) is loaded with it, when present, and
+  a rebuilt content index also triggers a reload
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Mapping, Optional, Tuple
+import os
+import threading
+
+from src.content_index import ContentIndex, content_index_path, open_content_index
+from src.summary_index_file import SummaryIndexFile, open_summary_index
+
+
+class FrozenDict(dict):
+    """
+    A dict that refuses mutation.
+
+    Still a dict, so json.dumps, isinstance checks and dict(...) copies work
+    unchanged; copy it with dict(...) to get a mutable version.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("FrozenDict is read-only")
+
+    __setitem__ = _read_only
+    __delitem__ = _read_only
+    __ior__ = _read_only
+    clear = _read_only
+    pop = _read_only
+    popitem = _read_only
+    setdefault = _read_only
+    update = _read_only
+
+    def __reduce__(self):
+        return (FrozenDict, (dict(self),))
+
+
+def freeze(value: Any) -> Any:
+    """Deep read-only copy: dicts become FrozenDicts, lists and tuples become tuples"""
+    if isinstance(value, Mapping):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def build_llm_reference(identified_certificate_types: Mapping[str, Any]) -> FrozenDict:
+    """Per-type purposes, attributes and examples given to the classifiers"""
+    reference = {}
+    for cert_type, info in identified_certificate_types.items():
+        reference[cert_type] = {
+            "count": info.get("count", 0),
+            "purposes": list(info.get("purposes", {}).keys()),
+            "attributes": info.get("attributes", []),
+            "examples": info.get("examples", [])[:3],
+        }
+    return freeze(reference)
+
+
+@dataclass(frozen=True)
+class SummaryStore:
+    """One loaded version of a summary file"""
+    path: str
+    mtime_ns: int
+    size: int
+    index_file: SummaryIndexFile
+    # None when build_content_index.py was never run for this summary
+    content_index: Optional[ContentIndex]
+    content_stat: Optional[Tuple[int, int]]
+    summary_reference: FrozenDict
+    # Lookup tables in the shape match_document() expects
+    summary_index: FrozenDict
+
+    @classmethod
+    def load(cls, path: str) -> 'SummaryStore':
+        stat = os.stat(path)
+        content_stat = _stat_key(content_index_path(path))
+        index_file = open_summary_index(path)
+        content_index = open_content_index(path, summary_sha256=index_file.source_sha256.hex())
+        summary_reference = build_llm_reference(index_file.identified_certificate_types)
+        summary_index = FrozenDict(
+            index_file=index_file,
+            content_index=content_index,
+            entries=index_file.entries,
+            filename_index=index_file.filename_index,
+            customer_index=index_file.customer_index,
+            summary_reference=summary_reference,
+        )
+        return cls(
+            path=path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            index_file=index_file,
+            content_index=content_index,
+            content_stat=content_stat,
+            summary_reference=summary_reference,
+            summary_index=summary_index,
+        )
+
+    @property
+    def counts(self) -> Dict[str, int]:
+        return self.index_file.counts
+
+    @property
+    def version(self) -> str:
+        return self.index_file.version
+
+    def is_current(self) -> bool:
+        """Whether the summary and content index files are still the ones this store was loaded from"""
+        if _stat_key(self.path) != (self.mtime_ns, self.size):
+            return False
+        return _stat_key(content_index_path(self.path)) == self.content_stat
+
+
+def _stat_key(path: str) -> Optional[Tuple[int, int]]:
+    """(mtime_ns, size) of a file, or None when it does not exist"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+_stores: Dict[str, SummaryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_summary_store(path: str) -> SummaryStore:
+    """Return the shared store for a summary file, reloading it if the file changed"""
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None or not store.is_current():
+            store = SummaryStore.load(path)
+            _stores[key] = store
+        return store
+
+
+def reload_summary_store(path: str) -> SummaryStore:
+    """
+    Load the summary file again, even if its mtime did not change.
+    Sessions holding the previous store keep using it until their next call.
+    """
+    key = os.path.abspath(path)
+    with _stores_lock:
+        store = SummaryStore.load(path)
+        _stores[key] = store
+        return store
@@ -0,0 +1,95 @@
+"""
+Taxonomy Context
+
+Certificate categories as sent to the LLM classifiers, compiled once per
+version of certificate_summary.json:
+- One line per certificate type with its purposes and example filenames
+- A version hash of the summary reference, so prompts (and cached LLM
+  answers) change whenever the summary does
+- Precomputed token count for prompt budgeting
+- A compact variant restricted to the types plausible for a document
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Tuple
+import hashlib
+import json
+import threading
+
+from src.llm_gateway import estimate_text_tokens
+
+
+@dataclass(frozen=True)
+class TaxonomyContext:
+    """Compiled category context for one summary version"""
+    version: str
+    lines: Tuple[Tuple[str, str], ...]  # (certificate type, context line), in summary order
+    text: str
+    token_count: int
+
+    @staticmethod
+    def reference_version(summary_reference: Dict[str, Any]) -> str:
+        """Short content hash of a summary reference"""
+        material = json.dumps(summary_reference, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(material.encode('utf-8')).hexdigest()[:12]
+
+    @staticmethod
+    def format_line(cert_type: str, info: Dict[str, Any]) -> str:
+        purposes = ", ".join(info.get("purposes", [])) or "none"
+        examples = "; ".join(info.get("examples", [])) or "none"
+        return f"- {cert_type}: purposes={purposes}; examples={examples}"
+
+    @classmethod
+    def from_reference(cls, summary_reference: Dict[str, Any]) -> 'TaxonomyContext':
+        lines = tuple(
+            (cert_type, cls.format_line(cert_type, info))
+            for cert_type, info in summary_reference.items()
+        )
+        text = "\n".join(line for _, line in lines)
+        return cls(
+            version=cls.reference_version(summary_reference),
+            lines=lines,
+            text=text,
+            token_count=estimate_text_tokens(text)
+        )
+
+    @property
+    def cert_types(self) -> Tuple[str, ...]:
+        return tuple(cert_type for cert_type, _ in self.lines)
+
+    def compact(self, cert_types: Iterable[str]) -> str:
+        """
+        Context lines for the given types only, in summary order.
+        Falls back to the full context when none of them is known.
+        """
+        wanted = set(cert_types)
+        selected = [line for cert_type, line in self.lines if cert_type in wanted]
+        return "\n".join(selected) if selected else self.text
+
+
+_contexts: Dict[str, TaxonomyContext] = {}
+_contexts_by_id: 'OrderedDict[int, Tuple[Dict[str, Any], TaxonomyContext]]' = OrderedDict()
+_contexts_lock = threading.Lock()
+
+
+def get_taxonomy_context(summary_reference: Dict[str, Any]) -> TaxonomyContext:
+    """
+    Return the compiled context for a summary reference, building it once per version.
+    Repeated calls with the same reference object skip even the version hash.
+    """
+    with _contexts_lock:
+        entry = _contexts_by_id.get(id(summary_reference))
+        if entry is not None and entry[0] is summary_reference:
+            return entry[1]
+
+        version = TaxonomyContext.reference_version(summary_reference)
+        context = _contexts.get(version)
+        if context is None:
+            context = TaxonomyContext.from_reference(summary_reference)
+            _contexts[version] = context
+        # Holding the reference keeps its id from being reused by another object
+        _contexts_by_id[id(summary_reference)] = (summary_reference, context)
+        while len(_contexts_by_id) > 8:
+            _contexts_by_id.popitem(last=False)
+        return context
@@ -0,0 +1,40 @@
+"""
+Unit tests for the content index build script ("cetificate from dataset/build_content_index.py")
+"""
+
+import importlib.util
+import os
+import sys
+import unittest
+
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cetificate from dataset")
+
+
+def load_script():
+    if DATASET_DIR not in sys.path:
+        sys.path.insert(0, DATASET_DIR)
+    import build_content_index
+    return build_content_index
+
+
+@unittest.skipUnless(importlib.util.find_spec("dotenv"), "python-dotenv not installed")
+class TestDocumentContent(unittest.TestCase):
+    """Test which extracted text goes into the content index"""
+
+    def test_scanned_pages_stripped(self):
+        script = load_script()
+        text = "Certifico la firma de Acme SA\n\n[SCANNED PAGE - OCR SKIPPED]\n\nMontevideo"
+
+        self.assertEqual(script.document_content(text), "Certifico la firma de Acme SA\n\n\n\nMontevideo")
+
+    def test_fully_scanned_or_empty(self):
+        script = load_script()
+
+        self.assertEqual(script.document_content("[SCANNED PAGE - OCR SKIPPED]\n\n[SCANNED PAGE]"), "")
+        self.assertEqual(script.document_content(""), "")
+        self.assertEqual(script.document_content(None), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+"""
+Unit tests for the dataset build journal
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from src.build_journal import BuildJournal
+
+
+class TestBuildJournal(unittest.TestCase):
+    """Test BuildJournal"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "build.journal.jsonl")
+
+    def open_journal(self, version: str = "1") -> BuildJournal:
+        journal = BuildJournal(self.path, version)
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_make_key(self):
+        """Test keys combine path and content hash"""
+        self.assertEqual(BuildJournal.make_key("Cliente/a.pdf", "abc"), "Cliente/a.pdf#abc")
+        self.assertEqual(BuildJournal.make_key("Cliente/a.pdf", None), "Cliente/a.pdf#missing")
+
+    def test_append_survives_reopen(self):
+        """Test appended results are read back by a new journal"""
+        journal = self.open_journal()
+        journal.append("a#1", {"type": "firma", "purpose": "bse"})
+        journal.close()
+
+        reopened = self.open_journal()
+        self.assertIn("a#1", reopened)
+        self.assertEqual(reopened.get("a#1"), {"type": "firma", "purpose": "bse"})
+        self.assertIsNone(reopened.get("b#1"))
+
+    def test_modified_file_is_not_found(self):
+        """Test a new content hash misses the journal"""
+        journal = self.open_journal()
+        journal.append(BuildJournal.make_key("a.pdf", "old"), {"type": "firma"})
+        self.assertNotIn(BuildJournal.make_key("a.pdf", "new"), journal)
+
+    def test_other_version_ignored(self):
+        """Test entries written under another build version are ignored"""
+        journal = self.open_journal("1")
+        journal.append("a#1", {"type": "firma"})
+        journal.close()
+
+        reopened = self.open_journal("2")
+        self.assertNotIn("a#1", reopened)
+        self.assertEqual(reopened.skipped_lines, 1)
+
+    def test_truncated_line_skipped(self):
+        """Test a partial last line from a crash does not break loading"""
+        journal = self.open_journal()
+        journal.append("a#1", {"type": "firma"})
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write('{"key": "b#1", "vers')
+
+        reopened = self.open_journal()
+        self.assertEqual(len(reopened), 1)
+        self.assertEqual(reopened.skipped_lines, 1)
+
+    def test_append_after_truncated_line(self):
+        """Test an append after a crash mid-write is not glued onto the partial line"""
+        journal = self.open_journal()
+        journal.append("a#1", {"type": "firma"})
+        journal.close()
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write('{"key": "b#1", "vers')
+
+        reopened = self.open_journal()
+        reopened.append("c#1", {"type": "poder"})
+        reopened.close()
+
+        again = self.open_journal()
+        self.assertIn("a#1", again)
+        self.assertIn("c#1", again)
+        self.assertEqual(again.skipped_lines, 0)
+
+    def test_later_line_wins(self):
+        """Test a key appended twice keeps the latest result"""
+        journal = self.open_journal()
+        journal.append("a#1", {"type": "firma"})
+        journal.append("a#1", {"type": "poder"})
+        journal.close()
+
+        self.assertEqual(self.open_journal().get("a#1"), {"type": "poder"})
+
+    def test_compact(self):
+        """Test compact keeps only the given keys, one line each"""
+        journal = self.open_journal()
+        journal.append("a#1", {"type": "firma"})
+        journal.append("a#1", {"type": "poder"})
+        journal.append("b#1", {"type": "vigencia"})
+
+        self.assertEqual(journal.compact(["a#1", "c#1"]), 1)
+        self.assertNotIn("b#1", journal)
+
+        # Appends after compacting still land in the file
+        journal.append("c#1", {"type": "otros"})
+        journal.close()
+        with open(self.path, encoding="utf-8") as handle:
+            keys = [json.loads(line)["key"] for line in handle]
+        self.assertEqual(keys, ["a#1", "c#1"])
+
+
+if __name__ == '__main__':
+    unittest.main()
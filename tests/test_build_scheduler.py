@@ -0,0 +1,99 @@
+"""
+Unit tests for the two-stage build scheduler
+"""
+
+import os
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+
+from src.build_scheduler import TwoStageScheduler
+
+
+def square(value):
+    return value * value
+
+
+def extracting_pid(value):
+    return value, os.getpid()
+
+
+class TestTwoStageScheduler(unittest.TestCase):
+    """Test TwoStageScheduler"""
+
+    def setUp(self):
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        self.addCleanup(self.executor.shutdown)
+
+    def test_every_item_once(self):
+        """Test every item is yielded once with its input index"""
+        scheduler = TwoStageScheduler(square, lambda value: value + 1, executor=self.executor)
+        results = dict(scheduler.run(range(20)))
+        self.assertEqual(results, {index: index * index + 1 for index in range(20)})
+
+    def test_empty(self):
+        """Test no items yields nothing"""
+        scheduler = TwoStageScheduler(square, str, executor=self.executor)
+        self.assertEqual(list(scheduler.run([])), [])
+
+    def test_backpressure(self):
+        """Test extraction never runs more than max_pending items ahead of classification"""
+        lock = threading.Lock()
+        state = {"pending": 0, "peak": 0}
+
+        def extract(value):
+            with lock:
+                state["pending"] += 1
+                state["peak"] = max(state["peak"], state["pending"])
+            return value
+
+        def classify(value):
+            time.sleep(0.01)  # Slow LLM stage
+            with lock:
+                state["pending"] -= 1
+            return value
+
+        scheduler = TwoStageScheduler(
+            extract, classify, extract_workers=4, classify_workers=1, max_pending=3, executor=self.executor
+        )
+        self.assertEqual(len(list(scheduler.run(range(30)))), 30)
+        self.assertLessEqual(state["peak"], 3)
+
+    def test_classify_threads_share_process(self):
+        """Test classification runs on several threads of the calling process"""
+        threads = set()
+        lock = threading.Lock()
+
+        def classify(value):
+            time.sleep(0.01)
+            with lock:
+                threads.add(threading.current_thread().name)
+            return os.getpid()
+
+        scheduler = TwoStageScheduler(square, classify, classify_workers=3, executor=self.executor)
+        pids = {pid for _, pid in scheduler.run(range(12))}
+        self.assertEqual(pids, {os.getpid()})
+        self.assertGreater(len(threads), 1)
+
+    def test_error_propagates(self):
+        """Test a stage exception is raised by run()"""
+        def classify(value):
+            if value == 5:
+                raise ValueError("bad document")
+            return value
+
+        scheduler = TwoStageScheduler(lambda value: value, classify, executor=self.executor)
+        with self.assertRaises(ValueError):
+            list(scheduler.run(range(10)))
+
+    def test_process_pool(self):
+        """Test extraction runs in worker processes by default"""
+        scheduler = TwoStageScheduler(extracting_pid, lambda extracted: extracted, extract_workers=2)
+        results = dict(scheduler.run(range(6)))
+        self.assertEqual(sorted(value for value, _ in results.values()), list(range(6)))
+        self.assertNotIn(os.getpid(), {pid for _, pid in results.values()})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,251 @@
+"""
+Unit tests for the dataset build script ("cetificate from dataset/certificate_summary.py")
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cetificate from dataset")
+
+
+def load_script():
+    if DATASET_DIR not in sys.path:
+        sys.path.insert(0, DATASET_DIR)
+    import certificate_summary
+    return certificate_summary
+
+
+class FailingGateway:
+    """Gateway whose every call fails, like an exhausted rate limit"""
+
+    def chat(self, *args, **kwargs):
+        raise RuntimeError("429 Too Many Requests")
+
+
+class FixedGateway:
+    """Gateway answering every call with the same reply"""
+
+    def __init__(self, reply: str):
+        self.reply = reply
+
+    def chat(self, *args, **kwargs):
+        return self.reply
+
+
+class InlineScheduler:
+    """TwoStageScheduler stand-in running both stages in the calling thread"""
+
+    def __init__(self, extract, classify, **kwargs):
+        self.extract = extract
+        self.classify = classify
+
+    def run(self, items):
+        for index, item in enumerate(items):
+            yield index, self.classify(self.extract(item))
+
+
+def make_task(filename: str = "Certificado firma Acme.pdf"):
+    return {
+        'customer': "Acme SA",
+        'cert_info': {'filename': filename, 'relative_path': filename},
+        'base_path': "Notaria",
+        'is_certificate': True
+    }
+
+
+def extracted(task, text: str = "Certifico que la firma que antecede es autentica. Escribano Publico"):
+    return {'task': task, 'document_text': text, 'extraction_time': 0.0}
+
+
+@unittest.skipUnless(importlib.util.find_spec("dotenv"), "python-dotenv not installed")
+class TestLLMFailures(unittest.TestCase):
+    """Test that LLM failures are flagged and never journaled"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.script = load_script()
+
+    def setUp(self):
+        patcher = mock.patch.object(self.script.time, "sleep", lambda seconds: None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def classify_with(self, gateway, task=None):
+        with mock.patch.object(self.script, "get_llm_gateway", lambda: gateway):
+            return self.script.classify_document(extracted(task or make_task()))
+
+    def test_fallback_is_flagged(self):
+        """Test the fallback analysis carries llm_failed"""
+        analysis = self.script.analyze_document_with_llm("texto", "a.pdf", FailingGateway())
+        self.assertTrue(analysis["llm_failed"])
+
+    def test_failed_llm_marks_result(self):
+        """Test a result decided on the fallback is tagged as an error"""
+        result = self.classify_with(FailingGateway())
+        self.assertEqual(result["error"], "llm_unavailable")
+
+    def test_answered_llm_is_not_an_error(self):
+        """Test a real answer leaves the result unflagged"""
+        reply = '{"is_notarial": true, "certificate_type": "firma", "purpose": "BSE"}'
+        result = self.classify_with(FixedGateway(reply))
+        self.assertNotIn("error", result)
+        self.assertEqual(result["type"], "firma")
+
+    @unittest.skipUnless(importlib.util.find_spec("tqdm"), "tqdm not installed")
+    def test_failed_files_not_journaled(self):
+        """Test a file whose LLM call failed is processed again on the next run"""
+        tasks = [make_task()]
+        calls = []
+
+        def extract(task):
+            calls.append(task)
+            return extracted(task)
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(self.script, "JOURNAL_PATH", os.path.join(tmp_dir, "build.journal.jsonl")), \
+                mock.patch.object(self.script, "TwoStageScheduler", InlineScheduler), \
+                mock.patch.object(self.script, "extract_document", extract), \
+                mock.patch.object(self.script, "task_journal_key", lambda task: "Acme SA/a.pdf#1"):
+            with mock.patch.object(self.script, "get_llm_gateway", lambda: FailingGateway()):
+                results = self.script.run_tasks(tasks)
+            self.assertEqual(results[0]["error"], "llm_unavailable")
+
+            reply = '{"is_notarial": true, "certificate_type": "firma", "purpose": "BSE"}'
+            with mock.patch.object(self.script, "get_llm_gateway", lambda: FixedGateway(reply)):
+                results = self.script.run_tasks(tasks)
+            self.assertNotIn("error", results[0])
+            self.assertEqual(len(calls), 2)
+
+    @unittest.skipUnless(importlib.util.find_spec("tqdm"), "tqdm not installed")
+    def test_missing_result_is_an_error(self):
+        """Test a task the scheduler never returned becomes an error entry, not None"""
+        class DroppingScheduler(InlineScheduler):
+            def run(self, items):
+                return iter(())
+
+        with tempfile.TemporaryDirectory() as tmp_dir, \
+                mock.patch.object(self.script, "JOURNAL_PATH", os.path.join(tmp_dir, "build.journal.jsonl")), \
+                mock.patch.object(self.script, "TwoStageScheduler", DroppingScheduler), \
+                mock.patch.object(self.script, "get_llm_gateway", lambda: FailingGateway()):
+            results = self.script.run_tasks([make_task()])
+
+        self.assertEqual(results[0]["filename"], "Certificado firma Acme.pdf")
+        self.assertEqual(results[0]["error"], "no result produced")
+        _, _, stats = self.script.aggregate_results(results, {"otros": {}})
+        self.assertEqual(stats["processing_errors"], 1)
+
+
+CUSTOMERS = {
+    "Acme SA": {"customer_type": "unknown", "files": {
+        "certificates": [
+            {"filename": "Certificado firma.pdf", "relative_path": "2024/Certificado firma.pdf", "error_flag": False},
+            {"filename": "ERROR certificado.pdf", "relative_path": "ERROR certificado.pdf", "error_flag": True},
+        ],
+        "non_certificates": [{"filename": "estatuto.pdf", "relative_path": "estatuto.pdf"}],
+    }},
+    "Beta SRL": {"customer_type": "unknown", "files": {"certificates": [], "non_certificates": []}},
+}
+
+CERT_TYPES = {"firma": {}, "personeria": {}, "firma_personeria_representacion": {}}
+
+
+def certificate_result(cert_type, customer, filename, purpose="bse", **extra):
+    return dict({'type': cert_type, 'customer': customer, 'filename': filename,
+                 'path': filename, 'purpose': purpose}, **extra)
+
+
+@unittest.skipUnless(importlib.util.find_spec("dotenv"), "python-dotenv not installed")
+class TestBuildSteps(unittest.TestCase):
+    """Test task collection, aggregation and the summary built from the results"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.script = load_script()
+
+    def test_paths_share_the_script_folder(self):
+        """Test inputs and outputs do not depend on the working directory"""
+        for path in (self.script.CUSTOMERS_INDEX_PATH, self.script.CERTIFICATE_TYPES_PATH,
+                     self.script.CUSTOMER_DATA_PATH, self.script.JOURNAL_PATH,
+                     self.script.LLM_CACHE_PATH, self.script.OUTPUT_PATH):
+            self.assertTrue(path.startswith(DATASET_DIR + os.sep), path)
+
+    def test_collect_tasks(self):
+        """Test one task per indexed file, certificates first per customer"""
+        tasks = self.script.collect_tasks(CUSTOMERS, base_path="base")
+
+        self.assertEqual(
+            [(task['customer'], task['cert_info']['filename'], task['is_certificate']) for task in tasks],
+            [("Acme SA", "Certificado firma.pdf", True),
+             ("Acme SA", "ERROR certificado.pdf", True),
+             ("Acme SA", "estatuto.pdf", False)]
+        )
+        self.assertTrue(all(task['base_path'] == "base" for task in tasks))
+        self.assertEqual(self.script.collect_tasks(CUSTOMERS)[0]['base_path'], self.script.CUSTOMER_DATA_PATH)
+
+    def test_aggregate_results(self):
+        """Test results are routed by type and counted"""
+        results = [
+            certificate_result('firma', "Acme SA", "a.pdf"),
+            certificate_result('firma_personeria_representacion', "Acme SA", "b.pdf", is_complete_cert=True),
+            certificate_result('personeria', "Beta SRL", "c.pdf", error='llm_unavailable'),
+            {'type': '__NON_CERT__', 'customer': "Acme SA", 'filename': "d.pdf", 'path': "d.pdf",
+             'reason': 'non_certificate'},
+            {'type': '__AUTHORITY_DOC__', 'customer': "Acme SA", 'filename': "e.pdf", 'path': "e.pdf",
+             'purpose': 'dgi', 'reason': 'pure_authority_document'},
+            {'type': '__AUTHORITY_DOC__', 'customer': "Beta SRL", 'filename': "f.pdf", 'path': "f.pdf",
+             'reason': 'file_not_found'},
+        ]
+
+        mapping, non_certificates, stats = self.script.aggregate_results(results, CERT_TYPES)
+
+        self.assertEqual([entry['filename'] for entry in mapping['firma']], ["a.pdf"])
+        self.assertEqual(mapping['personeria'][0],
+                         {"customer": "Beta SRL", "filename": "c.pdf", "path": "c.pdf",
+                          "error_flag": False, "purpose": "bse"})
+        self.assertEqual([(doc['filename'], doc['reason']) for doc in non_certificates],
+                         [("d.pdf", "non_certificate"), ("e.pdf", "pure_authority_document"),
+                          ("f.pdf", "file_not_found")])
+        self.assertEqual(stats['total_processed'], 6)
+        self.assertEqual(stats['notarial_confirmed'], 3)
+        self.assertEqual(stats['completo_certs_reclassified'], 1)
+        self.assertEqual(stats['pure_authority_detected'], 1)
+        self.assertEqual(stats['authority_detected'], 1)
+        self.assertEqual(stats['dgi_removed_from_notarial'], 1)
+        self.assertEqual(stats['file_not_found'], 1)
+        self.assertEqual(stats['processing_errors'], 1)
+
+    def test_build_summary(self):
+        """Test per-type counts, purposes, filename attributes and examples"""
+        mapping = {
+            'firma': [
+                {"customer": "Acme SA", "filename": "Firma poder Acme.pdf", "purpose": "bse"},
+                {"customer": "Acme SA", "filename": "Firma Acme 2.pdf", "purpose": "bse"},
+                {"customer": "Beta SRL", "filename": "Firma giro Beta.pdf", "purpose": "unknown"},
+            ],
+            'personeria': [],
+        }
+        non_certificates = [{"customer": "Acme SA", "filename": "d.pdf", "path": "d.pdf"}]
+
+        summary = self.script.build_summary(mapping, non_certificates, CERT_TYPES)
+
+        types = summary["identified_certificate_types"]
+        self.assertEqual(list(types), list(CERT_TYPES))
+        self.assertEqual(types['firma'], {
+            "count": 3,
+            "purposes": {"bse": 2},
+            "attributes": ["giro", "poder"],
+            "examples": ["Firma poder Acme.pdf", "Firma giro Beta.pdf", "Firma Acme 2.pdf"],
+        })
+        self.assertEqual(types['personeria'], {"count": 0, "purposes": {}, "attributes": [], "examples": []})
+        self.assertEqual(types['firma_personeria_representacion']["count"], 0)
+        self.assertIs(summary["certificate_file_mapping"], mapping)
+        self.assertEqual(summary["non_certificate_documents"], non_certificates)
+
+
+if __name__ == '__main__':
+    unittest.main()
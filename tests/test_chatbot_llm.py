@@ -0,0 +1,329 @@
+"""
+Unit tests for the LLM calls of the Streamlit chatbot (chatbot_llm.py)
+"""
+
+import importlib.util
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+
+HAS_APP_DEPENDENCIES = all(
+    importlib.util.find_spec(name) is not None for name in ("streamlit", "dotenv")
+)
+if HAS_APP_DEPENDENCIES:
+    import chatbot_llm
+
+
+REFERENCE = {
+    "firma": {"purposes": ["bps", "bse"], "examples": ["CERT FIRMA ACME.pdf"]},
+    "poder": {"purposes": ["abitab"], "examples": ["PODER ACME.pdf"]},
+}
+
+FIELDS = {
+    "company_name": "Acme SA",
+    "rut": "211234560018",
+    "ci": None,
+    "registro_comercio": None,
+    "acta_number": None,
+    "padron_bps": None,
+    "dates": ["2024-03-01"],
+    "emails": [],
+}
+
+CLASSIFICATION = {
+    "is_certificate": True,
+    "certificate_type": "firma",
+    "purpose": "bps",
+    "confidence": 0.9,
+    "reason": "Certifica la firma",
+}
+
+
+class ScriptedGateway:
+    """Gateway answering chat() calls from a script of replies (str, or an exception to raise)"""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.calls = []
+
+    def chat(self, **kwargs):
+        self.calls.append(kwargs)
+        reply = self.replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def map(self, func, items, max_workers=None):
+        return [func(item) for item in items]
+
+
+def combined_reply(fields=FIELDS, classification=CLASSIFICATION) -> str:
+    return json.dumps({"fields": fields, "classification": classification})
+
+
+@unittest.skipUnless(HAS_APP_DEPENDENCIES, "streamlit or python-dotenv not installed")
+class TestCombinedCall(unittest.TestCase):
+    """Test the single extraction + classification request"""
+
+    def call(self, gateway):
+        with mock.patch.object(chatbot_llm, "get_gateway", return_value=gateway):
+            return chatbot_llm.call_groq_combined(
+                model="extraction-model",
+                api_key="key",
+                doc_text="Certifico que la firma de Acme SA es autentica",
+                filename="CERT FIRMA ACME.pdf",
+                summary_reference=REFERENCE,
+            )
+
+    def test_validate_combined_payload(self):
+        self.assertEqual(
+            chatbot_llm.validate_combined_payload({"fields": FIELDS, "classification": CLASSIFICATION}), []
+        )
+        self.assertEqual(chatbot_llm.validate_combined_payload([]), ["reply is not a JSON object"])
+
+        errors = chatbot_llm.validate_combined_payload({
+            "fields": dict(FIELDS, rut={"value": "1"}, dates=5),
+            "classification": dict(CLASSIFICATION, confidence=1.5),
+        })
+        self.assertEqual(errors, [
+            "fields.rut must be a string or null",
+            "fields.dates must be a list",
+            "classification.confidence must be between 0 and 1",
+        ])
+        self.assertIn("'fields' must be an object",
+                      chatbot_llm.validate_combined_payload({"classification": CLASSIFICATION}))
+        self.assertIn("'classification' must be an object",
+                      chatbot_llm.validate_combined_payload({"fields": FIELDS}))
+
+    def test_parse_combined_reply(self):
+        payload = chatbot_llm.parse_combined_reply("Here you go:\n" + combined_reply())
+        self.assertEqual(payload["classification"]["certificate_type"], "firma")
+
+        self.assertIsNone(chatbot_llm.parse_combined_reply("not json"))
+        self.assertIsNone(chatbot_llm.parse_combined_reply(json.dumps({"fields": FIELDS})))
+
+    def test_ok_reply(self):
+        gateway = ScriptedGateway(combined_reply())
+
+        result = self.call(gateway)
+
+        self.assertEqual(result["status"], "ok")
+        self.assertEqual(result["fields"], FIELDS)
+        self.assertEqual(result["classification"], dict(CLASSIFICATION, status="ok"))
+        call = gateway.calls[0]
+        self.assertEqual(call["model"], "extraction-model")
+        self.assertEqual(call["prompt_version"], chatbot_llm.COMBINED_PROMPT_VERSION)
+        self.assertTrue(call["cacheable"](combined_reply()))
+        self.assertFalse(call["cacheable"]("{}"))
+
+    def test_invalid_json(self):
+        result = self.call(ScriptedGateway("I cannot help with that"))
+
+        self.assertEqual(result["status"], "error")
+        self.assertEqual(result["message"], "LLM did not return valid JSON.")
+        self.assertEqual(result["raw"], "I cannot help with that")
+
+    def test_schema_mismatch(self):
+        result = self.call(ScriptedGateway(combined_reply(classification={"is_certificate": "yes"})))
+
+        self.assertEqual(result["status"], "error")
+        self.assertTrue(result["message"].startswith("LLM reply does not match the schema: "))
+        self.assertIn("classification.is_certificate has the wrong type", result["message"])
+
+    def test_request_failure(self):
+        result = self.call(ScriptedGateway(RuntimeError("503 Service Unavailable")))
+
+        self.assertEqual(result, {"status": "error", "message": "Groq request failed: 503 Service Unavailable"})
+
+    def test_missing_key_or_text(self):
+        self.assertEqual(
+            chatbot_llm.call_groq_combined("m", "", "text", "f.pdf", REFERENCE)["message"],
+            "Missing GROQ_API_KEY."
+        )
+        self.assertEqual(
+            chatbot_llm.call_groq_combined("m", "key", "  ", "f.pdf", REFERENCE)["message"],
+            "No text provided for LLM extraction."
+        )
+
+
+@unittest.skipUnless(HAS_APP_DEPENDENCIES, "streamlit or python-dotenv not installed")
+class TestProcessDocumentWithLLM(unittest.TestCase):
+    """Test the combined call and its fallback in process_document_with_llm"""
+
+    SETTINGS = {
+        "enabled": True,
+        "api_key": "key",
+        "extraction_model": "extraction-model",
+        "analysis_model": "analysis-model",
+        "combined_call": True,
+        "keyword_prefilter": False,
+        "compact_context": False,
+    }
+
+    def process(self, gateway, settings=None):
+        document = SimpleNamespace(
+            file_path="CERT FIRMA ACME.txt", file_name="CERT FIRMA ACME.txt", detected_type=None
+        )
+        text = "Certifico que la firma de Acme SA es autentica"
+        with mock.patch.object(chatbot_llm, "get_gateway", return_value=gateway), \
+                mock.patch.object(chatbot_llm, "extract_text_without_ocr", return_value=(text, "text", None)):
+            return chatbot_llm.process_document_with_llm(document, settings or self.SETTINGS, REFERENCE)
+
+    def test_combined_reply_fills_fields_and_classification(self):
+        gateway = ScriptedGateway(combined_reply())
+
+        fields = self.process(gateway).extracted_data.additional_fields
+
+        self.assertEqual(len(gateway.calls), 1)
+        self.assertEqual(fields["llm_classification"], dict(CLASSIFICATION, status="ok"))
+        self.assertEqual(fields["llm_extraction"]["company_name"], "Acme SA")
+        self.assertNotIn("llm_combined_error", fields)
+
+    def test_schema_mismatch_falls_back_to_extraction(self):
+        gateway = ScriptedGateway(combined_reply(fields="Acme SA"), json.dumps(FIELDS))
+
+        extracted = self.process(gateway).extracted_data
+
+        self.assertEqual(
+            [call["prompt_version"] for call in gateway.calls],
+            [chatbot_llm.COMBINED_PROMPT_VERSION, chatbot_llm.EXTRACTION_PROMPT_VERSION]
+        )
+        fields = extracted.additional_fields
+        self.assertIn("'fields' must be an object", fields["llm_combined_error"])
+        self.assertNotIn("llm_classification", fields)  # run_flow classifies separately
+        self.assertEqual(extracted.company_name, "Acme SA")
+
+    def test_combined_call_disabled(self):
+        gateway = ScriptedGateway(json.dumps(FIELDS))
+
+        fields = self.process(gateway, dict(self.SETTINGS, combined_call=False)).extracted_data.additional_fields
+
+        self.assertEqual(gateway.calls[0]["prompt_version"], chatbot_llm.EXTRACTION_PROMPT_VERSION)
+        self.assertNotIn("llm_combined_error", fields)
+        self.assertNotIn("llm_classification", fields)
+
+
+def classification(cert_type: str) -> dict:
+    return dict(CLASSIFICATION, certificate_type=cert_type)
+
+
+@unittest.skipUnless(HAS_APP_DEPENDENCIES, "streamlit or python-dotenv not installed")
+class TestBatchClassification(unittest.TestCase):
+    """Test batched classification: reply parsing, id mapping and split-and-retry"""
+
+    DOC_TEXTS = {
+        "a.pdf": "Certifico la firma de Acme SA",
+        "b.pdf": "Poder general otorgado por Beta SA",
+        "c.pdf": "Certifico la firma de Gamma SRL",
+    }
+
+    def classify(self, gateway, doc_texts=None):
+        with mock.patch.object(chatbot_llm, "get_gateway", return_value=gateway):
+            return chatbot_llm.classify_documents_batched(
+                model="analysis-model",
+                api_key="key",
+                doc_texts=doc_texts or self.DOC_TEXTS,
+                summary_reference=REFERENCE,
+            )
+
+    def prompt_versions(self, gateway):
+        return [call["prompt_version"] for call in gateway.calls]
+
+    def test_parse_batch_reply(self):
+        reply = json.dumps({
+            "doc2": classification("poder"),
+            "doc1": classification("firma"),
+            "doc3": {"is_certificate": "maybe"},
+            "doc9": classification("firma"),
+        })
+
+        results = chatbot_llm.parse_batch_reply(reply, ["doc1", "doc2", "doc3"])
+
+        self.assertEqual(results, {
+            "doc1": dict(classification("firma"), status="ok"),
+            "doc2": dict(classification("poder"), status="ok"),
+        })
+        self.assertEqual(chatbot_llm.parse_batch_reply("not json", ["doc1"]), {})
+        self.assertEqual(chatbot_llm.parse_batch_reply("[1, 2]", ["doc1"]), {})
+
+    def test_reordered_reply_maps_by_id(self):
+        gateway = ScriptedGateway(json.dumps({
+            "doc3": classification("firma"),
+            "doc2": classification("poder"),
+            "doc1": classification("firma"),
+        }))
+
+        results = self.classify(gateway)
+
+        self.assertEqual(self.prompt_versions(gateway), [chatbot_llm.BATCH_CLASSIFICATION_PROMPT_VERSION])
+        self.assertEqual(list(results), ["a.pdf", "b.pdf", "c.pdf"])
+        self.assertEqual(results["b.pdf"]["certificate_type"], "poder")
+        self.assertEqual(results["c.pdf"]["certificate_type"], "firma")
+        self.assertIn("=== Document doc2 ===\nPoder general", gateway.calls[0]["messages"][1]["content"])
+
+    def test_short_reply_retries_missing_documents(self):
+        short_reply = json.dumps({"doc1": classification("firma"), "doc3": {"confidence": 2}})
+        gateway = ScriptedGateway(
+            short_reply,
+            json.dumps({"doc2": classification("poder"), "doc3": classification("firma")}),
+        )
+
+        results = self.classify(gateway)
+
+        self.assertEqual(self.prompt_versions(gateway), [chatbot_llm.BATCH_CLASSIFICATION_PROMPT_VERSION] * 2)
+        retry_prompt = gateway.calls[1]["messages"][1]["content"]
+        self.assertNotIn("=== Document doc1 ===", retry_prompt)
+        self.assertEqual(
+            {key: result["certificate_type"] for key, result in results.items()},
+            {"a.pdf": "firma", "b.pdf": "poder", "c.pdf": "firma"}
+        )
+        # Partial replies are not cached
+        self.assertFalse(gateway.calls[0]["cacheable"](short_reply))
+
+    def test_invalid_reply_splits_batch(self):
+        gateway = ScriptedGateway(
+            "Sorry, that is too many documents",
+            json.dumps(classification("firma")),  # a.pdf on its own
+            json.dumps({"doc2": classification("poder"), "doc3": classification("firma")}),
+        )
+
+        results = self.classify(gateway)
+
+        self.assertEqual(self.prompt_versions(gateway), [
+            chatbot_llm.BATCH_CLASSIFICATION_PROMPT_VERSION,
+            chatbot_llm.CLASSIFICATION_PROMPT_VERSION,
+            chatbot_llm.BATCH_CLASSIFICATION_PROMPT_VERSION,
+        ])
+        self.assertEqual(
+            {key: result["certificate_type"] for key, result in results.items()},
+            {"a.pdf": "firma", "b.pdf": "poder", "c.pdf": "firma"}
+        )
+
+    def test_failed_request_splits_down_to_single_documents(self):
+        gateway = ScriptedGateway(
+            RuntimeError("413 Request Entity Too Large"),
+            json.dumps(classification("firma")),
+            RuntimeError("413 Request Entity Too Large"),
+            json.dumps(classification("poder")),
+            "not json",
+        )
+
+        results = self.classify(gateway)
+
+        self.assertEqual(len(gateway.calls), 5)
+        self.assertEqual(results["a.pdf"]["certificate_type"], "firma")
+        self.assertEqual(results["b.pdf"]["certificate_type"], "poder")
+        self.assertEqual(results["c.pdf"]["status"], "error")
+        self.assertEqual(results["c.pdf"]["raw"], "not json")
+
+    def test_missing_api_key(self):
+        results = chatbot_llm.classify_documents_batched("m", "", self.DOC_TEXTS, REFERENCE)
+
+        self.assertEqual(set(results), set(self.DOC_TEXTS))
+        self.assertTrue(all(result["status"] == "error" for result in results.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,144 @@
+"""
+Unit tests for the content-similarity index
+"""
+
+import json
+import math
+import os
+import tempfile
+import unittest
+
+from src.content_index import (
+    MAGIC,
+    ContentIndex,
+    content_index_path,
+    content_terms,
+    open_content_index,
+)
+from src.summary_index_file import source_digest
+
+
+BOILERPLATE = "certifico que la firma que antecede fue puesta en mi presencia escribano publico montevideo"
+
+DOCUMENTS = [
+    ({"customer": "Acme SA", "filename": "Cert Acme BSE.pdf", "purpose": "bse"},
+     f"{BOILERPLATE} Acme Sociedad Anonima RUT 210000010011 Banco de Seguros del Estado poliza"),
+    ({"customer": "Beta SRL", "filename": "Cert Beta DGI.pdf", "purpose": "dgi"},
+     f"{BOILERPLATE} Beta Responsabilidad Limitada RUT 215555550019 Direccion General Impositiva"),
+    ({"customer": "Gamma SA", "filename": "Cert Gamma ABITAB.pdf", "purpose": "abitab"},
+     f"{BOILERPLATE} Gamma Sociedad Anonima representacion ABITAB firma electronica"),
+]
+
+
+def write_summary(directory, summary=None):
+    path = os.path.join(directory, "certificate_summary.json")
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(summary or {"certificate_file_mapping": {"firma": []}, "non_certificate_documents": []}, handle)
+    return path
+
+
+def cosine(left, right):
+    dot = sum(weight * right.get(term, 0.0) for term, weight in left.items())
+    return dot / (math.sqrt(sum(w * w for w in left.values())) * math.sqrt(sum(w * w for w in right.values())))
+
+
+class TestContentIndex(unittest.TestCase):
+    """Test ContentIndex build, query and persistence"""
+
+    def setUp(self):
+        self.index = ContentIndex.build(DOCUMENTS)
+
+    def test_content_terms(self):
+        """Test normalization, stopwords and short words"""
+        self.assertEqual(content_terms("Certificación de Firmas para el BSE"), ["certificacion", "firmas", "bse"])
+        self.assertEqual(content_terms(""), [])
+
+    def test_nearest_certificate(self):
+        """Test a new document of a known customer finds its certificate first"""
+        matches = self.index.query("Certificado de firma de ACME S.A., RUT 210000010011, para el BSE")
+        self.assertEqual(matches[0].entry["customer"], "Acme SA")
+        self.assertGreater(matches[0].score, matches[-1].score)
+        self.assertEqual(matches[0].to_dict()["content_score"], round(matches[0].score, 4))
+
+    def test_identical_text_scores_one(self):
+        """Test a document queried with its own text has cosine 1"""
+        entry, text = DOCUMENTS[1]
+        best = self.index.query(text, limit=1)[0]
+        self.assertEqual(best.entry, entry)
+        self.assertAlmostEqual(best.score, 1.0, places=5)
+
+    def test_scores_are_cosine(self):
+        """Test scores equal the cosine of the query and document tf-idf vectors"""
+        query = "Gamma representacion firma ABITAB escribano"
+        query_vector, _ = self.index.query_vector(query)
+        for match in self.index.query(query, limit=len(DOCUMENTS)):
+            text = next(text for entry, text in DOCUMENTS if entry == match.entry)
+            doc_vector, _ = self.index.query_vector(text)
+            self.assertAlmostEqual(match.score, cosine(query_vector, doc_vector), places=5)
+
+    def test_limit_and_min_score(self):
+        """Test limit, min_score and queries without indexed terms"""
+        self.assertEqual(len(self.index.query(BOILERPLATE + " Acme", limit=2)), 2)
+        self.assertEqual(self.index.query("Acme", min_score=0.99), [])
+        self.assertEqual(self.index.query("zzzz yyyy"), [])
+        self.assertEqual(self.index.query(""), [])
+        self.assertEqual(ContentIndex.build([]).query("Acme"), [])
+
+    def test_common_terms_dropped(self):
+        """Test terms found in most documents of a large corpus are not indexed"""
+        documents = [
+            ({"filename": f"{n}.pdf"}, f"escribano certifico cliente{n} numero{n % 3}")
+            for n in range(20)
+        ]
+        index = ContentIndex.build(documents)
+        self.assertNotIn("escribano", index.term_ids)
+        self.assertIn("cliente7", index.term_ids)
+        self.assertEqual(index.query("escribano certifico cliente7")[0].entry["filename"], "7.pdf")
+
+    def test_save_and_load(self):
+        """Test an index survives a round trip through its file"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summary_path = write_summary(tmp_dir)
+            self.assertIsNone(open_content_index(summary_path))
+
+            index = ContentIndex.build(DOCUMENTS, meta={"summary_sha256": source_digest(summary_path).hex()})
+            path = index.save(content_index_path(summary_path))
+            self.assertTrue(path.endswith("certificate_summary.content.idx"))
+            loaded = open_content_index(summary_path)
+
+            query = "Beta DGI Direccion General Impositiva"
+            self.assertEqual(
+                [(m.entry, round(m.score, 6)) for m in loaded.query(query)],
+                [(m.entry, round(m.score, 6)) for m in index.query(query)]
+            )
+
+            with open(path, "r+b") as handle:
+                handle.truncate(os.path.getsize(path) - 4)
+            with self.assertRaises(ValueError):
+                ContentIndex.load(path)
+
+    def test_unreadable_index_ignored(self):
+        """Test corrupt and other-format index files open as None"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summary_path = write_summary(tmp_dir)
+            path = content_index_path(summary_path)
+            for content in (b"garbage", MAGIC + b"\x63\x00\x00\x00" + bytes(20)):
+                with open(path, "wb") as handle:
+                    handle.write(content)
+                self.assertIsNone(open_content_index(summary_path))
+
+    def test_stale_index_ignored(self):
+        """Test an index built from another version of the summary is ignored"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            summary_path = write_summary(tmp_dir)
+            meta = {"summary_sha256": source_digest(summary_path).hex()}
+            ContentIndex.build(DOCUMENTS, meta=meta).save(content_index_path(summary_path))
+            self.assertIsNotNone(open_content_index(summary_path))
+
+            write_summary(tmp_dir, {"certificate_file_mapping": {}, "non_certificate_documents": []})
+            self.assertIsNone(open_content_index(summary_path))
+            ContentIndex.build(DOCUMENTS).save(content_index_path(summary_path))
+            self.assertIsNone(open_content_index(summary_path))
+
+if __name__ == '__main__':
+    unittest.main()
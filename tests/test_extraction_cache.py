@@ -0,0 +1,141 @@
+"""
+Unit tests for the Phase 4 extraction cache
+"""
+
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from pathlib import Path
+from unittest import mock
+
+from src.extraction_cache import ExtractionCache, CachedExtraction, file_digest
+from src.phase3_document_intake import FileFormat, UploadedDocument
+from src.phase4_text_extraction import TextExtractor
+
+
+def make_entry(text: str) -> CachedExtraction:
+    return CachedExtraction(
+        raw_text=text,
+        normalized_text=text.strip(),
+        extraction_method="text",
+        pages=[{"page_number": 1, "source": "text", "char_count": len(text), "error": None}]
+    )
+
+
+class TestExtractionCache(unittest.TestCase):
+    """Test ExtractionCache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.cache = ExtractionCache(os.path.join(self.tmp_dir.name, "cache"))
+
+    def test_put_and_get(self):
+        """Test storing and reading back an entry"""
+        key = ExtractionCache.make_key("abc", {"ocr_language": "spa"})
+        self.cache.put(key, make_entry("Acta N° 45"))
+
+        entry = self.cache.get(key)
+
+        self.assertEqual(entry.raw_text, "Acta N° 45")
+        self.assertEqual(entry.page_char_counts, [10])
+        self.assertEqual(self.cache.get_stats()["hits"], 1)
+
+    def test_miss(self):
+        """Test lookup of an unknown key"""
+        self.assertIsNone(self.cache.get(ExtractionCache.make_key("missing", {})))
+        self.assertEqual(self.cache.get_stats()["misses"], 1)
+
+    def test_settings_change_key(self):
+        """Test that OCR settings are part of the key"""
+        key_spa = ExtractionCache.make_key("abc", {"ocr_language": "spa", "ocr_dpi": 300})
+        key_eng = ExtractionCache.make_key("abc", {"ocr_language": "eng", "ocr_dpi": 300})
+        self.assertNotEqual(key_spa, key_eng)
+
+    def test_file_digest(self):
+        """Test that identical bytes give the same digest"""
+        paths = []
+        for name in ("a.txt", "b.txt"):
+            path = Path(self.tmp_dir.name) / name
+            path.write_text("mismo contenido", encoding="utf-8")
+            paths.append(path)
+
+        self.assertEqual(file_digest(paths[0]), file_digest(paths[1]))
+
+    def test_failed_put_leaves_no_temp_file(self):
+        """Test that a failed write removes its temp file and keeps the old entry"""
+        key = ExtractionCache.make_key("abc", {})
+        self.cache.put(key, make_entry("original"))
+
+        with mock.patch("src.extraction_cache.os.replace", side_effect=OSError("disk full")):
+            with self.assertRaises(OSError):
+                self.cache.put(key, make_entry("replacement"))
+
+        self.assertEqual(list(self.cache.cache_dir.glob("*/*.tmp")), [])
+        self.assertEqual(self.cache.get(key).raw_text, "original")
+
+    def test_lru_eviction(self):
+        """Test that least recently used entries are evicted first"""
+        cache = ExtractionCache(os.path.join(self.tmp_dir.name, "small"), max_bytes=800)
+        keys = [ExtractionCache.make_key(str(i), {}) for i in range(3)]
+
+        cache.put(keys[0], make_entry("x" * 100))
+        cache.put(keys[1], make_entry("y" * 100))
+        old = time.time() - 60
+        os.utime(cache._entry_path(keys[0]), (old, old))
+        os.utime(cache._entry_path(keys[1]), (old + 1, old + 1))
+        cache.get(keys[0])  # keys[0] is now the most recent
+
+        cache.put(keys[2], make_entry("z" * 100))
+
+        self.assertIsNotNone(cache.get(keys[0]))
+        self.assertIsNone(cache.get(keys[1]))
+        self.assertIsNotNone(cache.get(keys[2]))
+        self.assertLessEqual(cache.get_stats()["total_bytes"], 800)
+
+
+class TestTextExtractorCache(unittest.TestCase):
+    """Test that TextExtractor consults the cache first"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        TextExtractor.configure_cache(os.path.join(self.tmp_dir.name, "cache"))
+        self.addCleanup(TextExtractor.configure_cache, None)
+
+        self.path = Path(self.tmp_dir.name) / "acta.txt"
+        self.path.write_text("Acta  N° 45", encoding="utf-8")
+        self.document = UploadedDocument(
+            file_path=self.path,
+            file_name="acta.txt",
+            file_format=FileFormat.TXT,
+            file_size_bytes=12,
+            upload_timestamp=datetime.now()
+        )
+
+    def test_second_extraction_is_a_hit(self):
+        """Test that re-processing identical bytes is served from the cache"""
+        first = TextExtractor.process_document(self.document)
+        second = TextExtractor.process_document(self.document)
+
+        stats = TextExtractor.cache.get_stats()
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(first.extracted_data.normalized_text, "Acta N° 45")
+        self.assertEqual(second.extracted_data.acta_number, "45")
+
+    def test_changed_bytes_miss(self):
+        """Test that editing the file invalidates the entry"""
+        TextExtractor.extract_text(self.document)
+        self.path.write_text("Acta N° 46", encoding="utf-8")
+
+        text, method = TextExtractor.extract_text(self.document)
+
+        self.assertEqual(text, "Acta N° 46")
+        self.assertEqual(TextExtractor.cache.get_stats()["hits"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
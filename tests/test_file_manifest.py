@@ -0,0 +1,151 @@
+"""
+Unit tests for the customer folder manifest
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src import file_manifest
+from src.file_manifest import (
+    MANIFEST_VERSION,
+    append_changes,
+    diff_manifests,
+    load_manifest,
+    scan_customer_folder,
+    scan_notaria_folders,
+)
+
+
+class TestFileManifest(unittest.TestCase):
+    """Test scanning, diffing and the changes log"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.base_dir = os.path.join(self.tmp_dir.name, "Notaria")
+
+    def write(self, rel_path: str, content: bytes = b"data"):
+        path = os.path.join(self.base_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as handle:
+            handle.write(content)
+        return path
+
+    def test_scan_customer_folder(self):
+        """Test every file is listed by relative path with its hash"""
+        self.write("Acme SA/certificado.pdf", b"a")
+        self.write("Acme SA/2024/estatuto.pdf", b"b")
+
+        entries = scan_customer_folder(os.path.join(self.base_dir, "Acme SA"))
+
+        self.assertEqual(sorted(entries), [os.path.join("2024", "estatuto.pdf"), "certificado.pdf"])
+        self.assertEqual(
+            entries["certificado.pdf"]["sha256"],
+            "ca978112ca1bbdcafac231b39a23dc4da786eff8147c4e72b9807785afee48bb"
+        )
+        self.assertEqual(entries["certificado.pdf"]["size"], 1)
+
+    @unittest.skipUnless(hasattr(os, "symlink"), "symlinks not supported")
+    def test_symlinked_folders_not_followed(self):
+        """Test a folder symlink (here a loop back to the customer) is not entered"""
+        self.write("Acme SA/a.pdf")
+        folder = os.path.join(self.base_dir, "Acme SA")
+        try:
+            os.symlink(folder, os.path.join(folder, "loop"), target_is_directory=True)
+        except OSError:
+            self.skipTest("cannot create symlinks")
+
+        self.assertEqual(list(scan_customer_folder(folder)), ["a.pdf"])
+
+    def test_unchanged_files_are_not_rehashed(self):
+        """Test a file with the same size and mtime keeps its previous hash"""
+        self.write("Acme SA/certificado.pdf", b"a")
+        folder = os.path.join(self.base_dir, "Acme SA")
+        previous = scan_customer_folder(folder)
+
+        with mock.patch.object(file_manifest, "file_digest") as file_digest:
+            self.assertEqual(scan_customer_folder(folder, previous), previous)
+        file_digest.assert_not_called()
+
+    def test_scan_notaria_folders(self):
+        """Test one entry per customer folder, sequential or threaded"""
+        self.write("Acme SA/a.pdf")
+        self.write("Beta SRL/b.pdf")
+        self.write("notes.txt")  # Files at the top level are not customers
+
+        manifest = scan_notaria_folders(self.base_dir)
+
+        self.assertEqual(manifest["version"], MANIFEST_VERSION)
+        self.assertEqual(list(manifest["customers"]), ["Acme SA", "Beta SRL"])
+        self.assertEqual(scan_notaria_folders(self.base_dir, workers=2), manifest)
+
+    def test_diff_manifests(self):
+        """Test added, removed and modified files are reported per customer"""
+        self.write("Acme SA/a.pdf", b"1")
+        self.write("Acme SA/b.pdf", b"1")
+        previous = scan_notaria_folders(self.base_dir)
+        self.write("Acme SA/a.pdf", b"22")
+        os.remove(os.path.join(self.base_dir, "Acme SA", "b.pdf"))
+        self.write("Beta SRL/c.pdf")
+
+        changes = diff_manifests(previous, scan_notaria_folders(self.base_dir, previous))
+
+        self.assertEqual(changes, {
+            "added": [{"customer": "Beta SRL", "relative_path": "c.pdf"}],
+            "removed": [{"customer": "Acme SA", "relative_path": "b.pdf"}],
+            "modified": [{"customer": "Acme SA", "relative_path": "a.pdf"}],
+        })
+        self.assertEqual(diff_manifests(previous, previous), {"added": [], "removed": [], "modified": []})
+
+    def test_full_rescan_diffs_against_stored_manifest(self):
+        """Test a rescan without the hash hint still reports only real changes"""
+        self.write("Acme SA/a.pdf", b"1")
+        previous = scan_notaria_folders(self.base_dir)
+        self.write("Acme SA/b.pdf", b"2")
+
+        changes = diff_manifests(previous, scan_notaria_folders(self.base_dir))
+
+        self.assertEqual(changes["added"], [{"customer": "Acme SA", "relative_path": "b.pdf"}])
+        self.assertEqual(changes["modified"], [])
+
+    def test_load_manifest(self):
+        """Test missing, corrupt and other-version manifests are ignored"""
+        path = os.path.join(self.tmp_dir.name, "manifest.json")
+        self.assertIsNone(load_manifest(path))
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("{not json")
+        self.assertIsNone(load_manifest(path))
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION + 1, "customers": {}}, f)
+        self.assertIsNone(load_manifest(path))
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "customers": {}}, f)
+        self.assertEqual(load_manifest(path), {"version": MANIFEST_VERSION, "customers": {}})
+
+    def test_changes_log_is_cumulative(self):
+        """Test each run with changes appends a timestamped line"""
+        path = os.path.join(self.tmp_dir.name, "changes.jsonl")
+        first = {"added": [{"customer": "Acme SA", "relative_path": "a.pdf"}], "removed": [], "modified": []}
+        second = {"added": [], "removed": [], "modified": [{"customer": "Acme SA", "relative_path": "a.pdf"}]}
+
+        self.assertTrue(append_changes(path, first, full_rescan=True))
+        self.assertFalse(append_changes(path, {"added": [], "removed": [], "modified": []}))
+        self.assertTrue(append_changes(path, second, full_rescan=False))
+
+        with open(path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["added"], first["added"])
+        self.assertTrue(records[0]["full_rescan"])
+        self.assertEqual(records[1]["modified"], second["modified"])
+        self.assertIn("indexed_at", records[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
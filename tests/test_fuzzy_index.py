@@ -0,0 +1,107 @@
+"""
+Unit tests for the trigram fuzzy index
+"""
+
+import difflib
+import random
+import unittest
+
+from src.fuzzy_index import TrigramIndex, trigrams
+from src.keyword_classifier import normalize_text
+
+
+FILENAMES = sorted([
+    "Certificación FIRMA de Walter Federico Albanell por AMURA, para BCU.doc",
+    "Certificación para CGN, libre contratación, padrones 426781-1008 y 1009, Mdeo.doc",
+    "CERTIFICACION PERSONERIA, REPRESENTACIÓN, LEYES.doc",
+    "CERTIFICACION personeria, representacion, leyes, libros, para Comercio.docx",
+    "Declaratoria ACRISOUND.pdf",
+    "Pasaporte bassi(1).jpg",
+    "SUBSANACION ACRISOUND, S.A..doc",
+    "Tasa acrisound paga.jpg",
+    "certificado de firmas 352 DGI ACRISOUND SA.docx",
+    "Poder general Netkla Trading.pdf",
+    "Constancia DGI Inversora Laredo.pdf",
+    "ERROR certificado firma Ingatel.doc",
+])
+
+
+def scan_all(query, candidates, limit=5):
+    """Reference: difflib against every candidate, stable-sorted by ratio"""
+    query_norm = normalize_text(query)
+    if not query_norm:
+        return []
+    scored = [
+        (candidate, difflib.SequenceMatcher(None, query_norm, normalize_text(candidate)).ratio())
+        for candidate in candidates
+    ]
+    scored.sort(key=lambda item: item[1], reverse=True)
+    return [(candidate, score) for candidate, score in scored[:limit] if score > 0]
+
+
+def mutate(text, rng):
+    chars = list(text)
+    for _ in range(rng.randint(0, 6)):
+        position = rng.randrange(len(chars) + 1)
+        if rng.random() < 0.5 and chars:
+            chars.pop(min(position, len(chars) - 1))
+        else:
+            chars.insert(position, rng.choice("abcdefghijklmnopqrstuvwxyz _0123456789"))
+    return "".join(chars)
+
+
+class TestTrigramIndex(unittest.TestCase):
+    """Test TrigramIndex"""
+
+    def test_trigrams(self):
+        """Test trigrams are padded and distinct"""
+        self.assertEqual(trigrams(""), ())
+        self.assertEqual(set(trigrams("ab")), {"  a", " ab", "ab "})
+        self.assertEqual(len(trigrams("aaaa")), len(set(trigrams("aaaa"))))
+
+    def test_exact_match_first(self):
+        """Test a known filename is its own best suggestion"""
+        index = TrigramIndex(FILENAMES)
+        matches = index.top_matches("Tasa acrisound paga.jpg")
+        self.assertEqual(matches[0], ("Tasa acrisound paga.jpg", 1.0))
+
+    def test_same_as_full_scan(self):
+        """Test suggestions and their order equal scoring every candidate"""
+        rng = random.Random(7)
+        index = TrigramIndex(FILENAMES)
+        queries = [mutate(rng.choice(FILENAMES), rng) for _ in range(100)]
+        queries += ["xyz", "a", "certificado", "poder firma bse", "Acme SA"]
+        for query in queries:
+            with self.subTest(query=query):
+                self.assertEqual(index.top_matches(query), scan_all(query, FILENAMES))
+
+    def test_same_as_full_scan_large(self):
+        """Test exactness when most candidates are pruned"""
+        rng = random.Random(11)
+        candidates = sorted({f"{mutate(rng.choice(FILENAMES), rng)} {n}" for n in range(600)})
+        index = TrigramIndex(candidates)
+        for _ in range(5):
+            query = mutate(rng.choice(FILENAMES), rng)
+            self.assertEqual(index.top_matches(query), scan_all(query, candidates))
+
+    def test_ties_keep_candidate_order(self):
+        """Test equal scores come back in candidate order"""
+        candidates = ["abc x", "abc y", "abc z"]
+        index = TrigramIndex(candidates)
+        self.assertEqual([name for name, _ in index.top_matches("abc")], candidates)
+
+    def test_limit(self):
+        """Test the number of suggestions follows limit"""
+        index = TrigramIndex(FILENAMES)
+        self.assertEqual(len(index.top_matches("certificacion", limit=2)), 2)
+        self.assertEqual(index.top_matches("certificacion", limit=0), [])
+
+    def test_empty(self):
+        """Test empty queries and empty candidate lists"""
+        self.assertEqual(TrigramIndex(FILENAMES).top_matches(""), [])
+        self.assertEqual(TrigramIndex([]).top_matches("poder"), [])
+        self.assertEqual(len(TrigramIndex([])), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
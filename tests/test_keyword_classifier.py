@@ -0,0 +1,137 @@
+"""
+Unit tests for the keyword classifier and the LLM prefilter
+"""
+
+import unittest
+
+from src.keyword_classifier import (
+    KeywordIndex,
+    authority_classification,
+    get_keyword_index,
+    is_decisive,
+    keyword_candidate_types,
+    keyword_classification,
+    normalize_text,
+    prefilter_classification,
+)
+
+
+REFERENCE = {
+    "firma": {"purposes": ["bse"], "attributes": ["ley", "leyes"]},
+    "personeria": {"purposes": ["dgi"], "attributes": ["domicilio", "giro", "objeto", "ley"]},
+    "firma_personeria": {"purposes": ["abitab"], "attributes": ["domicilio", "giro", "leyes", "poder"]},
+}
+
+
+class TestKeywordClassifier(unittest.TestCase):
+    """Test keyword classification"""
+
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  Certificación  Común-BPS "), "certificacion comun bps")
+
+    def test_best_type_with_margin(self):
+        text = "Domicilio: Montevideo. Giro: comercial. Objeto: servicios. Ley 16.060. Para DGI."
+
+        result = keyword_classification(text, REFERENCE)
+
+        self.assertEqual(result["certificate_type"], "personeria")
+        self.assertEqual(result["score"], 4)
+        self.assertEqual(result["margin"], 2)  # firma_personeria only hits domicilio and giro
+        self.assertEqual(result["purpose"], "dgi")
+        self.assertAlmostEqual(result["confidence"], 0.6)
+
+    def test_tie_has_no_margin(self):
+        result = keyword_classification("domicilio giro", REFERENCE)
+        self.assertEqual(result["margin"], 0)
+
+    def test_no_match(self):
+        self.assertEqual(keyword_classification("nada relevante", REFERENCE)["status"], "error")
+        self.assertEqual(keyword_classification("", REFERENCE)["status"], "error")
+
+    def test_candidate_types(self):
+        self.assertEqual(keyword_candidate_types("Poder especial", REFERENCE), ["firma_personeria"])
+
+    def test_authority_patterns(self):
+        result = authority_classification("CERTIFICADO COMÚN BPS\nEmpresa: ACME S.A.")
+
+        self.assertFalse(result["is_certificate"])
+        self.assertEqual(result["certificate_type"], "non_certificate")
+        self.assertEqual(result["purpose"], "bps")
+        self.assertIsNone(authority_classification("Certificación notarial de firma"))
+
+    def test_certificate_citing_authority_document(self):
+        text = "Certifico que tuve a la vista el certificado DGI vigente. Escribano Público"
+        self.assertIsNone(authority_classification(text))
+
+
+class TestKeywordIndex(unittest.TestCase):
+    """Test the precompiled keyword index"""
+
+    def test_distinct_patterns(self):
+        index = KeywordIndex(REFERENCE)
+
+        self.assertEqual(index.type_attributes["firma"], ("ley", "leyes"))
+        self.assertEqual(len(index.patterns), len(set(index.patterns)))
+        self.assertIn("certificado comun bps", index.patterns)
+
+    def test_find_is_substring_match(self):
+        index = KeywordIndex(REFERENCE)
+
+        found = index.find("las leyes vigentes y sus poderes")
+
+        self.assertTrue({"ley", "leyes", "poder"} <= found)
+        self.assertEqual(index.attribute_hits(found)["firma"], ["ley", "leyes"])
+
+    def test_first_purpose_follows_summary_order(self):
+        index = KeywordIndex(REFERENCE)
+        self.assertEqual(index.first_purpose(index.find("para abitab y dgi")), "dgi")
+
+    def test_built_once_per_version(self):
+        reference = dict(REFERENCE)
+
+        self.assertIs(get_keyword_index(reference), get_keyword_index(reference))
+        self.assertIs(get_keyword_index(reference), get_keyword_index(dict(REFERENCE)))
+
+
+class TestPrefilter(unittest.TestCase):
+    """Test the confidence-gated prefilter"""
+
+    def test_authority_document_decides(self):
+        prefilter = prefilter_classification("Constancia DGI de inscripción", REFERENCE)
+        self.assertEqual(prefilter["decided_by"], "authority_pattern")
+        self.assertFalse(prefilter["classification"]["is_certificate"])
+
+    def test_certificate_citing_authority_document_not_decided(self):
+        notarial = prefilter_classification(
+            "CERTIFICO QUE: tuve a la vista el certificado DGI. Doy fe.", REFERENCE
+        )
+        with_attributes = prefilter_classification("Constancia DGI. Poder especial", REFERENCE)
+
+        self.assertNotEqual(notarial["decided_by"], "authority_pattern")
+        self.assertNotEqual(with_attributes["decided_by"], "authority_pattern")
+
+    def test_decisive_keywords(self):
+        text = "Domicilio: Montevideo. Giro: comercial. Objeto: servicios. Ley 16.060."
+
+        prefilter = prefilter_classification(text, REFERENCE)
+
+        self.assertEqual(prefilter["decided_by"], "keywords")
+        self.assertEqual(prefilter["classification"]["certificate_type"], "personeria")
+
+    def test_weak_or_ambiguous_keywords_go_to_llm(self):
+        weak = prefilter_classification("Ley 16.060", REFERENCE)
+        ambiguous = prefilter_classification("domicilio giro", REFERENCE)
+
+        self.assertIsNone(weak["decided_by"])
+        self.assertEqual(weak["keyword_result"]["status"], "ok")
+        self.assertIsNone(ambiguous["decided_by"])
+
+    def test_threshold_is_configurable(self):
+        result = keyword_classification("Ley 16.060", REFERENCE)
+
+        self.assertFalse(is_decisive(result))
+        self.assertTrue(is_decisive(result, min_confidence=0.3, min_margin=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
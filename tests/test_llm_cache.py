@@ -0,0 +1,130 @@
+"""
+Unit tests for the LLM response cache
+"""
+
+import os
+import tempfile
+import threading
+import unittest
+
+from src.llm_cache import LLMCache
+
+
+MESSAGES = [{"role": "user", "content": "Documento: acta de directorio"}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLLMCache(unittest.TestCase):
+    """Test LLMCache"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "llm", "responses.sqlite")
+        self.clock = FakeClock()
+
+    def make_cache(self, **kwargs):
+        cache = LLMCache(self.path, clock=self.clock, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_round_trip_and_counters(self):
+        """Test put/get with hit and miss counters"""
+        cache = self.make_cache()
+        key = LLMCache.make_key("model-a", "1", MESSAGES)
+
+        self.assertIsNone(cache.get(key))
+        cache.put(key, "{\"ok\": true}", model="model-a", prompt_version="1")
+
+        self.assertEqual(cache.get(key), "{\"ok\": true}")
+        stats = cache.get_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 1, 1))
+
+    def test_key_depends_on_model_version_text_and_params(self):
+        """Test that every input of the call changes the key"""
+        base = LLMCache.make_key("model-a", "1", MESSAGES, temperature=0.1)
+        other_text = [{"role": "user", "content": "Documento: poder"}]
+
+        self.assertEqual(base, LLMCache.make_key("model-a", "1", MESSAGES, temperature=0.1))
+        self.assertNotEqual(base, LLMCache.make_key("model-b", "1", MESSAGES, temperature=0.1))
+        self.assertNotEqual(base, LLMCache.make_key("model-a", "2", MESSAGES, temperature=0.1))
+        self.assertNotEqual(base, LLMCache.make_key("model-a", "1", other_text, temperature=0.1))
+        self.assertNotEqual(base, LLMCache.make_key("model-a", "1", MESSAGES, temperature=0.5))
+
+    def test_persists_across_instances(self):
+        """Test that a new process/rerun sees earlier answers"""
+        key = LLMCache.make_key("model-a", "1", MESSAGES)
+        self.make_cache().put(key, "respuesta")
+
+        self.assertEqual(self.make_cache().get(key), "respuesta")
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are misses and get removed"""
+        cache = self.make_cache(ttl_seconds=60)
+        cache.put("k", "respuesta")
+
+        self.clock.now += 61
+        self.assertIsNone(cache.get("k"))
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+    def test_lru_eviction_by_size(self):
+        """Test that the least recently used entries go first"""
+        cache = self.make_cache(max_entries=2)
+        cache.put("a", "1")
+        self.clock.now += 1
+        cache.put("b", "2")
+        self.clock.now += 1
+        cache.get("a")  # "b" is now the least recently used
+        self.clock.now += 1
+        cache.put("c", "3")
+
+        self.assertEqual(cache.get("a"), "1")
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), "3")
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+    def test_replacing_does_not_grow(self):
+        """Test that rewriting a key keeps one entry"""
+        cache = self.make_cache(max_entries=1)
+        cache.put("a", "1")
+        cache.put("a", "2")
+
+        self.assertEqual(cache.get("a"), "2")
+        self.assertEqual(cache.get_stats()["entries"], 1)
+
+    def test_concurrent_threads(self):
+        """Test shared use from worker threads"""
+        cache = self.make_cache()
+
+        def worker(index):
+            for item in range(20):
+                key = f"{index}-{item}"
+                cache.put(key, key)
+                self.assertEqual(cache.get(key), key)
+
+        threads = [threading.Thread(target=worker, args=(index,)) for index in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(cache.get_stats()["entries"], 80)
+
+    def test_clear(self):
+        cache = self.make_cache()
+        cache.put("a", "1")
+        cache.clear()
+
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.get_stats()["entries"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
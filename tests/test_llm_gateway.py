@@ -0,0 +1,342 @@
+"""
+Unit tests for the LLM gateway
+"""
+
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+
+from src.llm_gateway import (
+    LLMGateway,
+    TokenBucket,
+    get_gateway,
+    is_rate_limit_error,
+    pack_by_budget,
+)
+
+
+class FakeClock:
+    """Manual clock whose sleep() advances time"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class RateLimitError(Exception):
+    """Shaped like groq.RateLimitError"""
+
+    def __init__(self, retry_after=None):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        headers = {"retry-after": str(retry_after)} if retry_after is not None else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class FakeClient:
+    """Stands in for a Groq client; replies with queued outcomes"""
+
+    def __init__(self, outcomes=None, delay=0.0, total_tokens=None):
+        self.outcomes = list(outcomes or [])
+        self.delay = delay
+        self.total_tokens = total_tokens
+        self.calls = []
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        with self._lock:
+            self.calls.append(kwargs)
+            outcome = self.outcomes.pop(0) if self.outcomes else None
+        if self.delay:
+            time.sleep(self.delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        content = outcome if outcome is not None else kwargs["messages"][-1]["content"].upper()
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(total_tokens=self.total_tokens)
+        )
+
+
+def make_gateway(client, **kwargs):
+    sleeps = []
+    gateway = LLMGateway("test-key", client=client, sleep=sleeps.append, **kwargs)
+    return gateway, sleeps
+
+
+MESSAGES = [{"role": "user", "content": "hola"}]
+
+
+class TestTokenBucket(unittest.TestCase):
+    """Test TokenBucket"""
+
+    def test_acquire_within_capacity(self):
+        """Test that a full bucket serves immediately"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+
+        self.assertEqual(bucket.acquire(60), 0.0)
+        self.assertFalse(bucket.try_acquire(1))
+
+    def test_acquire_waits_for_refill(self):
+        """Test waiting at the refill rate once the bucket is empty"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)  # 1 token per second
+        bucket.acquire(60)
+
+        waited = bucket.acquire(3)
+
+        self.assertAlmostEqual(waited, 3.0)
+
+    def test_adjust_charges_extra_usage(self):
+        """Test that charging more than estimated delays later callers"""
+        clock = FakeClock()
+        bucket = TokenBucket(60, clock=clock, sleep=clock.sleep)
+        bucket.acquire(50)
+        bucket.adjust(20)  # Call used 20 more than reserved
+
+        self.assertAlmostEqual(bucket.acquire(5), 15.0)
+
+
+class TestLLMGateway(unittest.TestCase):
+    """Test LLMGateway"""
+
+    def test_chat_returns_content(self):
+        """Test a plain chat call"""
+        client = FakeClient(outcomes=["{\"ok\": true}"])
+        gateway, _ = make_gateway(client)
+
+        content = gateway.chat("model-a", MESSAGES, temperature=0.1)
+
+        self.assertEqual(content, "{\"ok\": true}")
+        self.assertEqual(client.calls[0]["model"], "model-a")
+        self.assertNotIn("max_tokens", client.calls[0])
+        self.assertIs(gateway.client, client)
+
+    def test_max_tokens_is_forwarded(self):
+        """Test that an explicit completion budget reaches the client"""
+        client = FakeClient()
+        gateway, _ = make_gateway(client)
+
+        gateway.chat("model-a", MESSAGES, max_tokens=64)
+
+        self.assertEqual(client.calls[0]["max_tokens"], 64)
+
+    def test_retries_rate_limited_calls(self):
+        """Test jittered retry on 429, honouring Retry-After"""
+        client = FakeClient(outcomes=[RateLimitError(retry_after=2), RateLimitError(), "listo"])
+        gateway, sleeps = make_gateway(client, backoff_base=0.5)
+
+        content = gateway.chat("model-a", MESSAGES)
+
+        self.assertEqual(content, "listo")
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(len(sleeps), 2)
+        self.assertGreaterEqual(sleeps[0], 2.0)
+        self.assertLessEqual(sleeps[1], 1.0)  # attempt 1: at most 0.5 * 2
+        self.assertEqual(gateway.get_stats(), {"requests": 3, "rate_limited": 2})
+
+    def test_gives_up_after_max_retries(self):
+        """Test that a persistent 429 is raised"""
+        client = FakeClient(outcomes=[RateLimitError()] * 3)
+        gateway, _ = make_gateway(client, max_retries=2)
+
+        with self.assertRaises(RateLimitError):
+            gateway.chat("model-a", MESSAGES)
+        self.assertEqual(len(client.calls), 3)
+
+    def test_other_errors_are_not_retried(self):
+        """Test that non rate-limit errors propagate immediately"""
+        client = FakeClient(outcomes=[ValueError("bad request")])
+        gateway, sleeps = make_gateway(client)
+
+        with self.assertRaises(ValueError):
+            gateway.chat("model-a", MESSAGES)
+        self.assertEqual(len(client.calls), 1)
+        self.assertEqual(sleeps, [])
+
+    def test_limits_are_per_model(self):
+        """Test that each model spends its own request budget"""
+        client = FakeClient()
+        gateway, sleeps = make_gateway(client, requests_per_minute=2, tokens_per_minute=100000)
+
+        for _ in range(2):
+            gateway.chat("model-a", MESSAGES)
+        gateway.chat("model-b", MESSAGES)
+
+        self.assertEqual(sleeps, [])
+        self.assertFalse(gateway.get_buckets("model-a")[0].try_acquire(1))
+        self.assertTrue(gateway.get_buckets("model-b")[0].try_acquire(1))
+
+    def test_token_estimate(self):
+        """Test the prompt + completion estimate"""
+        messages = [{"role": "user", "content": "x" * 400}]
+        self.assertEqual(LLMGateway.estimate_tokens(messages, max_tokens=100), 200)
+
+    def test_map_fans_out_in_order(self):
+        """Test concurrent calls with results in input order"""
+        client = FakeClient(delay=0.2)
+        gateway, _ = make_gateway(client, max_workers=4)
+
+        start = time.monotonic()
+        results = gateway.map(
+            lambda text: gateway.chat("model-a", [{"role": "user", "content": text}]),
+            ["uno", "dos", "tres", "cuatro"]
+        )
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(results, ["UNO", "DOS", "TRES", "CUATRO"])
+        self.assertLess(elapsed, 0.6)
+
+    def test_cached_calls_skip_the_api(self):
+        """Test that a repeated prompt is answered from the response cache"""
+        client = FakeClient()
+        gateway, _ = make_gateway(client)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = gateway.configure_cache(os.path.join(tmp_dir.name, "responses.sqlite"))
+        self.addCleanup(cache.close)
+
+        first = gateway.chat("model-a", MESSAGES, prompt_version="1")
+        second = gateway.chat("model-a", MESSAGES, prompt_version="1")
+        gateway.chat("model-a", MESSAGES, prompt_version="2")
+        gateway.chat("model-a", MESSAGES)  # No version: never cached
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(client.calls), 3)
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+    def test_cached_calls_with_max_tokens(self):
+        """Test max_tokens reaches the API and keys the cache when caching is on"""
+        client = FakeClient()
+        gateway, _ = make_gateway(client)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = gateway.configure_cache(os.path.join(tmp_dir.name, "responses.sqlite"))
+        self.addCleanup(cache.close)
+
+        gateway.chat("model-a", MESSAGES, max_tokens=64, prompt_version="1")
+        gateway.chat("model-a", MESSAGES, max_tokens=64, prompt_version="1")
+        gateway.chat("model-a", MESSAGES, max_tokens=128, prompt_version="1")
+
+        self.assertEqual([call["max_tokens"] for call in client.calls], [64, 128])
+        self.assertEqual(cache.get_stats()["hits"], 1)
+
+    def test_cache_bypass_and_validation(self):
+        """Test bypass_cache refreshes entries and rejected answers are not stored"""
+        client = FakeClient(outcomes=["no es json", "{\"ok\": 1}", "{\"ok\": 2}"])
+        gateway, _ = make_gateway(client)
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        cache = gateway.configure_cache(os.path.join(tmp_dir.name, "responses.sqlite"))
+        self.addCleanup(cache.close)
+        is_json = lambda content: content.startswith("{")
+
+        self.assertEqual(gateway.chat("model-a", MESSAGES, prompt_version="1", cacheable=is_json), "no es json")
+        self.assertEqual(gateway.chat("model-a", MESSAGES, prompt_version="1", cacheable=is_json), "{\"ok\": 1}")
+        self.assertEqual(
+            gateway.chat("model-a", MESSAGES, prompt_version="1", cacheable=is_json, bypass_cache=True),
+            "{\"ok\": 2}"
+        )
+        self.assertEqual(gateway.chat("model-a", MESSAGES, prompt_version="1", cacheable=is_json), "{\"ok\": 2}")
+        self.assertEqual(len(client.calls), 3)
+
+    def test_get_gateway_is_shared(self):
+        """Test one gateway per API key"""
+        self.assertIs(get_gateway("key-1"), get_gateway("key-1"))
+        self.assertIsNot(get_gateway("key-1"), get_gateway("key-2"))
+
+    def test_is_rate_limit_error(self):
+        """Test 429 detection"""
+        self.assertTrue(is_rate_limit_error(RateLimitError()))
+        self.assertFalse(is_rate_limit_error(ValueError()))
+
+
+class TestPackByBudget(unittest.TestCase):
+    """Test pack_by_budget"""
+
+    def test_packs_in_order_within_budget(self):
+        batches = pack_by_budget([3, 4, 2, 5, 1], cost=lambda item: item, budget=7)
+        self.assertEqual(batches, [[3, 4], [2, 5], [1]])
+
+    def test_oversized_item_gets_own_batch(self):
+        batches = pack_by_budget([2, 20, 2], cost=lambda item: item, budget=10)
+        self.assertEqual(batches, [[2], [20], [2]])
+
+    def test_max_items(self):
+        batches = pack_by_budget([1] * 5, cost=lambda item: item, budget=100, max_items=2)
+        self.assertEqual(batches, [[1, 1], [1, 1], [1]])
+
+    def test_empty(self):
+        self.assertEqual(pack_by_budget([], cost=len, budget=10), [])
+
+
+class StubGroqHandler(BaseHTTPRequestHandler):
+    """OpenAI-compatible chat endpoint that rate limits the first request"""
+
+    requests_seen = 0
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        StubGroqHandler.requests_seen += 1
+        if StubGroqHandler.requests_seen == 1:
+            payload = json.dumps({"error": {"message": "rate limited"}}).encode()
+            self.send_response(429)
+            self.send_header("retry-after", "0")
+        else:
+            payload = json.dumps({
+                "id": "stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "{\"stub\": true}"},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": 5, "completion_tokens": 5, "total_tokens": 10}
+            }).encode()
+            self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipUnless(importlib.util.find_spec("groq"), "groq SDK not installed")
+class TestLLMGatewayStubServer(unittest.TestCase):
+    """Test the real Groq client against a local stub server"""
+
+    def test_chat_against_stub_server(self):
+        server = HTTPServer(("127.0.0.1", 0), StubGroqHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        gateway = LLMGateway("test-key", base_url=f"http://127.0.0.1:{server.server_port}")
+        content = gateway.chat("model-a", MESSAGES)
+
+        self.assertEqual(content, "{\"stub\": true}")
+        self.assertEqual(gateway.get_stats()["rate_limited"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+"""
+Unit tests for the OCR executor (process-pool OCR for Phase 4)
+"""
+
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src import ocr_executor
+from src.ocr_executor import OCRExecutor, get_ocr_executor
+
+
+def fake_ocr(file_path, page_number, lang, dpi):
+    """Later pages finish first, to check that results come back in page order"""
+    time.sleep(0.2 * (4 - page_number))
+    return f"{Path(file_path).name} p{page_number} {lang} {dpi}"
+
+
+def slow_ocr(file_path, page_number, lang, dpi):
+    time.sleep(2 if page_number > 1 else 0)
+    return f"p{page_number}"
+
+
+def steady_ocr(file_path, page_number, lang, dpi):
+    time.sleep(0.1)
+    return f"p{page_number} {lang}"
+
+
+def failing_ocr(file_path, page_number, lang, dpi):
+    if page_number == 2:
+        raise ValueError("unreadable page")
+    return f"p{page_number}"
+
+
+class TestOCRExecutor(unittest.TestCase):
+    """Test OCRExecutor"""
+
+    def test_results_in_page_order(self):
+        """Test that pages are returned in page order with source ocr"""
+        with OCRExecutor(max_workers=3, lang="spa", dpi=150, page_worker=fake_ocr) as executor:
+            pages = executor.ocr_pages(Path("acta.pdf"), [3, 1, 2])
+
+        self.assertEqual([page.page_number for page in pages], [1, 2, 3])
+        self.assertTrue(all(page.source == "ocr" for page in pages))
+        self.assertEqual(pages[0].text, "acta.pdf p1 spa 150")
+
+    def test_pages_run_in_parallel(self):
+        """Test that wall time is close to the slowest page, not the sum"""
+        with OCRExecutor(max_workers=3, page_worker=fake_ocr) as executor:
+            executor.ocr_pages(Path("warmup.pdf"), [3])
+            start = time.monotonic()
+            executor.ocr_pages(Path("acta.pdf"), [1, 2, 3])
+            elapsed = time.monotonic() - start
+
+        # Sequential would take 0.6 + 0.4 + 0.2 = 1.2s
+        self.assertLess(elapsed, 1.0)
+
+    def test_deadline_skips_late_pages(self):
+        """Test that pages still running at the deadline are skipped"""
+        with OCRExecutor(max_workers=2, page_worker=slow_ocr) as executor:
+            pages = executor.ocr_pages(Path("acta.pdf"), [1, 2], deadline_seconds=0.5)
+
+        self.assertEqual(pages[0].source, "ocr")
+        self.assertEqual(pages[1].source, "skipped")
+        self.assertIn("deadline", pages[1].error)
+
+    def test_cancel(self):
+        """Test that a cancelled job returns skipped pages"""
+        with OCRExecutor(max_workers=1, page_worker=slow_ocr) as executor:
+            job = executor.submit(Path("acta.pdf"), [2, 3])
+            job.cancel()
+            pages = job.results()
+
+        self.assertTrue(job.is_cancelled())
+        self.assertTrue(all(page.source == "skipped" for page in pages))
+
+    def test_failed_page_does_not_fail_document(self):
+        """Test that one failing page is reported and the rest still returned"""
+        with OCRExecutor(max_workers=2, page_worker=failing_ocr) as executor:
+            pages = executor.ocr_pages(Path("acta.pdf"), [1, 2, 3])
+
+        self.assertEqual([page.source for page in pages], ["ocr", "skipped", "ocr"])
+        self.assertIn("unreadable page", pages[1].error)
+
+    def test_drained_shutdown_finishes_queued_pages(self):
+        """Test that shutdown(cancel_queued=False) still runs every submitted page"""
+        executor = OCRExecutor(max_workers=1, page_worker=steady_ocr)
+        job = executor.submit(Path("acta.pdf"), list(range(1, 9)))
+        time.sleep(0.3)  # Let the first pages run, so the rest are queued
+        executor.shutdown(cancel_queued=False)
+
+        self.assertEqual([page.source for page in job.results()], ["ocr"] * 8)
+
+
+class TestDefaultExecutor(unittest.TestCase):
+    """Test the process-wide executor returned by get_ocr_executor"""
+
+    def setUp(self):
+        self.addCleanup(setattr, ocr_executor, "_default_executor", ocr_executor._default_executor)
+        ocr_executor._default_executor = None
+
+    def test_settings_change_keeps_running_jobs(self):
+        """Test that switching language replaces the executor without cancelling its jobs"""
+        executor = get_ocr_executor(lang="spa", dpi=150, max_workers=1)
+        self.assertIs(get_ocr_executor(lang="spa", dpi=150), executor)
+        job = executor.submit(Path("acta.pdf"), list(range(1, 9)), page_worker=steady_ocr)
+        time.sleep(0.3)  # Let the first pages run, so the rest are queued
+
+        with mock.patch.object(executor, "shutdown", wraps=executor.shutdown) as shutdown:
+            replacement = get_ocr_executor(lang="eng", dpi=150, max_workers=1)
+        self.addCleanup(replacement.shutdown)
+
+        shutdown.assert_called_once_with(cancel_queued=False)
+        self.assertIsNot(replacement, executor)
+        self.assertEqual(replacement.lang, "eng")
+        pages = job.results()
+        self.assertEqual([page.source for page in pages], ["ocr"] * 8)
+        self.assertEqual(pages[7].text, "p8 spa")
+
+
+if __name__ == '__main__':
+    unittest.main()
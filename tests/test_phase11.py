@@ -50,7 +50,7 @@ class TestPhase11FinalOutput(unittest.TestCase):
         self.collection = DocumentIntake.create_collection(self.intent, self.requirements)
 
         extraction_result = CollectionExtractionResult(collection=self.collection)
-        extraction_result.extracted_data = ExtractedData(
+        extraction_result.extracted_data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="TEST COMPANY S.A.",
             normalized_text="TEST COMPANY S.A.",
@@ -7,6 +7,7 @@ import tempfile
 import os
 from pathlib import Path
 from datetime import datetime
+from unittest import mock
 
 from src.phase1_certificate_intent import CertificateIntent, CertificateType, Purpose
 from src.phase2_legal_requirements import (
@@ -22,6 +23,7 @@ from src.phase3_document_intake import (
     DocumentTypeDetector,
     DocumentIntake
 )
+from src.phase4_text_extraction import ExtractedPage, TextExtractor
 
 
 class TestFileFormat(unittest.TestCase):
@@ -134,6 +136,32 @@ class TestDocumentTypeDetector(unittest.TestCase):
         self.assertFalse(DocumentTypeDetector.is_likely_scanned(FileFormat.PDF))
         self.assertFalse(DocumentTypeDetector.is_likely_scanned(FileFormat.DOCX))
 
+    def test_is_likely_scanned_from_page_classification(self):
+        """Test that a PDF is scanned only when every page needs OCR"""
+        self.assertTrue(DocumentTypeDetector.is_likely_scanned(FileFormat.PDF, ocr_pages=[1, 2], page_count=2))
+        self.assertFalse(DocumentTypeDetector.is_likely_scanned(FileFormat.PDF, ocr_pages=[2], page_count=2))
+
+    def test_classify_pdf_pages(self):
+        """Test per-page text density classification of a mixed PDF"""
+        pages = [
+            ExtractedPage(1, "ESTATUTOS DE GIRTEC SOCIEDAD ANÓNIMA - Capítulo I", "pdf_text"),
+            ExtractedPage(2, "", "pdf_text"),
+            ExtractedPage(3, "  - 3 -  ", "pdf_text"),
+        ]
+
+        with mock.patch.object(TextExtractor, "iter_pdf_pages", return_value=iter(pages)):
+            result = DocumentTypeDetector.classify_pdf_pages(Path("estatuto.pdf"))
+
+        self.assertEqual(result["page_count"], 3)
+        self.assertEqual(result["ocr_pages"], [2, 3])
+
+    def test_classify_pdf_pages_max_pages(self):
+        """Test that classification stops reading after max_pages"""
+        with mock.patch.object(TextExtractor, "iter_pdf_pages", return_value=iter([])) as iter_pages:
+            DocumentTypeDetector.classify_pdf_pages(Path("estatuto.pdf"), max_pages=2)
+
+        iter_pages.assert_called_once_with(Path("estatuto.pdf"), max_pages=2)
+
 
 class TestDocumentCollection(unittest.TestCase):
     """Test DocumentCollection"""
@@ -2,16 +2,27 @@
 Unit tests for Phase 4: Text Extraction & Structuring
 """
 
+import dataclasses
 import unittest
+import tempfile
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
+from unittest import mock
 
+from src import ocr_executor, phase4_text_extraction
 from src.phase4_text_extraction import (
     TextNormalizer,
     DataExtractor,
     ExtractedData,
+    ExtractedPage,
     DocumentExtractionResult,
-    CollectionExtractionResult
+    CollectionExtractionResult,
+    TextExtractor,
+    TextStore
 )
 from src.phase3_document_intake import DocumentType, FileFormat, UploadedDocument
 
@@ -31,6 +42,23 @@ class TestTextNormalizer(unittest.TestCase):
         fixed = TextNormalizer.fix_encoding(text)
         self.assertEqual(fixed, "Situación jurídica de la compañía")
 
+    def test_fix_encoding_longest_match(self):
+        """Test that longer sequences win over their prefixes regardless of order"""
+        text = "Ã‰XITO, ARTÃCULO 5 y Ã‘ANDÃš"
+        fixed = TextNormalizer.fix_encoding(text)
+        self.assertEqual(fixed, "ÉXITO, ARTÍCULO 5 y ÑANDÚ")
+
+    def test_fix_encoding_double_encoded_document(self):
+        """Test repairing a whole double-encoded document with one re-decode"""
+        original = "Sociedad Anónima — cláusula 5º, Güemes"
+        text = original.encode("utf-8").decode("cp1252")
+        self.assertEqual(TextNormalizer.fix_encoding(text), original)
+
+    def test_fix_encoding_keeps_correct_text(self):
+        """Test that correctly encoded text is left alone"""
+        text = "Resolución del Directorio"
+        self.assertEqual(TextNormalizer.fix_encoding(text), text)
+
     def test_normalize_whitespace(self):
         """Test whitespace normalization"""
         text = "  Text   with    extra    spaces  "
@@ -43,6 +71,17 @@ class TestTextNormalizer(unittest.TestCase):
         normalized = TextNormalizer.normalize_text(text)
         self.assertEqual(normalized, "Resolución del Directorio")
 
+    def test_normalize_pages_matches_normalize_text(self):
+        """Test that per-page normalization gives the same text plus page spans"""
+        pages = ["  Acta  N° 45\n", "", "\tGIRTEC Ã³ S.A.  ", "fin"]
+
+        text, spans = TextNormalizer.normalize_pages(pages)
+
+        self.assertEqual(text, TextNormalizer.normalize_text("\n\n".join(pages)))
+        self.assertEqual(text[spans[4]:spans[5]], "GIRTEC ó S.A.")
+        self.assertEqual(text[spans[2]:spans[3]], "")
+        self.assertEqual(text[spans[6]:spans[7]], "fin")
+
 
 class TestDataExtractor(unittest.TestCase):
     """Test DataExtractor"""
@@ -105,13 +144,48 @@ class TestDataExtractor(unittest.TestCase):
         self.assertIsNotNone(company)
         self.assertIn("GIRTEC", company)
 
+    def test_scan_matches_individual_extractors(self):
+        """Test that the single-pass scan gives the same fields as extract_*"""
+        text = (
+            "ACME S.R.L. y GIRTEC S.A. RUT 21 234 567 0012. Acta N° 45 "
+            "Registro de Comercio N° 12345 Padrón BPS 98765 CI 1.234.567-8 "
+            "fechas 12/03/2023 y 1/1/24 contacto info@girtec.com.uy, legal@girtec.com"
+        )
+
+        fields = DataExtractor.fields_from_matches(DataExtractor.scan(text))
+
+        self.assertEqual(fields["company_name"], DataExtractor.extract_company_name(text))
+        self.assertEqual(fields["rut"], DataExtractor.extract_rut(text))
+        self.assertEqual(fields["ci"], DataExtractor.extract_ci(text))
+        self.assertEqual(fields["registro_comercio"], "12345")
+        self.assertEqual(fields["acta_number"], "45")
+        self.assertEqual(fields["padron_bps"], "98765")
+        self.assertEqual(fields["dates"], ["12/03/2023", "1/1/24"])
+        self.assertEqual(fields["emails"], DataExtractor.extract_emails(text))
+
+    def test_scan_offsets(self):
+        """Test that scan reports where each value was found"""
+        text = "Acta N° 45 de GIRTEC S.A."
+        matches = {m.field: m for m in DataExtractor.scan(text)}
+
+        acta = matches["acta_number"]
+        self.assertEqual(text[acta.start:acta.end], "45")
+        company = matches["company_name"]
+        self.assertEqual(text[company.start:company.end], company.value)
+
+    def test_scan_empty_text(self):
+        """Test scanning text without any field"""
+        fields = DataExtractor.fields_from_matches(DataExtractor.scan("sin datos"))
+        self.assertIsNone(fields["rut"])
+        self.assertEqual(fields["dates"], [])
+
 
 class TestExtractedData(unittest.TestCase):
     """Test ExtractedData dataclass"""
 
     def test_create_extracted_data(self):
         """Test creating ExtractedData"""
-        data = ExtractedData(
+        data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw text here",
             normalized_text="Normalized text here",
@@ -125,7 +199,7 @@ class TestExtractedData(unittest.TestCase):
 
     def test_to_dict(self):
         """Test conversion to dictionary"""
-        data = ExtractedData(
+        data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw",
             normalized_text="Normalized",
@@ -141,7 +215,7 @@ class TestExtractedData(unittest.TestCase):
 
     def test_to_json(self):
         """Test JSON conversion"""
-        data = ExtractedData(
+        data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw",
             normalized_text="Normalized"
@@ -150,9 +224,76 @@ class TestExtractedData(unittest.TestCase):
         json_str = data.to_json()
         self.assertIn("estatuto", json_str)
 
+    def test_text_bodies_left_out_of_serialization(self):
+        """Test that full texts are only serialized on request"""
+        data = ExtractedData.from_text(
+            document_type=DocumentType.ESTATUTO,
+            raw_text="Raw",
+            normalized_text="Normalized"
+        )
+
+        self.assertNotIn("raw_text", data.to_dict())
+        self.assertEqual(data.to_dict(include_text=True)["normalized_text"], "Normalized")
+
+    def test_normalized_text_derived(self):
+        """Test that normalized text is derived from raw text when omitted"""
+        data = ExtractedData.from_text(
+            document_type=DocumentType.ESTATUTO,
+            raw_text="  ResoluciÃ³n   del   Directorio  "
+        )
+
+        self.assertEqual(data.normalized_text, "Resolución del Directorio")
+
+    def test_large_text_is_compressed(self):
+        """Test that long bodies are held compressed and read back intact"""
+        raw_text = "Acta N° 45 del Directorio de GIRTEC S.A.\n" * 500
+        normalized_text = TextNormalizer.normalize_text(raw_text)
+        data = ExtractedData.from_text(
+            document_type=DocumentType.ACTA_DIRECTORIO,
+            raw_text=raw_text,
+            normalized_text=normalized_text
+        )
+
+        stored_bytes = data.text_store.stored_bytes()
+        self.assertLess(stored_bytes, len(raw_text) // 2)
+        self.assertEqual(data.raw_text, raw_text)
+        self.assertEqual(data.normalized_text, normalized_text)
+        self.assertEqual(data.to_dict()["text_preview"], normalized_text[:200] + "...")
+        # Reads decode on demand; nothing is cached next to the compressed copy
+        self.assertEqual(data.text_store.stored_bytes(), stored_bytes)
+
+    def test_replace_and_compare(self):
+        """Test dataclasses.replace keeps the texts and equality compares them"""
+        data = ExtractedData.from_text(
+            document_type=DocumentType.ESTATUTO,
+            raw_text="Raw",
+            normalized_text="Normalized",
+            company_name="GIRTEC S.A."
+        )
+
+        copy = dataclasses.replace(data, rut="212345678901")
+
+        self.assertEqual(copy.normalized_text, "Normalized")
+        self.assertEqual(copy.company_name, "GIRTEC S.A.")
+        self.assertEqual(dataclasses.replace(data), data)
+        self.assertNotEqual(dataclasses.replace(data, text_store=TextStore("Raw", "Otro")), data)
+
+    def test_text_can_be_reassigned(self):
+        """Test setting texts after construction"""
+        data = ExtractedData.from_text(
+            document_type=DocumentType.ESTATUTO,
+            raw_text="Raw",
+            normalized_text="Normalized"
+        )
+
+        data.normalized_text = "Otro"
+
+        self.assertEqual(data.raw_text, "Raw")
+        self.assertEqual(data.normalized_text, "Otro")
+
     def test_get_summary(self):
         """Test summary generation"""
-        data = ExtractedData(
+        data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw",
             normalized_text="Normalized",
@@ -180,7 +321,7 @@ class TestDocumentExtractionResult(unittest.TestCase):
             detected_type=DocumentType.ESTATUTO
         )
 
-        extracted_data = ExtractedData(
+        extracted_data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw",
             normalized_text="Normalized"
@@ -239,6 +380,318 @@ class TestDocumentExtractionResult(unittest.TestCase):
         self.assertTrue(result_dict["success"])
 
 
+class FakePdfPage:
+    """Stands in for a PyPDF2/pdfplumber page and records parsing"""
+
+    def __init__(self, text, parsed):
+        self.text = text
+        self.parsed = parsed
+
+    def extract_text(self):
+        self.parsed.append(self.text)
+        return self.text
+
+
+def fake_pdf(page_texts, parsed):
+    @contextmanager
+    def _open(file_path):
+        yield [FakePdfPage(text, parsed) for text in page_texts]
+    return _open
+
+
+class TestPdfPageStreaming(unittest.TestCase):
+    """Test lazy page-by-page PDF extraction"""
+
+    def setUp(self):
+        self.parsed = []
+        self.texts = ["Acta N° 45", "", "  GIRTEC S.A.  "]
+        patcher = mock.patch.object(TextExtractor, "_open_pdf_pages", fake_pdf(self.texts, self.parsed))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pages_are_parsed_lazily(self):
+        """Test that a page is only parsed when consumed"""
+        pages = TextExtractor.iter_pdf_pages(Path("estatuto.pdf"))
+        first = next(pages)
+
+        self.assertEqual(first.page_number, 1)
+        self.assertEqual(first.text, "Acta N° 45")
+        self.assertEqual(first.source, "pdf_text")
+        self.assertEqual(self.parsed, ["Acta N° 45"])
+
+    def test_max_pages_stops_early(self):
+        """Test that max_pages limits how many pages are read"""
+        pages = list(TextExtractor.iter_pdf_pages(Path("estatuto.pdf"), max_pages=2))
+
+        self.assertEqual([page.page_number for page in pages], [1, 2])
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_extract_from_pdf_joins_pages(self):
+        """Test joining page texts"""
+        text = TextExtractor.extract_from_pdf(Path("estatuto.pdf"))
+        self.assertEqual(text, "Acta N° 45\n\n\n\nGIRTEC S.A.")
+
+    def test_process_document_records_page_char_counts(self):
+        """Test per-page character counts on a processed PDF"""
+        doc = UploadedDocument(
+            file_path=Path("estatuto.pdf"),
+            file_name="estatuto.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=1024,
+            upload_timestamp=datetime.now(),
+            detected_type=DocumentType.ESTATUTO,
+            metadata={"ocr_pages": []}  # Classified as digital
+        )
+
+        result = TextExtractor.process_document(doc)
+
+        self.assertTrue(result.success)
+        self.assertEqual(result.extracted_data.page_char_counts, [10, 0, 11])
+        self.assertEqual(result.extracted_data.acta_number, "45")
+        self.assertEqual(result.extracted_data.to_dict()["page_count"], 3)
+
+    def test_process_document_records_field_locations(self):
+        """Test that every field carries its page and span"""
+        doc = UploadedDocument(
+            file_path=Path("estatuto.pdf"),
+            file_name="estatuto.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=1024,
+            upload_timestamp=datetime.now(),
+            detected_type=DocumentType.ESTATUTO,
+            metadata={"ocr_pages": []}  # Classified as digital
+        )
+
+        data = TextExtractor.process_document(doc).extracted_data
+
+        self.assertEqual(data.page_text(1), "Acta N° 45")
+        self.assertEqual(data.page_text(2), "")
+        self.assertEqual(data.page_text(3), "GIRTEC S.A.")
+        self.assertEqual(data.get_field_page("acta_number"), 1)
+        self.assertEqual(data.get_field_page("company_name"), 3)
+        acta = data.field_locations("acta_number")[0]
+        self.assertEqual(data.normalized_text[acta["start"]:acta["end"]], "45")
+        self.assertEqual(data.to_dict()["field_locations"][0]["field"], "acta_number")
+
+    def test_only_classified_pages_are_ocred(self):
+        """Test that OCR runs only on pages flagged at intake"""
+        doc = UploadedDocument(
+            file_path=Path("acta.pdf"),
+            file_name="acta.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=1024,
+            upload_timestamp=datetime.now(),
+            metadata={"page_count": 3, "ocr_pages": [2]}
+        )
+
+        job = mock.Mock()
+        job.page.return_value = ExtractedPage(2, "Acta N° 7", "ocr")
+
+        with mock.patch.object(TextExtractor, "ocr_pdf_pages", return_value=job) as ocr:
+            pages = list(TextExtractor.extract_pages(doc))
+
+        ocr.assert_called_once_with(Path("acta.pdf"), [2])
+        job.page.assert_called_once_with(2)
+        self.assertEqual([page.source for page in pages], ["pdf_text", "ocr", "pdf_text"])
+        self.assertEqual(pages[1].text, "Acta N° 7")
+        self.assertEqual(TextExtractor.get_extraction_method(doc), "ocr")
+
+    def test_pages_classified_while_reading(self):
+        """Test that unclassified PDFs are classified in Phase 4, parsing each page once"""
+        self.texts[0] = "Acta N° 45 del Directorio de GIRTEC Sociedad Anónima"
+        doc = UploadedDocument(
+            file_path=Path("acta.pdf"),
+            file_name="acta.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=1024,
+            upload_timestamp=datetime.now()
+        )
+
+        job = mock.Mock()
+        job.page.return_value = ExtractedPage(2, "Acta N° 7", "ocr")
+
+        with mock.patch.object(TextExtractor, "ocr_pdf_pages", return_value=job) as ocr:
+            extraction = TextExtractor.extract_document(doc, max_pages=2)
+
+        ocr.assert_called_once_with(Path("acta.pdf"), [2])
+        self.assertEqual(self.parsed, self.texts[:2])
+        self.assertEqual([page["source"] for page in extraction.pages], ["pdf_text", "ocr"])
+        self.assertEqual(extraction.extraction_method, "ocr")
+
+    def test_cache_hit_skips_classification(self):
+        """Test that a cached document is served without opening the PDF"""
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        TextExtractor.configure_cache(str(Path(tmp_dir.name) / "cache"))
+        self.addCleanup(TextExtractor.configure_cache, None)
+        path = Path(tmp_dir.name) / "acta.pdf"
+        path.write_bytes(b"%PDF-1.4 acta")
+        doc = UploadedDocument(
+            file_path=path,
+            file_name="acta.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=13,
+            upload_timestamp=datetime.now()
+        )
+
+        job = mock.Mock()
+        job.page.side_effect = lambda page_number: ExtractedPage(page_number, "Acta N° 7", "ocr")
+
+        with mock.patch.object(TextExtractor, "ocr_pdf_pages", return_value=job) as ocr:
+            first = TextExtractor.extract_document(doc)
+            parsed = list(self.parsed)
+            second = TextExtractor.extract_document(doc)
+
+        self.assertEqual(self.parsed, parsed)
+        self.assertEqual(ocr.call_count, 1)
+        self.assertEqual(second.raw_text, first.raw_text)
+        self.assertNotIn("ocr_pages", TextExtractor.get_cache_settings(doc, None, True))
+
+    def test_text_file_is_single_page(self):
+        """Test that non-paginated formats yield one page"""
+        with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as handle:
+            handle.write("RUT: 212345678901")
+        doc = UploadedDocument(
+            file_path=Path(handle.name),
+            file_name="datos.txt",
+            file_format=FileFormat.TXT,
+            file_size_bytes=17,
+            upload_timestamp=datetime.now()
+        )
+
+        pages = list(TextExtractor.extract_pages(doc))
+        Path(handle.name).unlink()
+
+        self.assertEqual(len(pages), 1)
+        self.assertEqual(pages[0].source, "text")
+        self.assertEqual(pages[0].char_count, 17)
+
+
+class TestProcessDocuments(unittest.TestCase):
+    """Test concurrent collection processing"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def make_document(self, name, text, file_format=FileFormat.TXT):
+        path = Path(self.tmp_dir.name) / name
+        path.write_text(text, encoding="utf-8")
+        return UploadedDocument(
+            file_path=path,
+            file_name=name,
+            file_format=file_format,
+            file_size_bytes=len(text),
+            upload_timestamp=datetime.now()
+        )
+
+    def test_results_keep_document_order(self):
+        """Test that concurrent results come back in input order with progress"""
+        documents = [self.make_document(f"acta_{n}.txt", f"Acta N° {n}") for n in range(6)]
+        progress = []
+
+        results = TextExtractor.process_documents(
+            documents,
+            max_workers=4,
+            progress_callback=lambda done, total, result: progress.append((done, total))
+        )
+
+        self.assertEqual([r.extracted_data.acta_number for r in results], [str(n) for n in range(6)])
+        self.assertEqual(progress, [(n, 6) for n in range(1, 7)])
+
+    def test_documents_run_concurrently(self):
+        """Test that a collection takes about as long as its slowest document"""
+        documents = [self.make_document(f"doc_{n}.txt", "texto") for n in range(4)]
+        original = TextExtractor.process_document
+
+        def slow_process_document(document, max_pages=None):
+            time.sleep(0.3)
+            return original(document, max_pages)
+
+        with mock.patch.object(TextExtractor, "process_document", side_effect=slow_process_document):
+            start = time.monotonic()
+            results = TextExtractor.process_documents(documents, max_workers=4)
+            elapsed = time.monotonic() - start
+
+        self.assertTrue(all(result.success for result in results))
+        self.assertLess(elapsed, 0.9)
+
+    def test_errors_stay_per_document(self):
+        """Test that a failing document does not affect the others"""
+        documents = [
+            self.make_document("acta.txt", "Acta N° 3"),
+            self.make_document("roto.pdf", "no es un PDF", FileFormat.PDF),
+            self.make_document("padron.txt", "Padrón BPS 98765"),
+        ]
+
+        results = TextExtractor.process_documents(documents, max_workers=3)
+
+        self.assertEqual([r.success for r in results], [True, False, True])
+        self.assertEqual(results[1].document.file_name, "roto.pdf")
+        self.assertTrue(results[1].error)
+        self.assertEqual(results[2].extracted_data.padron_bps, "98765")
+
+    def test_process_pool_is_reused(self):
+        """Test that calls share one lazily created process pool"""
+        documents = [
+            self.make_document("roto.pdf", "no es un PDF", FileFormat.PDF),
+            self.make_document("acta.txt", "Acta N° 3"),
+        ]
+        phase4_text_extraction.discard_extraction_pool()
+
+        with mock.patch.object(phase4_text_extraction, "ProcessPoolExecutor", wraps=ProcessPoolExecutor) as pool_class:
+            for _ in range(3):
+                results = TextExtractor.process_documents(documents, max_workers=2)
+                self.assertEqual([r.success for r in results], [False, True])
+
+        self.assertEqual(pool_class.call_count, 1)
+
+    def test_broken_process_pool_is_replaced(self):
+        """Test that a pool whose worker died is dropped after the call"""
+        class BrokenPool:
+            def submit(self, *args, **kwargs):
+                future = Future()
+                future.set_exception(BrokenProcessPool("worker died"))
+                return future
+
+            def shutdown(self, *args, **kwargs):
+                pass
+
+        documents = [
+            self.make_document("estatuto.pdf", "", FileFormat.PDF),
+            self.make_document("acta.txt", "Acta N° 3"),
+        ]
+        broken = BrokenPool()
+        with mock.patch.object(phase4_text_extraction, "_extraction_pool", broken):
+            results = TextExtractor.process_documents(documents, max_workers=2)
+            self.assertIsNone(phase4_text_extraction._extraction_pool)
+
+        self.assertEqual([r.success for r in results], [False, True])
+        self.assertIn("worker died", results[0].error)
+
+    def test_worker_drops_inherited_pools(self):
+        """Test that a new extraction process does not reuse its parent's pools"""
+        with mock.patch.object(ocr_executor, "_default_executor", mock.sentinel.parent_ocr), \
+                mock.patch.object(phase4_text_extraction, "_extraction_pool", mock.sentinel.parent_pool), \
+                mock.patch.object(TextExtractor, "OCR_MAX_WORKERS", None):
+            phase4_text_extraction._init_extraction_worker()
+
+            self.assertIsNone(ocr_executor._default_executor)
+            self.assertIsNone(phase4_text_extraction._extraction_pool)
+            self.assertEqual(TextExtractor.OCR_MAX_WORKERS, 1)
+
+    def test_uses_process_worker(self):
+        """Test that only digital PDFs are sent to worker processes"""
+        pdf = self.make_document("estatuto.pdf", "", FileFormat.PDF)
+        scanned = self.make_document("acta.pdf", "", FileFormat.PDF)
+        scanned.is_scanned = True
+        txt = self.make_document("datos.txt", "")
+
+        self.assertTrue(TextExtractor.uses_process_worker(pdf))
+        self.assertFalse(TextExtractor.uses_process_worker(scanned))
+        self.assertFalse(TextExtractor.uses_process_worker(txt))
+
+
 class TestRealWorldScenarios(unittest.TestCase):
     """Test real-world extraction scenarios"""
 
@@ -3,6 +3,7 @@ Unit tests for Phase 5: Legal Validation Engine
 """
 
 import unittest
+from array import array
 from pathlib import Path
 from datetime import datetime
 
@@ -19,6 +20,7 @@ from src.phase3_document_intake import (
     FileFormat
 )
 from src.phase4_text_extraction import (
+    DataExtractor,
     ExtractedData,
     DocumentExtractionResult,
     CollectionExtractionResult
@@ -317,7 +319,7 @@ class TestLegalValidator(unittest.TestCase):
             detected_type=DocumentType.ESTATUTO
         )
 
-        extracted1 = ExtractedData(
+        extracted1 = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="Raw",
             normalized_text="GIRTEC S.A. RUT: 212345678901",
@@ -346,7 +348,7 @@ class TestLegalValidator(unittest.TestCase):
                 detected_type=req_doc.document_type
             )
 
-            extracted = ExtractedData(
+            extracted = ExtractedData.from_text(
                 document_type=req_doc.document_type,
                 raw_text="Raw",
                 normalized_text="Normalized"
@@ -420,7 +422,7 @@ class TestLegalValidator(unittest.TestCase):
             detected_type=DocumentType.ACTA_DIRECTORIO
         )
 
-        extracted2 = ExtractedData(
+        extracted2 = ExtractedData.from_text(
             document_type=DocumentType.ACTA_DIRECTORIO,
             raw_text="Raw",
             normalized_text="DIFFERENT S.A.",
@@ -446,6 +448,33 @@ class TestLegalValidator(unittest.TestCase):
         has_company_issue = any("company_name" in issue.field for issue in issues)
         self.assertTrue(has_company_issue)
 
+    def test_consistency_issue_points_to_page(self):
+        """Test that inconsistent values are reported with file and page"""
+        doc2 = UploadedDocument(
+            file_path=Path("/test/acta.pdf"),
+            file_name="acta.pdf",
+            file_format=FileFormat.PDF,
+            file_size_bytes=1024,
+            upload_timestamp=datetime.now(),
+            detected_type=DocumentType.ACTA_DIRECTORIO
+        )
+        extracted2 = ExtractedData.from_text(
+            document_type=DocumentType.ACTA_DIRECTORIO,
+            raw_text="Acta N° 3\n\nDIFFERENT S.A.",
+            normalized_text="Acta N° 3 DIFFERENT S.A.",
+            company_name="DIFFERENT S.A.",
+            page_spans=array('i', [0, 9, 10, 24])
+        )
+        extracted2.record_field_spans(DataExtractor.scan(extracted2.normalized_text))
+        self.extraction_result.extraction_results.append(
+            DocumentExtractionResult(document=doc2, extracted_data=extracted2, success=True)
+        )
+
+        issues = LegalValidator.validate_cross_document_consistency(self.extraction_result)
+
+        company_issue = next(issue for issue in issues if issue.field == "company_name_consistency")
+        self.assertIn("DIFFERENT S.A. (acta.pdf, pág. 2)", company_issue.description)
+
     def test_validate_complete(self):
         """Test complete validation"""
         matrix = LegalValidator.validate(
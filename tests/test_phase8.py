@@ -274,7 +274,7 @@ class TestPhase8FinalConfirmation(unittest.TestCase):
         extraction_result = CollectionExtractionResult(collection=self.collection)
 
         # Add some extracted data
-        extraction_result.extracted_data = ExtractedData(
+        extraction_result.extracted_data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="TEST COMPANY S.A. RUT: 21234567890",
             normalized_text="TEST COMPANY S.A. RUT: 21234567890",
@@ -49,7 +49,7 @@ class TestPhase9CertificateGeneration(unittest.TestCase):
 
         # Create extraction result with data
         self.extraction_result = CollectionExtractionResult(collection=self.collection)
-        self.extraction_result.extracted_data = ExtractedData(
+        self.extraction_result.extracted_data = ExtractedData.from_text(
             document_type=DocumentType.ESTATUTO,
             raw_text="TEST COMPANY S.A. RUT: 21234567890 Registro: 12345 Juan Pérez CI: 1234567-8",
             normalized_text="TEST COMPANY S.A. RUT: 21234567890 Registro: 12345 Juan Pérez CI: 1234567-8",
@@ -0,0 +1,202 @@
+"""
+Unit tests for the compiled summary index file
+"""
+
+import errno
+import json
+import os
+import stat as stat_module
+import tempfile
+import unittest
+from unittest import mock
+
+from src import summary_index_file
+from src.summary_index_file import (
+    SummaryIndexFile,
+    cache_index_path,
+    compile_summary_index,
+    make_filename_keys,
+    open_summary_index,
+    summary_entries,
+)
+
+
+SUMMARY = {
+    "identified_certificate_types": {
+        "firma": {"count": 2, "purposes": {"bse": 1}, "attributes": [], "examples": ["Firma Acme.pdf"]},
+    },
+    "certificate_file_mapping": {
+        "firma": [
+            {"customer": "Acme SA", "filename": "Firma Acme.pdf", "path": "Firma Acme.pdf",
+             "error_flag": False, "purpose": "bse"},
+            {"customer": "Núcleo Ltda", "filename": "ERROR firma.doc", "path": "x/ERROR firma.doc",
+             "error_flag": True, "purpose": "dgi"},
+        ],
+        "poder": [],
+    },
+    "non_certificate_documents": [
+        {"customer": "Acme SA", "filename": "Cédula.jpg", "path": "Cédula.jpg", "reason": "non_certificate"},
+        {"customer": "Acme SA", "filename": "Firma Acme.docx", "path": "Firma Acme.docx", "reason": "non_certificate"},
+    ],
+}
+
+
+class TestSummaryIndexFile(unittest.TestCase):
+    """Test compile_summary_index / open_summary_index"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.summary_path = os.path.join(self.tmp_dir.name, "certificate_summary.json")
+        self.write_summary(SUMMARY)
+
+    def write_summary(self, summary):
+        with open(self.summary_path, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle, ensure_ascii=False)
+
+    def open_index(self) -> SummaryIndexFile:
+        index_file = open_summary_index(self.summary_path)
+        self.addCleanup(index_file.close)
+        return index_file
+
+    def test_compiled_next_to_summary(self):
+        """Test the index file is written next to the JSON"""
+        self.open_index()
+        self.assertTrue(os.path.exists(self.summary_path + ".idx"))
+
+    def test_entries(self):
+        """Test entries round-trip with group and entry_type"""
+        index_file = self.open_index()
+        self.assertEqual(list(index_file.entries), summary_entries(SUMMARY))
+        self.assertEqual(len(index_file.entries), 4)
+        self.assertEqual(index_file.entries[-1]["filename"], "Firma Acme.docx")
+        self.assertEqual(index_file.entries[0]["group"], "firma")
+
+    def test_filename_lookup(self):
+        """Test filename keys with and without extension"""
+        index_file = self.open_index()
+        matches = index_file.filename_index.get("firma acme", [])
+        self.assertEqual([entry["filename"] for entry in matches], ["Firma Acme.pdf", "Firma Acme.docx"])
+        self.assertEqual(len(index_file.filename_index["firma acme pdf"]), 1)
+        self.assertEqual(index_file.filename_index.get("cedula jpg", [])[0]["entry_type"], "non_certificate")
+        self.assertEqual(index_file.filename_index.get("missing", []), [])
+        self.assertNotIn("missing", index_file.filename_index)
+        self.assertEqual(make_filename_keys(""), [])
+
+    def test_same_as_dict_index(self):
+        """Test every key maps to the same entries as an in-memory dict index"""
+        index_file = self.open_index()
+        expected = {}
+        for entry in summary_entries(SUMMARY):
+            for key in make_filename_keys(entry["filename"]):
+                expected.setdefault(key, []).append(entry)
+        self.assertEqual(set(index_file.filename_index), set(expected))
+        for key, entries in expected.items():
+            self.assertEqual(index_file.filename_index[key], entries)
+
+    def test_customer_lookup(self):
+        """Test customers are looked up by normalized name"""
+        index_file = self.open_index()
+        self.assertEqual(len(index_file.customer_index.get("acme sa", [])), 3)
+        self.assertEqual(index_file.customer_index["nucleo ltda"][0]["error_flag"], True)
+
+    def test_meta(self):
+        """Test counts, taxonomy and suggestions"""
+        index_file = self.open_index()
+        self.assertEqual(index_file.counts, {"entries": 4, "certificates": 2, "non_certificates": 2})
+        self.assertIn("firma", index_file.identified_certificate_types)
+        self.assertEqual(index_file.fuzzy("customers").top_matches("acme")[0][0], "Acme SA")
+
+    def test_unchanged_summary_not_recompiled(self):
+        """Test an up-to-date index is opened as is, even after a touch"""
+        self.open_index()
+        index_path = self.summary_path + ".idx"
+        inode = os.stat(index_path).st_ino
+        self.assertEqual(self.open_index().path, index_path)
+        self.assertEqual(os.stat(index_path).st_ino, inode)
+
+        # Touched: same content, so only the recorded mtime is updated (temp file + rename)
+        stat = os.stat(self.summary_path)
+        os.utime(self.summary_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with mock.patch.object(summary_index_file, "compile_summary_index") as compile_index:
+            index_file = self.open_index()
+        compile_index.assert_not_called()
+        self.assertTrue(index_file.matches_source(self.summary_path))
+        self.assertEqual(len(index_file.entries), 4)
+
+    def test_changed_summary_recompiled(self):
+        """Test a new summary version replaces the index"""
+        first = self.open_index()
+        changed = json.loads(json.dumps(SUMMARY))
+        changed["non_certificate_documents"].append(
+            {"customer": "Beta", "filename": "nuevo.pdf", "path": "nuevo.pdf", "reason": "non_certificate"}
+        )
+        self.write_summary(changed)
+
+        second = self.open_index()
+        self.assertNotEqual(first.version, second.version)
+        self.assertEqual(len(second.entries), 5)
+        self.assertIn("nuevo pdf", second.filename_index)
+        # The old mapping keeps serving its own version
+        self.assertEqual(len(first.entries), 4)
+
+    def test_corrupt_index_recompiled(self):
+        """Test a damaged index file is rebuilt"""
+        with open(self.summary_path + ".idx", "wb") as handle:
+            handle.write(b"garbage")
+        self.assertEqual(len(self.open_index().entries), 4)
+
+    def test_index_file_mode_follows_umask(self):
+        """Test the index is not left owner-only by the temp file it was written through"""
+        with mock.patch.object(summary_index_file, "_UMASK", 0o022):
+            self.open_index()
+        mode = stat_module.S_IMODE(os.stat(self.summary_path + ".idx").st_mode)
+        self.assertEqual(mode, 0o644)
+
+    def test_read_only_folder_uses_cache_dir(self):
+        """Test a summary in a read-only folder gets its index compiled to the cache dir"""
+        cache_dir = os.path.join(self.tmp_dir.name, "cache")
+        mkstemp = tempfile.mkstemp
+
+        def read_only_mkstemp(dir=None, **kwargs):
+            if dir == self.tmp_dir.name:
+                raise OSError(errno.EROFS, "Read-only file system")
+            return mkstemp(dir=dir, **kwargs)
+
+        with mock.patch.object(summary_index_file, "INDEX_CACHE_DIR", cache_dir), \
+                mock.patch.object(summary_index_file.tempfile, "mkstemp", read_only_mkstemp):
+            index_file = self.open_index()
+            self.assertEqual(index_file.path, cache_index_path(self.summary_path))
+            self.assertTrue(index_file.path.startswith(cache_dir + os.sep))
+            self.assertFalse(os.path.exists(self.summary_path + ".idx"))
+            self.assertEqual(len(index_file.entries), 4)
+
+            # Reopened from the cache dir without recompiling
+            with mock.patch.object(summary_index_file, "compile_summary_index") as compile_index:
+                self.assertEqual(self.open_index().path, index_file.path)
+            compile_index.assert_not_called()
+
+    def test_read_only_folder_keeps_current_index(self):
+        """Test a touched summary still opens its index when the header cannot be rewritten"""
+        self.open_index()
+        stat = os.stat(self.summary_path)
+        os.utime(self.summary_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        with mock.patch.object(summary_index_file.tempfile, "mkstemp",
+                               side_effect=PermissionError(errno.EACCES, "Permission denied")):
+            index_file = self.open_index()
+        self.assertEqual(index_file.path, self.summary_path + ".idx")
+        self.assertFalse(index_file.matches_source(self.summary_path))
+        self.assertEqual(len(index_file.entries), 4)
+
+    def test_compile_returns_path(self):
+        """Test compiling to an explicit path"""
+        index_path = os.path.join(self.tmp_dir.name, "other.idx")
+        self.assertEqual(compile_summary_index(self.summary_path, index_path), index_path)
+        index_file = SummaryIndexFile(index_path)
+        self.addCleanup(index_file.close)
+        self.assertEqual(index_file.counts["entries"], 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,167 @@
+"""
+Unit tests for matching documents against the certificate summary
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+from src.content_index import ContentIndex, content_index_path
+from src.summary_index_file import source_digest
+from src.summary_matching import MatchContext, match_document, match_documents
+from src.summary_store import reload_summary_store
+
+
+SUMMARY = {
+    "identified_certificate_types": {
+        "firma": {"count": 2, "purposes": {"bse": 1, "dgi": 1}, "attributes": ["poder"],
+                  "examples": ["Firma Acme.pdf"]},
+        "personeria": {"count": 1, "purposes": {"abitab": 1}, "attributes": ["giro"],
+                       "examples": ["Personeria Beta.pdf"]},
+    },
+    "certificate_file_mapping": {
+        "firma": [
+            {"customer": "Acme SA", "filename": "Firma Acme.pdf", "path": "Firma Acme.pdf",
+             "error_flag": False, "purpose": "bse"},
+            {"customer": "Gamma SRL", "filename": "ERROR firma Gamma.pdf", "path": "ERROR firma Gamma.pdf",
+             "error_flag": True, "purpose": "dgi"},
+        ],
+        "personeria": [
+            {"customer": "Beta SA", "filename": "Personeria Beta.pdf", "path": "Personeria Beta.pdf",
+             "error_flag": False, "purpose": "abitab"},
+        ],
+    },
+    "non_certificate_documents": [
+        {"customer": "Acme SA", "filename": "Cedula Acme.jpg", "path": "Cedula Acme.jpg",
+         "reason": "non_certificate"},
+    ],
+}
+
+LLM_FIRMA = {"is_certificate": True, "certificate_type": "firma", "purpose": "bse", "confidence": 0.8}
+
+# One document per rung of the matching ladder, with repeated customers and purposes
+DOCUMENTS = [
+    {"filename": "Firma Acme.pdf", "subject_name": "Acme SA", "extracted_company": None,
+     "purpose_value": "para_bse"},
+    {"filename": "ERROR firma Gamma.pdf", "subject_name": "Gamma SRL", "extracted_company": None,
+     "purpose_value": "dgi"},
+    {"filename": "Cedula Acme.jpg", "subject_name": "Acme SA", "extracted_company": None,
+     "purpose_value": "bse", "llm_result": LLM_FIRMA},
+    {"filename": "Cedula Acme.jpg", "subject_name": "Acme SA", "extracted_company": None,
+     "purpose_value": "bse"},
+    {"filename": "nuevo.pdf", "subject_name": "Beta SA", "extracted_company": "Acme SA",
+     "purpose_value": "para_abitab"},
+    {"filename": "otro.pdf", "subject_name": "Beta SA", "extracted_company": None,
+     "purpose_value": "bps"},
+    {"filename": "scan.pdf", "subject_name": "Delta", "extracted_company": None,
+     "purpose_value": "bse", "llm_result": LLM_FIRMA},
+    {"filename": "sin datos.pdf", "subject_name": "Acme S.A.", "extracted_company": None,
+     "purpose_value": "bse"},
+]
+
+EXPECTED_MATCH_TYPES = [
+    "filename",
+    "filename_error",
+    "filename_non_certificate_llm_conflict",
+    "filename_non_certificate",
+    "customer_purpose",
+    "customer_only",
+    "llm_only",
+    "none",
+]
+
+
+class TestSummaryMatching(unittest.TestCase):
+    """Test match_document / match_documents on a small fixture summary"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.summary_path = os.path.join(self.tmp_dir.name, "certificate_summary.json")
+        with open(self.summary_path, "w", encoding="utf-8") as handle:
+            json.dump(SUMMARY, handle)
+
+    def load_summary_index(self):
+        store = reload_summary_store(self.summary_path)
+        self.addCleanup(store.index_file.close)
+        return store.summary_index
+
+    def test_match_ladder(self):
+        """Test each fixture document stops at its expected rung"""
+        summary_index = self.load_summary_index()
+        results = [match_document(summary_index=summary_index, **document) for document in DOCUMENTS]
+
+        self.assertEqual([result["match_type"] for result in results], EXPECTED_MATCH_TYPES)
+        self.assertEqual(results[0]["matches"][0]["customer"], "Acme SA")
+        self.assertEqual(results[5]["status"], "not_found")
+        self.assertEqual(results[7]["suggestions"]["customer"][0][0], "Acme SA")
+
+    def test_batch_equals_per_document(self):
+        """Test match_documents returns what match_document returns for each file"""
+        summary_index = self.load_summary_index()
+
+        for content_only in (False, True):
+            expected = [
+                match_document(summary_index=summary_index, content_only=content_only, **document)
+                for document in DOCUMENTS
+            ]
+            self.assertEqual(match_documents(DOCUMENTS, summary_index, content_only=content_only), expected)
+
+    def test_batch_with_content(self):
+        """Test content similarity and keyword matches come out the same in a batch"""
+        certificate = SUMMARY["certificate_file_mapping"]["personeria"][0]
+        ContentIndex.build(
+            [(certificate, "certificado de personeria juridica de Beta SA giro comercial abitab")],
+            meta={"summary_sha256": source_digest(self.summary_path).hex()}
+        ).save(content_index_path(self.summary_path))
+        summary_index = self.load_summary_index()
+        documents = [
+            dict(document, content_text="personeria juridica giro comercial abitab")
+            for document in DOCUMENTS
+        ] + [
+            {"filename": "poder.pdf", "subject_name": "Nadie", "extracted_company": None,
+             "purpose_value": "bse", "content_text": "certifico la firma y el poder otorgado"},
+        ]
+
+        results = match_documents(documents, summary_index, content_only=True)
+
+        self.assertEqual(results, [match_document(summary_index=summary_index, content_only=True, **document)
+                                   for document in documents])
+        self.assertEqual(results[6]["match_type"], "content_similarity")
+        self.assertEqual(results[6]["matches"][0]["filename"], "Personeria Beta.pdf")
+
+    def test_content_match_conflicts_with_llm(self):
+        """Test a content match is left for review when the LLM says it is not a certificate"""
+        certificate = SUMMARY["certificate_file_mapping"]["personeria"][0]
+        ContentIndex.build(
+            [(certificate, "certificado de personeria juridica de Beta SA giro comercial abitab")],
+            meta={"summary_sha256": source_digest(self.summary_path).hex()}
+        ).save(content_index_path(self.summary_path))
+        summary_index = self.load_summary_index()
+        document = {"filename": "scan.pdf", "subject_name": "Delta", "extracted_company": None,
+                    "purpose_value": "abitab", "content_text": "personeria juridica giro comercial abitab"}
+        not_certificate = {"is_certificate": False, "certificate_type": "", "purpose": "", "confidence": 0.9}
+
+        result = match_document(summary_index=summary_index, llm_result=not_certificate, **document)
+
+        self.assertEqual(result["status"], "needs_review")
+        self.assertEqual(result["match_type"], "content_similarity_llm_conflict")
+        self.assertEqual(result["matches"][0]["filename"], "Personeria Beta.pdf")
+        self.assertEqual(match_document(summary_index=summary_index, **document)["match_type"],
+                         "content_similarity")
+
+    def test_context_memoizes_lookups(self):
+        """Test a shared context resolves repeated customers and filenames once"""
+        summary_index = self.load_summary_index()
+        context = MatchContext(summary_index)
+
+        keys = context.customer_keys("Acme SA", "ACME S.A.")
+        self.assertEqual(keys, ("acme sa", "acme s a"))
+        self.assertIs(context.customer_entries(keys), context.customer_entries(keys))
+        self.assertIs(context.filename_entries("Firma Acme.pdf"), context.filename_entries("Firma Acme.pdf"))
+        self.assertEqual(context.taxonomy_purposes("firma"), ["bse", "dgi"])
+
+
+if __name__ == '__main__':
+    unittest.main()
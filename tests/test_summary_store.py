@@ -0,0 +1,141 @@
+"""
+Unit tests for the process-wide summary store
+"""
+
+import json
+import os
+import pickle
+import tempfile
+import unittest
+
+from src.content_index import content_index_path
+from src.summary_store import (
+    FrozenDict,
+    build_llm_reference,
+    freeze,
+    get_summary_store,
+    reload_summary_store,
+)
+from src.taxonomy_context import TaxonomyContext
+
+
+SUMMARY = {
+    "identified_certificate_types": {
+        "firma": {
+            "count": 2,
+            "purposes": {"bse": 1, "dgi": 1},
+            "attributes": ["poder"],
+            "examples": ["a.pdf", "b.pdf", "c.pdf", "d.pdf"],
+        },
+    },
+    "certificate_file_mapping": {
+        "firma": [{"customer": "Acme SA", "filename": "Firma Acme.pdf", "path": "Firma Acme.pdf", "purpose": "bse"}],
+    },
+    "non_certificate_documents": [],
+}
+
+
+class TestFrozenDict(unittest.TestCase):
+    """Test FrozenDict and freeze"""
+
+    def test_read_only(self):
+        """Test every mutating method raises"""
+        frozen = FrozenDict(a=1)
+        for mutate in (
+            lambda: frozen.__setitem__("b", 2),
+            lambda: frozen.__delitem__("a"),
+            lambda: frozen.update(b=2),
+            lambda: frozen.setdefault("b", 2),
+            lambda: frozen.pop("a"),
+            lambda: frozen.popitem(),
+            lambda: frozen.clear(),
+        ):
+            with self.assertRaises(TypeError):
+                mutate()
+        self.assertEqual(frozen, {"a": 1})
+
+    def test_behaves_like_dict(self):
+        """Test JSON, copies and pickling"""
+        frozen = freeze({"a": [1, {"b": 2}]})
+        self.assertIsInstance(frozen["a"], tuple)
+        self.assertIsInstance(frozen["a"][1], FrozenDict)
+        self.assertEqual(json.dumps(frozen), '{"a": [1, {"b": 2}]}')
+        copy = dict(frozen)
+        copy["c"] = 3
+        self.assertNotIn("c", frozen)
+        self.assertEqual(pickle.loads(pickle.dumps(frozen)), frozen)
+
+    def test_llm_reference(self):
+        """Test the reference keeps the content (and version) of a plain dict"""
+        reference = build_llm_reference(SUMMARY["identified_certificate_types"])
+        plain = {
+            "firma": {"count": 2, "purposes": ["bse", "dgi"], "attributes": ["poder"],
+                      "examples": ["a.pdf", "b.pdf", "c.pdf"]},
+        }
+        self.assertEqual(json.loads(json.dumps(reference)), plain)
+        self.assertEqual(TaxonomyContext.reference_version(reference), TaxonomyContext.reference_version(plain))
+
+
+class TestSummaryStore(unittest.TestCase):
+    """Test get_summary_store / reload_summary_store"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.path = os.path.join(self.tmp_dir.name, "certificate_summary.json")
+        self.write_summary(SUMMARY)
+
+    def write_summary(self, summary):
+        with open(self.path, "w", encoding="utf-8") as handle:
+            json.dump(summary, handle)
+
+    def test_shared_instance(self):
+        """Test repeated calls return the same store"""
+        store = get_summary_store(self.path)
+        self.assertIs(get_summary_store(self.path), store)
+        self.assertIs(store.summary_index["summary_reference"], store.summary_reference)
+        self.assertEqual(store.counts["certificates"], 1)
+        self.assertEqual(len(store.summary_index["filename_index"].get("firma acme", [])), 1)
+
+    def test_read_only(self):
+        """Test the shared structures cannot be modified"""
+        store = get_summary_store(self.path)
+        with self.assertRaises(TypeError):
+            store.summary_index["summary_reference"] = {}
+        with self.assertRaises(TypeError):
+            store.summary_reference["firma"]["count"] = 0
+
+    def test_reload_on_mtime_change(self):
+        """Test a modified file is picked up by the next call"""
+        store = get_summary_store(self.path)
+        changed = json.loads(json.dumps(SUMMARY))
+        changed["non_certificate_documents"].append({"customer": "Beta", "filename": "n.pdf", "path": "n.pdf"})
+        self.write_summary(changed)
+        os.utime(self.path, ns=(store.mtime_ns + 10 ** 9, store.mtime_ns + 10 ** 9))
+
+        self.assertFalse(store.is_current())
+        reloaded = get_summary_store(self.path)
+        self.assertIsNot(reloaded, store)
+        self.assertEqual(reloaded.counts["entries"], 2)
+        # The previous store keeps serving its own version
+        self.assertEqual(store.counts["entries"], 1)
+
+    def test_corrupt_content_index_ignored(self):
+        """Test an unreadable content index does not stop the store from loading"""
+        with open(content_index_path(self.path), "wb") as handle:
+            handle.write(b"not an index")
+        store = get_summary_store(self.path)
+        self.assertIsNone(store.content_index)
+        self.assertIsNone(store.summary_index["content_index"])
+
+    def test_explicit_reload(self):
+        """Test reload_summary_store replaces the shared store"""
+        store = get_summary_store(self.path)
+        reloaded = reload_summary_store(self.path)
+        self.assertIsNot(reloaded, store)
+        self.assertIs(get_summary_store(self.path), reloaded)
+        self.assertEqual(reloaded.version, store.version)
+
+
+if __name__ == '__main__':
+    unittest.main()
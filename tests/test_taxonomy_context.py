@@ -0,0 +1,71 @@
+"""
+Unit tests for the compiled taxonomy context
+"""
+
+import unittest
+from unittest import mock
+
+from src.taxonomy_context import TaxonomyContext, get_taxonomy_context
+
+
+REFERENCE = {
+    "firma": {"purposes": ["bps", "bse"], "examples": ["CERT FIRMA ACME.pdf"]},
+    "personeria": {"purposes": [], "examples": []},
+    "poder": {"purposes": ["abitab"], "examples": ["PODER ACME.pdf", "PODER BETA.pdf"]},
+}
+
+
+class TestTaxonomyContext(unittest.TestCase):
+    """Test TaxonomyContext"""
+
+    def test_full_text(self):
+        context = TaxonomyContext.from_reference(REFERENCE)
+
+        self.assertEqual(context.text.splitlines(), [
+            "- firma: purposes=bps, bse; examples=CERT FIRMA ACME.pdf",
+            "- personeria: purposes=none; examples=none",
+            "- poder: purposes=abitab; examples=PODER ACME.pdf; PODER BETA.pdf",
+        ])
+        self.assertEqual(context.cert_types, ("firma", "personeria", "poder"))
+        self.assertGreater(context.token_count, 0)
+
+    def test_compact_keeps_summary_order(self):
+        context = TaxonomyContext.from_reference(REFERENCE)
+
+        compact = context.compact(["poder", "firma"])
+
+        self.assertEqual(compact.splitlines(), [
+            "- firma: purposes=bps, bse; examples=CERT FIRMA ACME.pdf",
+            "- poder: purposes=abitab; examples=PODER ACME.pdf; PODER BETA.pdf",
+        ])
+
+    def test_compact_without_known_types_is_full(self):
+        context = TaxonomyContext.from_reference(REFERENCE)
+        self.assertEqual(context.compact(["desconocido"]), context.text)
+
+    def test_version_follows_content(self):
+        changed = dict(REFERENCE, firma={"purposes": ["bps"], "examples": []})
+
+        self.assertEqual(
+            TaxonomyContext.reference_version(REFERENCE),
+            TaxonomyContext.reference_version(dict(REFERENCE))
+        )
+        self.assertNotEqual(
+            TaxonomyContext.reference_version(REFERENCE),
+            TaxonomyContext.reference_version(changed)
+        )
+
+    def test_built_once_per_version(self):
+        self.assertIs(get_taxonomy_context(REFERENCE), get_taxonomy_context(dict(REFERENCE)))
+
+    def test_same_reference_skips_version_hash(self):
+        reference = dict(REFERENCE)
+        context = get_taxonomy_context(reference)
+
+        with mock.patch.object(TaxonomyContext, "reference_version") as reference_version:
+            self.assertIs(get_taxonomy_context(reference), context)
+        reference_version.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()